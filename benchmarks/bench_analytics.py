@@ -0,0 +1,91 @@
+"""Benchmark: variações mensais no cubo NumPy (analytics.IdaCube) vs. consulta à view no PostgreSQL.
+
+Cria o schema sintético de bench_materialized_view.py (com uma fração de
+linhas removidas e valores nulos, para exercitar a semântica do AVG/LAG),
+compara o tempo de ``SELECT * FROM v_taxa_variacao_resolvidas_5d`` com o
+cálculo equivalente no cubo e confere se os resultados são iguais (após o
+arredondamento para 2 casas). Também mede o cálculo para todas as métricas
+de uma vez, que no banco exigiria uma consulta por métrica.
+
+Uso: python benchmarks/bench_analytics.py [--years 5 20] [--groups 30] [--holes 0.1] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "etl_ida"))
+
+from analytics import IdaCube  # noqa: E402
+from bench_materialized_view import BENCH_SCHEMA, TARGET_METRIC, create_schema  # noqa: E402
+from main_etl import Config, Loader  # noqa: E402
+
+
+def timed(func, runs):
+    """Executa ``func`` ``runs`` vezes; retorna (último resultado, mediana em ms)."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(times)
+
+
+def compare(view, cube_pivot):
+    """Maior diferença absoluta entre a view e o cubo, e quantidade de células divergentes (> 0,01)."""
+    view = view.set_index("Mes").astype("float64")
+    cube_pivot = cube_pivot.set_index("Mes")[view.columns].astype("float64")
+    if not view.index.equals(cube_pivot.index):
+        raise AssertionError("Meses diferentes entre a view e o cubo.")
+    a, b = view.to_numpy(), cube_pivot.to_numpy()
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        raise AssertionError("Células nulas diferentes entre a view e o cubo.")
+    diff = np.nan_to_num(np.abs(a - b))
+    return diff.max(), int((diff > 0.011).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--groups", type=int, default=30)
+    parser.add_argument("--holes", type=float, default=0.1, help="Fração de linhas removidas + valores nulos")
+    parser.add_argument("--runs", type=int, default=5, help="Execuções por medida (é reportada a mediana)")
+    args = parser.parse_args()
+
+    loader = Loader(Config())
+    if not loader.connect_db():
+        raise SystemExit("Não foi possível conectar ao PostgreSQL.")
+    conn = loader.conn
+
+    print(f"{'anos':>5} {'linhas fato':>12} {'carga cubo (ms)':>16} {'view SQL (ms)':>14} {'cubo (ms)':>10} "
+          f"{'todas métricas (ms)':>20} {'dif. máx.':>10} {'divergentes':>12}")
+    try:
+        for years in args.years:
+            with conn.begin():
+                create_schema(conn, years, args.groups)
+                conn.exec_driver_sql("SELECT setseed(0.42)")
+                conn.exec_driver_sql("DELETE FROM fato_ida WHERE random() < %s", (args.holes / 2,))
+                conn.exec_driver_sql("UPDATE fato_ida SET valor = NULL WHERE random() < %s", (args.holes / 2,))
+                rows = conn.exec_driver_sql("SELECT COUNT(*) FROM fato_ida").scalar()
+            with conn.begin():
+                conn.exec_driver_sql(f"SET search_path TO {BENCH_SCHEMA}")
+                cube, load_ms = timed(lambda: IdaCube.from_database(conn), 1)
+                view, sql_ms = timed(lambda: pd.read_sql("SELECT * FROM v_taxa_variacao_resolvidas_5d", conn), args.runs)
+            cube_pivot, cube_ms = timed(lambda: cube.pivot(TARGET_METRIC), args.runs)
+            _, all_ms = timed(lambda: cube.compute(), args.runs)
+            max_diff, mismatches = compare(view, cube_pivot)
+            print(f"{years:>5} {rows:>12} {load_ms:>16.1f} {sql_ms:>14.2f} {cube_ms:>10.2f} "
+                  f"{all_ms:>20.2f} {max_diff:>10.4f} {mismatches:>12}")
+    finally:
+        with conn.begin():
+            conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        loader.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark: carga da fato via COPY FROM STDIN vs. DataFrame.to_sql (INSERTs).
+
+Gera uma tabela fato sintética e mede o tempo de inserção de cada método
+numa tabela UNLOGGED temporária, contra o PostgreSQL configurado pelas
+variáveis POSTGRES_* (as mesmas usadas pelo ETL).
+
+Uso: python benchmarks/bench_bulk_load.py [--rows 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "etl_ida"))
+
+from main_etl import Config, Loader  # noqa: E402
+
+BENCH_TABLE = "bench_fato_ida"
+
+
+def synthetic_fact(rows, seed=42):
+    """Gera uma tabela fato sintética com ``rows`` linhas (IDs inteiros e ~1/3 de valores nulos)."""
+    rng = np.random.default_rng(seed)
+    valor = rng.uniform(0, 100, rows)
+    valor[rng.random(rows) < 0.33] = np.nan
+    return pd.DataFrame({
+        "id_tempo": rng.integers(1, 150, rows),
+        "id_grupo": rng.integers(1, 20, rows),
+        "id_servico": rng.integers(1, 4, rows),
+        "id_metrica": rng.integers(1, 15, rows),
+        "valor": valor,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+
+    config = Config()
+    loader = Loader(config)
+    if not loader.connect_db():
+        raise SystemExit("Não foi possível conectar ao PostgreSQL.")
+
+    print(f"{'linhas':>10} {'método':<7} {'tempo (s)':>10} {'linhas/s':>12}")
+    try:
+        for rows in args.rows:
+            df = synthetic_fact(rows)
+            for method in ("to_sql", "copy"):
+                config.bulk_load_method = method
+                with loader.conn.begin():
+                    loader.conn.execute(text(f"DROP TABLE IF EXISTS {BENCH_TABLE}"))
+                    loader.conn.execute(text(
+                        f"CREATE UNLOGGED TABLE {BENCH_TABLE} (id_tempo INTEGER, id_grupo INTEGER, "
+                        "id_servico INTEGER, id_metrica INTEGER, valor NUMERIC)"
+                    ))
+                start = time.perf_counter()
+                with loader.conn.begin():
+                    loader._insert_frame(df, BENCH_TABLE, loader.conn)
+                elapsed = time.perf_counter() - start
+                print(f"{rows:>10} {method:<7} {elapsed:>10.3f} {rows / elapsed:>12.0f}")
+    finally:
+        with loader.conn.begin():
+            loader.conn.execute(text(f"DROP TABLE IF EXISTS {BENCH_TABLE}"))
+        loader.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark: v_taxa_variacao_resolvidas_5d vs. mv_taxa_variacao_resolvidas_5d (EXPLAIN ANALYZE).
+
+Cria um schema temporário com as tabelas, a view e a view materializada de
+sql_init/, gera uma fato sintética de vários anos e compara o tempo de
+execução (EXPLAIN ANALYZE) das consultas à view e à view materializada, além
+do custo do REFRESH ... CONCURRENTLY. Usa o PostgreSQL configurado pelas
+variáveis POSTGRES_* (as mesmas usadas pelo ETL).
+
+Uso: python benchmarks/bench_materialized_view.py [--years 5 20] [--groups 30] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "etl_ida"))
+
+from main_etl import Config, Loader  # noqa: E402
+
+BENCH_SCHEMA = "bench_mv"
+SQL_DIR = os.path.join(REPO_DIR, "sql_init")
+TARGET_METRIC = "Taxa de reclamações respondidas em até 5 dias úteis"
+# Grupos com coluna própria no pivot da view; os demais recebem nomes sintéticos
+PIVOT_GROUPS = ["ALGAR", "CLARO", "EMBRATEL", "NET", "NEXTEL", "OI", "SERCOMTEL", "SKY", "TIM", "VIVO"]
+
+
+def init_schema(conn, schema=BENCH_SCHEMA):
+    """Recria ``schema`` vazio com as tabelas, views e funções de sql_init/ e o coloca no search_path."""
+    conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+    conn.exec_driver_sql(f"SET search_path TO {schema}")
+    # Cursor do driver sem parâmetros: os scripts contêm "%s" (FORMAT) que não devem ser interpolados
+    with conn.connection.cursor() as cursor:
+        for filename in sorted(f for f in os.listdir(SQL_DIR) if f.endswith(".sql")):
+            with open(os.path.join(SQL_DIR, filename), encoding="utf-8") as f:
+                cursor.execute(f.read())
+
+
+def create_schema(conn, years, groups, metrics=12):
+    """Recria o schema de benchmark a partir de sql_init/ e o popula com dados sintéticos."""
+    init_schema(conn)
+    group_names = PIVOT_GROUPS[:groups] + [f"GRUPO {g}" for g in range(max(0, groups - len(PIVOT_GROUPS)))]
+    metric_names = [TARGET_METRIC] + [f"Métrica {m}" for m in range(1, metrics)]
+    conn.exec_driver_sql(f"""
+        INSERT INTO dim_tempo (ano, mes, ano_mes)
+        SELECT EXTRACT(YEAR FROM d)::int, EXTRACT(MONTH FROM d)::int, TO_CHAR(d, 'YYYY-MM')
+        FROM generate_series(DATE '2000-01-01', DATE '2000-01-01' + INTERVAL '{years * 12 - 1} months', INTERVAL '1 month') AS d
+    """)
+    conn.exec_driver_sql("INSERT INTO dim_grupo_economico (nome) SELECT UNNEST(%s)", (group_names,))
+    conn.exec_driver_sql("INSERT INTO dim_servico (sigla, nome) VALUES ('SCM', 'SCM'), ('SMP', 'SMP'), ('STFC', 'STFC')")
+    conn.exec_driver_sql("INSERT INTO dim_metrica (nome) SELECT UNNEST(%s)", (metric_names,))
+    conn.exec_driver_sql("""
+        INSERT INTO fato_ida (id_tempo, id_grupo, id_servico, id_metrica, valor)
+        SELECT t.id_tempo, g.id_grupo, s.id_servico, m.id_metrica, ROUND((50 + random() * 50)::numeric, 2)
+        FROM dim_tempo t CROSS JOIN dim_grupo_economico g CROSS JOIN dim_servico s CROSS JOIN dim_metrica m
+    """)
+    conn.exec_driver_sql("ANALYZE")
+    # Gera o pivot com os grupos sintéticos (recria e popula a view materializada)
+    if not conn.exec_driver_sql("SELECT gerar_pivot_taxa_variacao_resolvidas_5d()").scalar():
+        conn.exec_driver_sql("REFRESH MATERIALIZED VIEW mv_taxa_variacao_resolvidas_5d")
+    return conn.exec_driver_sql("SELECT COUNT(*) FROM fato_ida").scalar()
+
+
+def explain_ms(conn, query, runs):
+    """Mediana do tempo de execução (planejamento + execução, em ms) medido pelo EXPLAIN ANALYZE."""
+    times = []
+    for _ in range(runs):
+        plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}").scalar()[0]
+        times.append(plan["Planning Time"] + plan["Execution Time"])
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--groups", type=int, default=30)
+    parser.add_argument("--runs", type=int, default=5, help="Execuções por consulta (é reportada a mediana)")
+    parser.add_argument("--keep", action="store_true", help=f"Mantém o schema {BENCH_SCHEMA} ao final")
+    args = parser.parse_args()
+
+    loader = Loader(Config())
+    if not loader.connect_db():
+        raise SystemExit("Não foi possível conectar ao PostgreSQL.")
+    conn = loader.conn
+
+    print(f"{'anos':>5} {'linhas fato':>12} {'view (ms)':>10} {'mat. (ms)':>10} {'ganho':>8} {'refresh (ms)':>13}")
+    try:
+        for years in args.years:
+            with conn.begin():
+                rows = create_schema(conn, years, args.groups)
+            with conn.begin():
+                conn.exec_driver_sql(f"SET search_path TO {BENCH_SCHEMA}")
+                view_ms = explain_ms(conn, "SELECT * FROM v_taxa_variacao_resolvidas_5d", args.runs)
+                mv_ms = explain_ms(conn, "SELECT * FROM mv_taxa_variacao_resolvidas_5d", args.runs)
+                start = time.perf_counter()
+                conn.exec_driver_sql("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_taxa_variacao_resolvidas_5d")
+                refresh_ms = (time.perf_counter() - start) * 1000
+            print(f"{years:>5} {rows:>12} {view_ms:>10.2f} {mv_ms:>10.2f} {view_ms / mv_ms:>7.0f}x {refresh_ms:>13.1f}")
+    finally:
+        if not args.keep:
+            with conn.begin():
+                conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        loader.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark: leitor ODS em streaming vs. pd.read_excel(engine="odf").
+
+Replica as linhas de dados dos arquivos em downloaded_ods/ para gerar
+planilhas grandes e mede tempo e pico de memória (tracemalloc) de cada leitor.
+
+Uso: python benchmarks/bench_ods_reader.py [--copies 50 100] [--skip-odf]
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "etl_ida"))
+
+from ods_reader import read_ods  # noqa: E402
+
+ODS_DIR = os.path.join(REPO_DIR, "downloaded_ods")
+HEADER_SKIP = 8
+ROW_PATTERN = re.compile(r"<table:table-row\b.*?</table:table-row>", re.S)
+
+
+def replicate_ods(src_path, dst_path, copies):
+    """Gera uma cópia do ODS com as linhas de dados repetidas ``copies`` vezes."""
+    with zipfile.ZipFile(src_path) as src:
+        content = src.read("content.xml").decode("utf-8")
+        rows = list(ROW_PATTERN.finditer(content))
+        # Linhas de dados: após o cabeçalho, excluindo o preenchimento vazio final
+        data_rows = [m for m in rows[HEADER_SKIP + 1:] if "number-rows-repeated" not in m.group(0)]
+        start, end = data_rows[0].start(), data_rows[-1].end()
+        block = content[start:end]
+        content = content[:start] + block * copies + content[end:]
+
+        with zipfile.ZipFile(dst_path, "w", zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                data = content.encode("utf-8") if item.filename == "content.xml" else src.read(item.filename)
+                compress = zipfile.ZIP_STORED if item.filename == "mimetype" else zipfile.ZIP_DEFLATED
+                dst.writestr(item.filename, data, compress_type=compress)
+
+
+def measure(func, *args, **kwargs):
+    """Executa ``func`` e retorna (resultado, segundos, pico de memória em MB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 20, 100])
+    parser.add_argument("--skip-odf", action="store_true", help="Não executa o leitor odf (lento em arquivos grandes)")
+    args = parser.parse_args()
+
+    sources = sorted(f for f in os.listdir(ODS_DIR) if f.endswith(".ods"))
+    print(f"{'arquivo':<12} {'cópias':>6} {'linhas':>8} {'leitor':<7} {'tempo (s)':>10} {'pico (MB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for filename in sources:
+            for copies in args.copies:
+                path = os.path.join(tmp, f"{copies}_{filename}")
+                replicate_ods(os.path.join(ODS_DIR, filename), path, copies)
+                readers = [("stream", lambda p: read_ods(p, header=HEADER_SKIP))]
+                if not args.skip_odf:
+                    readers.append(("odf", lambda p: pd.read_excel(p, engine="odf", header=HEADER_SKIP)))
+                for name, reader in readers:
+                    df, elapsed, peak = measure(reader, path)
+                    print(f"{filename:<12} {copies:>6} {len(df):>8} {name:<7} {elapsed:>10.3f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
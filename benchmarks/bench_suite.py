@@ -0,0 +1,267 @@
+"""Suíte de benchmark das etapas do ETL sobre planilhas sintéticas, com comparação a uma linha de base.
+
+Para cada tamanho (ANOSxGRUPOSxMÉTRICAS), gera com ida_workbook.py um
+arquivo por serviço e ano no layout da Anatel (ODS por padrão; com mais de
+um ``--format``, os formatos se alternam entre os arquivos) e mede as
+etapas do ETL:
+
+- ``leitura``: ``Extractor.read_ods_files`` (sem o cache de leitura);
+- ``transformacao``: ``Transformer.transform_data``;
+- ``carga``: ``Loader.load_data`` num schema vazio (criado a partir de sql_init/);
+- ``carga_sem_alteracoes``: nova carga dos mesmos dados (upsert sem mudanças).
+
+Cada etapa reporta a vazão (linhas da fato por segundo, mediana de
+``--runs`` execuções) e o pico de memória alocada (tracemalloc, numa
+execução à parte para não distorcer o tempo). O resultado é gravado em JSON
+(processed_ods/benchmarks/) e comparado com ``--baseline``: vazão abaixo ou
+pico de memória acima da tolerância é regressão (código de saída 1).
+As etapas de carga usam o PostgreSQL das variáveis POSTGRES_* e são
+puladas se ele não estiver disponível (ou com ``--skip-load``).
+
+As demais configurações do ETL (ODS_READER_ENGINE, ETL_PARSE_WORKERS,
+ETL_LOW_MEMORY, ETL_LOAD_MODE, ETL_BULK_LOAD_METHOD...) valem como na
+execução normal e são registradas no resultado.
+
+Uso: python benchmarks/bench_suite.py [--sizes 5x30x12 20x30x12] [--format ods csv xlsx parquet] [--runs 3]
+                                      [--baseline benchmarks/baseline.json] [--update-baseline] [--tolerance 0.2] [--skip-load]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "etl_ida"))
+
+# Cada execução deve medir o trabalho completo: sem cache de leitura nem cache de chaves persistido
+os.environ["ETL_PARSE_CACHE"] = "false"
+os.environ["ETL_DIM_KEY_CACHE"] = "false"
+
+import ida_workbook  # noqa: E402
+from bench_materialized_view import init_schema  # noqa: E402
+from main_etl import Config, Extractor, Loader, Transformer  # noqa: E402
+
+BENCH_SCHEMA = "bench_suite"
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmarks", "baseline.json")
+# Folga absoluta do pico de memória (MB), para que etapas pequenas não oscilem entre regressão e não regressão
+MEMORY_SLACK_MB = 2.0
+
+
+def parse_size(spec):
+    """Converte "ANOSxGRUPOSxMÉTRICAS" (ex.: 5x30x12) em uma tupla de inteiros."""
+    try:
+        years, groups, metrics = (int(part) for part in spec.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Tamanho inválido (esperado ANOSxGRUPOSxMÉTRICAS): {spec}")
+    return years, groups, metrics
+
+
+def measure(func, runs, before=None):
+    """Executa ``func`` ``runs`` vezes (mais uma com tracemalloc); retorna (resultado, mediana em s, pico em MB).
+
+    ``before`` é chamado antes de cada execução, fora da medição (ex.: esvaziar as tabelas).
+    """
+    times = []
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    if before:
+        before()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, statistics.median(times), peak / 1024 / 1024
+
+
+def stage_result(rows, seconds, peak_mb):
+    """Registro de uma etapa no JSON de resultados."""
+    return {
+        "linhas": rows,
+        "tempo_s": round(seconds, 6),
+        "linhas_por_s": round(rows / seconds, 1) if seconds > 0 else None,
+        "pico_memoria_mb": round(peak_mb, 3),
+    }
+
+
+def reset_tables(loader):
+    """Esvazia as tabelas do schema de benchmark e o cache de chaves do Loader (carga a partir do zero)."""
+    with loader.conn.begin():
+        loader.conn.exec_driver_sql(
+            "TRUNCATE fato_ida, dim_tempo, dim_grupo_economico, dim_servico, dim_metrica RESTART IDENTITY CASCADE"
+        )
+    loader.dim_key_cache.clear()
+
+
+def run_size(config, loader, size, formats, runs):
+    """Gera as planilhas de um tamanho e mede cada etapa; retorna o dicionário de resultados do tamanho."""
+    years, groups, metrics = size
+    extractor = Extractor(config)
+    transformer = Transformer(config)
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as directory:
+        files = ida_workbook.generate(directory, years, groups, metrics, formats)
+        size_mb = sum(os.path.getsize(path) for path in files) / 1024 / 1024
+        raw, read_s, read_mb = measure(lambda: extractor.read_ods_files(directory), runs)
+    sheet_rows = sum(len(df) for df in raw.values())
+    # Cópia a cada execução: com ETL_LOW_MEMORY o Transformer esvazia o dicionário recebido
+    transformed, transform_s, transform_mb = measure(lambda: transformer.transform_data(dict(raw)), runs)
+    if transformed is None:
+        raise SystemExit("A transformação das planilhas sintéticas falhou.")
+    fact_rows = len(transformed[-1])
+
+    stages = {
+        "leitura": stage_result(fact_rows, read_s, read_mb),
+        "transformacao": stage_result(fact_rows, transform_s, transform_mb),
+    }
+    if loader is not None:
+        def load():
+            if not loader.load_data(transformed):
+                raise SystemExit("A carga no schema de benchmark falhou.")
+
+        _, load_s, load_mb = measure(load, runs, before=lambda: reset_tables(loader))
+        stages["carga"] = stage_result(fact_rows, load_s, load_mb)
+        # Tabelas já carregadas com os mesmos dados: mede a recarga sem alterações
+        _, reload_s, reload_mb = measure(load, runs)
+        stages["carga_sem_alteracoes"] = stage_result(fact_rows, reload_s, reload_mb)
+
+    return {
+        "anos": years,
+        "grupos": groups,
+        "metricas": metrics,
+        "formatos": list(formats),
+        "arquivos": len(files),
+        "tamanho_arquivos_mb": round(size_mb, 3),
+        "linhas_planilha": sheet_rows,
+        "linhas_fato": fact_rows,
+        "etapas": stages,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Compara os resultados com a linha de base; retorna a lista de regressões (textos)."""
+    regressions = []
+    for size, result in results["tamanhos"].items():
+        base_size = baseline.get("tamanhos", {}).get(size)
+        if base_size is None:
+            print(f"{size}: sem linha de base para comparar.")
+            continue
+        for stage, current in result["etapas"].items():
+            base = base_size["etapas"].get(stage)
+            if base is None:
+                continue
+            if base.get("linhas_por_s") and current["linhas_por_s"] is not None:
+                ratio = current["linhas_por_s"] / base["linhas_por_s"]
+                status = "REGRESSÃO" if ratio < 1 - tolerance else "ok"
+                print(f"{size:>10} {stage:<22} vazão {current['linhas_por_s']:>12.0f} linhas/s "
+                      f"(base {base['linhas_por_s']:.0f}, {ratio - 1:+.0%}) {status}")
+                if status != "ok":
+                    regressions.append(f"{size}/{stage}: vazão {ratio - 1:+.0%}")
+            limit = base["pico_memoria_mb"] * (1 + tolerance) + MEMORY_SLACK_MB
+            if current["pico_memoria_mb"] > limit:
+                print(f"{size:>10} {stage:<22} memória {current['pico_memoria_mb']:.1f} MB "
+                      f"(base {base['pico_memoria_mb']:.1f} MB) REGRESSÃO")
+                regressions.append(f"{size}/{stage}: pico de memória {current['pico_memoria_mb']:.1f} MB "
+                                   f"(base {base['pico_memoria_mb']:.1f} MB)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[(5, 30, 12), (20, 30, 12)],
+                        help="Tamanhos ANOSxGRUPOSxMÉTRICAS (ex.: 5x30x12)")
+    parser.add_argument("--format", nargs="+", choices=sorted(ida_workbook.WRITERS), default=["ods"],
+                        help="Formatos dos arquivos gerados (alternados entre os arquivos)")
+    parser.add_argument("--runs", type=int, default=3, help="Execuções por etapa (é reportada a mediana)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON de linha de base para comparação")
+    parser.add_argument("--update-baseline", action="store_true", help="Grava os resultados como nova linha de base")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Variação tolerada (fração) antes de acusar regressão")
+    parser.add_argument("--skip-load", action="store_true", help="Não mede as etapas de carga (sem PostgreSQL)")
+    parser.add_argument("--output", help="Arquivo JSON de resultados (padrão: processed_ods/benchmarks/)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING) # Os logs por arquivo/etapa do ETL poluiriam a saída e o tempo medido
+
+    config = Config()
+    loader = None
+    if not args.skip_load:
+        # Todas as conexões do pool usam o schema de benchmark (as tabelas do Data Mart não são tocadas)
+        config.db_session_settings["search_path"] = BENCH_SCHEMA
+        config.db_wait_timeout = min(config.db_wait_timeout, 5)
+        loader = Loader(config)
+        if loader.wait_for_db() and loader.connect_db():
+            with loader.conn.begin():
+                init_schema(loader.conn, BENCH_SCHEMA)
+        else:
+            print("PostgreSQL indisponível: as etapas de carga não serão medidas.")
+            loader.close_db(dispose=True)
+            loader = None
+
+    results = {
+        "inicio": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "execucoes": args.runs,
+        "configuracao": {
+            "ods_reader_engine": config.ods_reader_engine,
+            "csv_delimiter": config.csv_delimiter,
+            "parse_workers": config.parse_workers,
+            "low_memory": config.low_memory,
+            "load_mode": config.load_mode,
+            "bulk_load_method": config.bulk_load_method,
+        },
+        "tamanhos": {},
+    }
+    print(f"{'tamanho':>10} {'etapa':<22} {'linhas':>10} {'tempo (s)':>10} {'linhas/s':>12} {'pico (MB)':>10}")
+    try:
+        for size in args.sizes:
+            # Formatos diferentes do padrão (ODS) entram na chave, para não comparar com a base de outro formato
+            key = "x".join(str(n) for n in size) + ("" if args.format == ["ods"] else "-" + "+".join(args.format))
+            result = results["tamanhos"][key] = run_size(config, loader, size, args.format, args.runs)
+            for stage, values in result["etapas"].items():
+                print(f"{key:>10} {stage:<22} {values['linhas']:>10} {values['tempo_s']:>10.3f} "
+                      f"{values['linhas_por_s']:>12.0f} {values['pico_memoria_mb']:>10.1f}")
+    finally:
+        if loader is not None:
+            with loader.conn.begin():
+                loader.conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            loader.close_db(dispose=True)
+
+    output = args.output or os.path.join(
+        config.processed_path, "benchmarks", f"bench_suite_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Linha de base atualizada: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressões acima da tolerância de {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            raise SystemExit(1)
+        print(f"Nenhuma regressão acima da tolerância de {args.tolerance:.0%}.")
+    else:
+        print(f"Linha de base {args.baseline} inexistente; use --update-baseline para criá-la.")
+
+
+if __name__ == "__main__":
+    main()
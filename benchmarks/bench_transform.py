@@ -0,0 +1,89 @@
+"""Benchmark: tratamento de datas no Transformer (por cabeçalho vs. por linha).
+
+Compara ``Transformer.transform_data`` com a implementação anterior (melt +
+três chamadas a ``pd.to_datetime`` sobre todas as linhas) em planilhas
+sintéticas largas, no mesmo formato lido dos ODS.
+
+Uso: python benchmarks/bench_transform.py [--years 5 20] [--groups 50] [--metrics 12]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "etl_ida"))
+
+from main_etl import Config, Transformer  # noqa: E402
+
+
+def synthetic_sheet(years, groups, metrics, service="SMP", seed=42):
+    """Gera um DataFrame como o lido de um ODS: grupo, métrica e uma coluna por mês."""
+    rng = np.random.default_rng(seed)
+    months = [f"{2013 + y}-{m:02d}" for y in range(years) for m in range(1, 13)]
+    n_rows = groups * metrics
+    df = pd.DataFrame({
+        "GRUPO ECONÔMICO": np.repeat([f"GRUPO {g}" for g in range(groups)], metrics),
+        "VARIÁVEL": np.tile([f"Métrica {m}" for m in range(metrics)], groups),
+    })
+    values = pd.DataFrame(rng.uniform(0, 100, (n_rows, len(months))), columns=months)
+    df = pd.concat([df, values], axis=1)
+    df["servico_sigla"] = service
+    df["arquivo_origem"] = f"{service}_sintetico.ods"
+    return df
+
+
+def legacy_transform(raw_data_dict):
+    """Implementação anterior da transformação (referência do benchmark)."""
+    all_transformed_dfs = []
+    for df_raw in raw_data_dict.values():
+        df_raw = df_raw.rename(columns={df_raw.columns[0]: "grupo_economico", df_raw.columns[1]: "metrica_nome"})
+        df_raw = df_raw.dropna(subset=["grupo_economico", "metrica_nome"])
+        date_cols = [c for c in df_raw.columns if isinstance(c, str) and len(c) == 7 and c[4] in "-/"]
+        df_melted = df_raw.melt(id_vars=["grupo_economico", "metrica_nome", "servico_sigla", "arquivo_origem"],
+                                value_vars=date_cols, var_name="ano_mes_raw", value_name="valor")
+        df_melted["ano_mes"] = pd.to_datetime(df_melted["ano_mes_raw"], errors="coerce").dt.strftime("%Y-%m")
+        df_melted = df_melted.dropna(subset=["ano_mes"])
+        df_melted["ano"] = pd.to_datetime(df_melted["ano_mes"]).dt.year
+        df_melted["mes"] = pd.to_datetime(df_melted["ano_mes"]).dt.month
+        df_melted["valor"] = pd.to_numeric(df_melted["valor"], errors="coerce")
+        df_transformed = df_melted[["ano", "mes", "ano_mes", "grupo_economico", "servico_sigla", "metrica_nome", "valor"]].copy()
+        df_transformed["grupo_economico"] = df_transformed["grupo_economico"].astype(str).str.strip()
+        df_transformed["metrica_nome"] = df_transformed["metrica_nome"].astype(str).str.strip()
+        all_transformed_dfs.append(df_transformed)
+    return pd.concat(all_transformed_dfs, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--groups", type=int, default=50)
+    parser.add_argument("--metrics", type=int, default=12)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    transformer = Transformer(Config())
+    print(f"{'anos':>5} {'linhas':>10} {'anterior (s)':>13} {'atual (s)':>10} {'ganho':>7} {'MB ant.':>8} {'MB atual':>9}")
+    for years in args.years:
+        raw = {s: synthetic_sheet(years, args.groups, args.metrics, service=s) for s in ("SCM", "SMP", "STFC")}
+
+        start = time.perf_counter()
+        legacy = legacy_transform({s: df.copy() for s, df in raw.items()})
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        current = transformer.transform_data({s: df.copy() for s, df in raw.items()})[-1]
+        current_time = time.perf_counter() - start
+
+        legacy_mb = legacy[current.columns].memory_usage(deep=True).sum() / 1024 / 1024
+        current_mb = current.memory_usage(deep=True).sum() / 1024 / 1024
+        print(f"{years:>5} {len(legacy):>10} {legacy_time:>13.3f} {current_time:>10.3f} "
+              f"{legacy_time / current_time:>6.1f}x {legacy_mb:>8.1f} {current_mb:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
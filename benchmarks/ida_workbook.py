@@ -0,0 +1,178 @@
+"""Gerador de planilhas sintéticas no layout dos arquivos do IDA publicados pela Anatel.
+
+Escreve um arquivo por serviço e ano (``{SERVIÇO}{ANO}.ods``, ``.csv`` ou
+``.xlsx``) com as 8 linhas de cabeçalho (título, serviço, período, fonte...), a linha
+de títulos (GRUPO ECONÔMICO, VARIÁVEL e uma coluna ``YYYY-MM`` por mês) e
+uma linha por grupo econômico e métrica, como nos arquivos de downloaded_ods/.
+Os primeiros grupos e métricas usam os nomes reais; os demais recebem nomes
+sintéticos. Uma fração dos valores fica vazia, como nos dados publicados.
+O formato ``parquet`` grava o snapshot da planilha já lida (títulos e dados,
+sem as linhas de cabeçalho).
+
+Uso: python benchmarks/ida_workbook.py DIRETORIO [--years 5] [--groups 30] [--metrics 12] [--format ods csv xlsx parquet]
+"""
+import argparse
+import csv
+import os
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+SERVICES = {"SCM": "BANDA LARGA FIXA", "SMP": "TELEFONIA MÓVEL", "STFC": "TELEFONIA FIXA"}
+GROUPS = ["ALGAR", "CLARO", "EMBRATEL", "NET", "NEXTEL", "OI", "SERCOMTEL", "SKY", "TIM", "VIVO"]
+METRICS = [
+    "Indicador de Desempenho no Atendimento (IDA)",
+    "Índice de Reclamações",
+    "Quantidade de acessos em serviço",
+    "Quantidade de reabertas",
+    "Quantidade de reclamações",
+    "Quantidade de Reclamações no Período",
+    "Quantidade de Respondidas",
+    "Quantidade de Sol. Respondidas em até 5 dias",
+    "Quantidade de Sol. Respondidas no Período",
+    "Taxa de Reabertas",
+    "Taxa de Respondidas em 5 dias Úteis",
+    "Taxa de Respondidas no Período",
+]
+FIRST_YEAR = 2013
+
+_ODS_MIMETYPE = "application/vnd.oasis.opendocument.spreadsheet"
+_ODS_MANIFEST = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">'
+    f'<manifest:file-entry manifest:full-path="/" manifest:media-type="{_ODS_MIMETYPE}"/>'
+    '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+    '<manifest:file-entry manifest:full-path="styles.xml" manifest:media-type="text/xml"/>'
+    "</manifest:manifest>"
+)
+_ODS_NAMESPACES = (
+    'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2"'
+)
+_ODS_STYLES = f'<?xml version="1.0" encoding="UTF-8"?><office:document-styles {_ODS_NAMESPACES}/>'
+
+
+def names(real, count, prefix):
+    """Os ``count`` primeiros nomes reais, completados com nomes sintéticos."""
+    return real[:count] + [f"{prefix} {i}" for i in range(max(0, count - len(real)))]
+
+
+def header_rows(service, year):
+    """As 8 linhas que antecedem a linha de títulos nos arquivos da Anatel."""
+    return [
+        ["HISTÓRICO DE RESULTADOS DO ÍNDICE DE DESEMPENHO NO ATENDIMENTO (IDA)"],
+        [f"SERVIÇO: {SERVICES.get(service, service)}"],
+        [f"PERÍODO: JAN/{year} a DEZ/{year}", None, None, None, None, year],
+        [],
+        ["FONTE: Relatórios do IDA gerados pela Superintendência de Relações com Consumidores"],
+        [],
+        ["Para maiores informações sobre o cálculo do IDA, favor acessar http://www.anatel.gov.br/consumidor/"],
+        [],
+    ]
+
+
+def sheet_rows(service, year, groups, metrics, rng, null_fraction=0.05):
+    """Todas as linhas de uma planilha (cabeçalho, títulos e dados); valores vazios são None."""
+    months = [f"{year}-{m:02d}" for m in range(1, 13)]
+    rows = header_rows(service, year)
+    rows.append(["GRUPO ECONÔMICO", "VARIÁVEL"] + months)
+    values = rng.uniform(0, 100, (len(groups) * len(metrics), len(months))).round(6)
+    missing = rng.random(values.shape) < null_fraction
+    for i, (group, metric) in enumerate((g, m) for g in groups for m in metrics):
+        rows.append([group, metric] + [None if missing[i, j] else float(values[i, j]) for j in range(len(months))])
+    return rows
+
+
+def _ods_cell(value):
+    """Célula do content.xml: número (float), texto ou vazia."""
+    if value is None:
+        return "<table:table-cell/>"
+    if isinstance(value, (int, float)):
+        return f'<table:table-cell office:value-type="float" office:value="{value!r}"><text:p>{value}</text:p></table:table-cell>'
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(str(value))}</text:p></table:table-cell>'
+
+
+def write_ods(path, rows, sheet_name="IDA"):
+    """Grava as linhas como uma planilha ODS (mimetype sem compressão e em primeiro, como exige o formato)."""
+    body = "".join(
+        "<table:table-row>" + "".join(_ods_cell(value) for value in row) + "</table:table-row>"
+        if row else '<table:table-row><table:table-cell/></table:table-row>'
+        for row in rows
+    )
+    content = (
+        f'<?xml version="1.0" encoding="UTF-8"?><office:document-content {_ODS_NAMESPACES}>'
+        f'<office:body><office:spreadsheet><table:table table:name="{escape(sheet_name)}">{body}'
+        "</table:table></office:spreadsheet></office:body></office:document-content>"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as ods:
+        ods.writestr("mimetype", _ODS_MIMETYPE, compress_type=zipfile.ZIP_STORED)
+        ods.writestr("META-INF/manifest.xml", _ODS_MANIFEST)
+        ods.writestr("styles.xml", _ODS_STYLES)
+        ods.writestr("content.xml", content)
+
+
+def write_csv(path, rows):
+    """Grava as linhas como CSV (UTF-8, separador vírgula, ponto decimal), com o mesmo cabeçalho do ODS."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(["" if value is None else value for value in row] for row in rows)
+
+
+def write_xlsx(path, rows):
+    """Grava as linhas como XLSX (openpyxl em modo de escrita em streaming)."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("IDA")
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def write_parquet(path, rows, header_skip=8):
+    """Grava o snapshot Parquet da planilha: a linha de títulos como colunas e os dados, sem o cabeçalho da Anatel."""
+    import pandas as pd
+
+    columns = rows[header_skip]
+    pd.DataFrame(rows[header_skip + 1:], columns=columns).to_parquet(path, index=False)
+
+
+WRITERS = {"ods": write_ods, "csv": write_csv, "xlsx": write_xlsx, "parquet": write_parquet}
+
+
+def generate(directory, years, groups, metrics, formats=("ods",), services=tuple(SERVICES), null_fraction=0.05, seed=42):
+    """Gera ``years`` anos de planilhas (um arquivo por serviço, ano e formato); retorna os caminhos gravados.
+
+    Os formatos se alternam entre os arquivos quando mais de um é pedido,
+    gerando um diretório misto (cada serviço/ano aparece uma única vez).
+    """
+    rng = np.random.default_rng(seed)
+    group_names = names(GROUPS, groups, "GRUPO")
+    metric_names = names(METRICS, metrics, "Métrica")
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index, (year, service) in enumerate((FIRST_YEAR + y, s) for y in range(years) for s in services):
+        fmt = formats[index % len(formats)]
+        path = os.path.join(directory, f"{service}{year}.{fmt}")
+        WRITERS[fmt](path, sheet_rows(service, year, group_names, metric_names, rng, null_fraction))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--groups", type=int, default=30)
+    parser.add_argument("--metrics", type=int, default=12)
+    parser.add_argument("--format", nargs="+", choices=sorted(WRITERS), default=["ods"])
+    parser.add_argument("--null-fraction", type=float, default=0.05)
+    args = parser.parse_args()
+
+    paths = generate(args.directory, args.years, args.groups, args.metrics, args.format, null_fraction=args.null_fraction)
+    print(f"{len(paths)} arquivos gravados em {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
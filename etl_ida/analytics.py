@@ -0,0 +1,202 @@
+"""Cálculo das variações mensais do IDA em memória, sobre um cubo NumPy denso.
+
+``IdaCube`` guarda os valores da fato num array (tempo, grupo, serviço,
+métrica), montado a partir da saída do ``Transformer``, do banco ou de um
+snapshot ``.npz``. As médias, o LAG e as diferenças de
+``v_taxa_variacao_resolvidas_5d`` são reproduzidos como operações vetorizadas
+para qualquer métrica (ou todas de uma vez) e qualquer subconjunto de serviços.
+
+Semântica igual à da view: a média de cada grupo no mês considera todas as
+linhas existentes da métrica (valores nulos são ignorados, como no AVG), o
+LAG usa o mês anterior *existente* e variações indefinidas (sem mês anterior,
+valor nulo ou divisão por zero) valem 0, como o ``COALESCE(..., 0)``.
+"""
+import numpy as np
+import pandas as pd
+
+# Eixos do cubo: (coluna da fato sem IDs, tabela da dimensão, chave, valor)
+AXES = (
+    ("ano_mes", "dim_tempo", "id_tempo", "ano_mes"),
+    ("grupo_economico", "dim_grupo_economico", "id_grupo", "nome"),
+    ("servico_sigla", "dim_servico", "id_servico", "sigla"),
+    ("metrica_nome", "dim_metrica", "id_metrica", "nome"),
+)
+
+
+def _previous_existing(values, exists):
+    """Valor da entrada existente anterior ao longo do eixo 0 (LAG sobre as linhas existentes); NaN se não houver."""
+    n = values.shape[0]
+    positions = np.arange(n).reshape((n,) + (1,) * (values.ndim - 1))
+    last_existing = np.maximum.accumulate(np.where(exists, positions, -1), axis=0)
+    previous = np.concatenate([np.full((1,) + values.shape[1:], -1), last_existing[:-1]], axis=0)
+    lagged = np.take_along_axis(values, np.maximum(previous, 0), axis=0)
+    return np.where(previous >= 0, lagged, np.nan)
+
+
+def _variation(current, previous):
+    """Variação percentual (atual - anterior) / anterior * 100, com 0 quando indefinida."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = (current - previous) / np.where(previous == 0, np.nan, previous) * 100
+    return np.where(np.isnan(rate), 0.0, rate)
+
+
+def _nanmean(values, mask, axis):
+    """Média dos valores não nulos onde ``mask``; NaN onde não há nenhum (como o AVG do SQL)."""
+    valid = mask & ~np.isnan(values)
+    total = np.where(valid, values, 0.0).sum(axis=axis)
+    count = valid.sum(axis=axis)
+    with np.errstate(invalid="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+class IdaCube:
+    """Cubo denso (tempo, grupo, serviço, métrica) com os valores da fato do IDA."""
+    def __init__(self, months, groups, services, metrics, values, present):
+        """Inicializa o cubo a partir dos eixos e dos arrays de valores e de presença (linha existente na fato)."""
+        self.months = list(months)
+        self.groups = list(groups)
+        self.services = list(services)
+        self.metrics = list(metrics)
+        self.values = values
+        self.present = present
+
+    @classmethod
+    def from_frame(cls, fact, months=None, groups=None, services=None, metrics=None):
+        """Monta o cubo a partir de um DataFrame com ano_mes, grupo_economico, servico_sigla, metrica_nome e valor.
+
+        Os eixos, se não informados, são os valores distintos (ordenados) de cada coluna.
+        """
+        axes = []
+        codes = []
+        for (column, _, _, _), axis in zip(AXES, (months, groups, services, metrics)):
+            values = fact[column].astype(str)
+            axis = sorted(values.unique()) if axis is None else list(axis)
+            axes.append(axis)
+            codes.append(pd.Categorical(values, categories=axis).codes)
+        return cls._from_codes(axes, codes, fact["valor"])
+
+    @classmethod
+    def _from_codes(cls, axes, codes, valor):
+        """Preenche o cubo a partir das posições (códigos) de cada linha em cada eixo; códigos -1 são descartados."""
+        codes = np.stack(codes)
+        keep = (codes >= 0).all(axis=0)
+        shape = tuple(len(axis) for axis in axes)
+        values = np.full(shape, np.nan)
+        present = np.zeros(shape, dtype=bool)
+        index = tuple(codes[:, keep])
+        values[index] = pd.to_numeric(valor, errors="coerce").to_numpy(dtype="float64")[keep]
+        present[index] = True
+        return cls(*axes, values, present)
+
+    @classmethod
+    def from_transformed(cls, transformed):
+        """Monta o cubo a partir da saída do ``Transformer.transform_data`` (dimensões + fato sem IDs)."""
+        dim_tempo, dim_grupo, dim_servico, dim_metrica, fato_ida = transformed
+        return cls.from_frame(
+            fato_ida,
+            months=sorted(dim_tempo["ano_mes"].astype(str)),
+            groups=sorted(dim_grupo["nome"].astype(str).str.strip()),
+            services=sorted(dim_servico["sigla"].astype(str)),
+            metrics=sorted(dim_metrica["nome"].astype(str).str.strip()),
+        )
+
+    @classmethod
+    def from_database(cls, conn):
+        """Monta o cubo a partir das tabelas do Data Mart (conexão SQLAlchemy).
+
+        A fato é lida só com os IDs, convertidos em posições nos eixos pelas
+        dimensões (pequenas), sem junções nem textos repetidos por linha.
+        """
+        from sqlalchemy import text
+
+        fact = pd.read_sql(text(
+            "SELECT id_tempo, id_grupo, id_servico, id_metrica, CAST(valor AS DOUBLE PRECISION) AS valor FROM fato_ida;"
+        ), conn)
+        axes = []
+        codes = []
+        for _, table, key_col, value_col in AXES:
+            dim = pd.read_sql(text(f"SELECT {key_col}, {value_col} FROM {table};"), conn)
+            dim = dim.sort_values(value_col, ignore_index=True)
+            axes.append(dim[value_col].astype(str).tolist())
+            # Posição de cada ID no eixo ordenado (IDs ausentes da dimensão viram -1)
+            positions = np.full(int(dim[key_col].max()) + 2 if len(dim) else 1, -1)
+            positions[dim[key_col].to_numpy()] = np.arange(len(dim))
+            ids = fact[key_col].to_numpy()
+            codes.append(positions[np.clip(ids, 0, len(positions) - 1)])
+        return cls._from_codes(axes, codes, fact["valor"])
+
+    def save(self, path):
+        """Grava um snapshot do cubo (``.npz``, sem pickle)."""
+        np.savez(path, values=self.values, present=self.present,
+                 months=np.array(self.months, dtype=str), groups=np.array(self.groups, dtype=str),
+                 services=np.array(self.services, dtype=str), metrics=np.array(self.metrics, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        """Carrega um snapshot gravado por ``save``."""
+        with np.load(path) as data:
+            return cls(data["months"].tolist(), data["groups"].tolist(), data["services"].tolist(),
+                       data["metrics"].tolist(), data["values"], data["present"])
+
+    def _select(self, metrics=None, services=None):
+        """Recorta o cubo nas métricas e serviços pedidos; retorna (nomes das métricas, valores, presença)."""
+        metrics = self.metrics if metrics is None else [metrics] if isinstance(metrics, str) else list(metrics)
+        services = self.services if services is None else [services] if isinstance(services, str) else list(services)
+        missing = [m for m in metrics if m not in self.metrics] + [s for s in services if s not in self.services]
+        if missing:
+            raise KeyError(f"Métricas/serviços inexistentes no cubo: {missing}")
+        metric_idx = [self.metrics.index(m) for m in metrics]
+        service_idx = [self.services.index(s) for s in services]
+        values = self.values[:, :, service_idx][..., metric_idx]
+        present = self.present[:, :, service_idx][..., metric_idx]
+        return metrics, values, present
+
+    def compute(self, metrics=None, services=None):
+        """Calcula médias e variações para as métricas pedidas (todas por padrão).
+
+        Retorna um dicionário de arrays: ``media_grupo``, ``taxa_variacao_individual``
+        e ``diferenca_variacao`` com forma (tempo, grupo, métrica); ``media_geral`` e
+        ``taxa_variacao_media_geral`` com forma (tempo, métrica); as máscaras
+        ``existe_grupo`` e ``existe_mes``; e os nomes das ``metricas``.
+        """
+        metrics, values, present = self._select(metrics, services)
+        group_exists = present.any(axis=2) # (tempo, grupo, métrica)
+        month_exists = group_exists.any(axis=1) # (tempo, métrica)
+        group_mean = _nanmean(values, present, axis=2)
+        general_mean = _nanmean(group_mean, group_exists, axis=1)
+        general_rate = _variation(general_mean, _previous_existing(general_mean, month_exists))
+        group_rate = _variation(group_mean, _previous_existing(group_mean, group_exists))
+        return {
+            "metricas": metrics,
+            "existe_grupo": group_exists,
+            "existe_mes": month_exists,
+            "media_grupo": group_mean,
+            "media_geral": general_mean,
+            "taxa_variacao_media_geral": general_rate,
+            "taxa_variacao_individual": group_rate,
+            "diferenca_variacao": group_rate - general_rate[:, None, :],
+        }
+
+    def variation(self, metrics=None, services=None):
+        """Resultado em formato longo (uma linha por métrica, mês e grupo existentes)."""
+        result = self.compute(metrics, services)
+        t, g, m = np.nonzero(result["existe_grupo"])
+        return pd.DataFrame({
+            "metrica_nome": np.asarray(result["metricas"], dtype=object)[m],
+            "ano_mes": np.asarray(self.months, dtype=object)[t],
+            "grupo_economico": np.asarray(self.groups, dtype=object)[g],
+            "valor_medio_grupo": result["media_grupo"][t, g, m],
+            "taxa_variacao_individual": result["taxa_variacao_individual"][t, g, m],
+            "taxa_variacao_media_geral": result["taxa_variacao_media_geral"][t, m],
+            "diferenca_variacao": result["diferenca_variacao"][t, g, m],
+        }).sort_values(["metrica_nome", "ano_mes", "grupo_economico"], ignore_index=True)
+
+    def pivot(self, metric, services=None, decimals=2):
+        """Equivalente a ``v_taxa_variacao_resolvidas_5d`` para uma métrica: um mês por linha e um grupo por coluna."""
+        result = self.compute([metric], services)
+        month_exists = result["existe_mes"][:, 0]
+        diff = np.where(result["existe_grupo"][..., 0], result["diferenca_variacao"][..., 0], np.nan)[month_exists]
+        pivot = pd.DataFrame(diff.round(decimals), columns=self.groups)
+        pivot.insert(0, "Taxa de Variação Média", result["taxa_variacao_media_geral"][month_exists, 0].round(decimals))
+        pivot.insert(0, "Mes", np.asarray(self.months, dtype=object)[month_exists])
+        return pivot
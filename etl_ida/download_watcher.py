@@ -0,0 +1,120 @@
+"""Acompanhamento de downloads do navegador no diretório de destino.
+
+O navegador grava o arquivo como parcial (``.crdownload`` no Edge/Chrome,
+``.part`` no Firefox) e o renomeia ao terminar. Um download é considerado
+concluído quando surge no diretório um arquivo novo (ou modificado), que não
+é parcial, não tem parcial correspondente e cujo tamanho parou de crescer.
+Cada download esperado tem o seu próprio prazo, contado a partir do clique.
+Com downloads simultâneos, cada arquivo concluído é associado ao download
+pelo nome esperado (o do link clicado, ver ``expected_filename``).
+"""
+import logging
+import os
+import re
+import time
+from urllib.parse import unquote, urlsplit
+
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".partial", ".tmp", ".download")
+
+
+def _is_partial(name):
+    """Indica se o nome corresponde a um arquivo temporário de download."""
+    return name.startswith(".") or name.lower().endswith(PARTIAL_SUFFIXES)
+
+
+def expected_filename(url):
+    """Nome com que o navegador grava o arquivo do link (último segmento do caminho), ou None se não houver extensão."""
+    name = os.path.basename(unquote(urlsplit(url or "").path))
+    return name if os.path.splitext(name)[1] else None
+
+
+def _matches(name, expected):
+    """Indica se ``name`` é o arquivo esperado, inclusive com o sufixo " (1)" usado pelo navegador para nomes repetidos."""
+    stem, ext = os.path.splitext(expected)
+    return name == expected or re.fullmatch(rf"{re.escape(stem)} \(\d+\){re.escape(ext)}", name) is not None
+
+
+class DownloadWatcher:
+    """Observa um diretório e associa os arquivos concluídos aos downloads esperados."""
+    def __init__(self, directory, timeout, stable_seconds=1.0, poll_interval=0.2):
+        """Registra o estado atual do diretório; arquivos já existentes e inalterados são ignorados."""
+        self.directory = directory
+        self.timeout = timeout
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self.pending = [] # (rótulo, instante do início, nome de arquivo esperado ou None), em ordem de início
+        self.completed = [] # (rótulo, caminho)
+        self.timed_out = [] # rótulos
+        self._known = self._snapshot()
+        self._growing = {} # nome -> (tamanho, mtime, instante da última mudança)
+
+    def _snapshot(self):
+        """Tamanho e data de modificação de cada arquivo do diretório."""
+        entries = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries[entry.name] = (stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def expect(self, label, filename=None):
+        """Registra um download recém-iniciado; ``filename`` é o nome esperado do arquivo, se conhecido."""
+        self.pending.append((label, time.monotonic(), filename))
+
+    def _take_pending(self, name):
+        """Remove e retorna o download pendente do arquivo ``name``, ou None se nenhum o esperava.
+
+        Downloads sem nome esperado recebem, em ordem de início, os arquivos que
+        não correspondem a nenhum nome esperado.
+        """
+        for i, (_, _, expected) in enumerate(self.pending):
+            if expected is not None and _matches(name, expected):
+                return self.pending.pop(i)
+        for i, (_, _, expected) in enumerate(self.pending):
+            if expected is None:
+                return self.pending.pop(i)
+        return None
+
+    def _poll(self):
+        """Verifica o diretório uma vez, registrando downloads concluídos e prazos esgotados."""
+        now = time.monotonic()
+        current = self._snapshot()
+        partial_stems = {os.path.splitext(name)[0] for name in current if _is_partial(name)}
+        for name, state in sorted(current.items(), key=lambda item: item[1][1]):
+            if self._known.get(name) == state or _is_partial(name):
+                continue
+            size, mtime = state
+            previous = self._growing.get(name)
+            if previous is None or previous[:2] != state:
+                self._growing[name] = (size, mtime, now)
+                continue
+            # Concluído: sem parcial correspondente e sem mudanças há stable_seconds
+            if size > 0 and name not in partial_stems and now - previous[2] >= self.stable_seconds:
+                self._known[name] = state
+                del self._growing[name]
+                entry = self._take_pending(name)
+                if entry is not None:
+                    label, started, _ = entry
+                    logging.info(f"Download de {label} concluído: {name} ({size} bytes em {now - started:.1f}s).")
+                else:
+                    label = None
+                    logging.info(f"Arquivo {name} concluído no diretório de download (não corresponde a nenhum download esperado).")
+                self.completed.append((label, os.path.join(self.directory, name)))
+
+        expired = [entry for entry in self.pending if now - entry[1] > self.timeout]
+        for entry in expired:
+            self.pending.remove(entry)
+            logging.warning(f"Tempo esgotado ({self.timeout}s) aguardando o download de {entry[0]}.")
+            self.timed_out.append(entry[0])
+
+    def wait(self, max_pending=0):
+        """Aguarda até restarem no máximo ``max_pending`` downloads pendentes; retorna os concluídos até agora."""
+        while len(self.pending) > max_pending:
+            self._poll()
+            if len(self.pending) > max_pending:
+                time.sleep(self.poll_interval)
+        return list(self.completed)
@@ -0,0 +1,206 @@
+"""Download dos arquivos de entrada sem navegador.
+
+As URLs dos recursos são resolvidas uma única vez: pela API CKAN do portal
+(``package_show``), quando configurada, ou pelo HTML da página do conjunto de
+dados (``li.resource-item`` com ``h3.heading`` e o link do recurso). Os
+arquivos são baixados em paralelo por um pool de conexões HTTP (urllib3),
+com requisições condicionais (``If-None-Match`` / ``If-Modified-Since``):
+arquivos inalterados no servidor não são baixados de novo.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import unquote, urljoin, urlsplit
+
+import urllib3
+
+STATE_FILE = ".download_state.json"
+
+
+def resource_title(service, year):
+    """Título esperado do recurso de um serviço e ano."""
+    return f"Índice de Desempenho no Atendimento - {service} - {year}"
+
+
+def target_filename(service, year, url):
+    """Nome do arquivo baixado: ``{SERVIÇO}{ANO}`` com a extensão do recurso (``.ods`` se a URL não tiver uma)."""
+    extension = os.path.splitext(unquote(urlsplit(url).path))[1].lower()
+    return f"{service}{year}{extension or '.ods'}"
+
+
+class _ResourceListParser(HTMLParser):
+    """Extrai (título, link) de cada ``li.resource-item`` da página do conjunto de dados."""
+    def __init__(self):
+        super().__init__()
+        self.resources = []
+        self._depth = 0 # Profundidade de <li> dentro do item atual (0 = fora de um item)
+        self._in_heading = False
+        self._title = []
+        self._links = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "li":
+            if self._depth:
+                self._depth += 1
+            elif "resource-item" in classes:
+                self._depth, self._title, self._links = 1, [], []
+        elif self._depth and tag == "h3" and "heading" in classes:
+            self._in_heading = True
+        elif self._depth and tag == "a" and attrs.get("href"):
+            self._links.append((attrs["href"], classes))
+
+    def handle_endtag(self, tag):
+        if tag == "h3":
+            self._in_heading = False
+        elif tag == "li" and self._depth:
+            self._depth -= 1
+            if not self._depth:
+                # Prefere o botão principal ("Acessar o recurso"); senão, o primeiro link do item
+                primary = [href for href, classes in self._links if "btn-primary" in classes]
+                links = primary or [href for href, _ in self._links]
+                if links:
+                    self.resources.append((" ".join("".join(self._title).split()), links[0]))
+
+    def handle_data(self, data):
+        if self._in_heading:
+            self._title.append(data)
+
+
+class HttpFetcher:
+    """Resolve e baixa os recursos do conjunto de dados do IDA por HTTP."""
+    def __init__(self, download_dir, timeout=120, workers=3, ckan_api_url=None):
+        """Inicializa o pool de conexões e carrega o estado (ETag/Last-Modified) dos downloads anteriores."""
+        self.download_dir = download_dir
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.ckan_api_url = ckan_api_url
+        self.http = urllib3.PoolManager(
+            maxsize=self.workers,
+            timeout=urllib3.Timeout(connect=min(30, timeout), read=timeout),
+            retries=urllib3.Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+            headers={"User-Agent": "etl-ida-anatel"},
+        )
+        self.state_path = os.path.join(download_dir, STATE_FILE)
+        self.state = self._load_state()
+
+    def _load_state(self):
+        """Carrega os validadores HTTP gravados na última execução."""
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Estado de downloads inválido em {self.state_path}, ignorando: {e}")
+            return {}
+
+    def _save_state(self):
+        """Grava os validadores HTTP de forma atômica."""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _get_json(self, url, fields):
+        """Faz um GET e decodifica a resposta JSON."""
+        response = self.http.request("GET", url, fields=fields)
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status} em {url}")
+        return json.loads(response.data.decode("utf-8"))
+
+    def _list_resources(self, page_url):
+        """Lista (título, URL) dos recursos, pela API CKAN ou pelo HTML da página."""
+        if self.ckan_api_url:
+            dataset_id = page_url.rstrip("/").rsplit("/", 1)[-1]
+            payload = self._get_json(urljoin(self.ckan_api_url.rstrip("/") + "/", "action/package_show"), {"id": dataset_id})
+            return [(r.get("name") or "", r.get("url")) for r in payload["result"]["resources"] if r.get("url")]
+
+        response = self.http.request("GET", page_url)
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status} em {page_url}")
+        parser = _ResourceListParser()
+        parser.feed(response.data.decode("utf-8", errors="replace"))
+        return [(title, urljoin(page_url, href)) for title, href in parser.resources]
+
+    def resolve(self, page_url, targets):
+        """Resolve a URL de cada alvo ``{serviço: [anos]}``; retorna {(serviço, ano): url}."""
+        resources = self._list_resources(page_url)
+        logging.info(f"{len(resources)} recursos encontrados em {page_url}.")
+        resolved = {}
+        for service, years in targets.items():
+            for year in years:
+                expected = resource_title(service, year)
+                url = next((url for title, url in resources if expected in title), None)
+                if url:
+                    resolved[(service, year)] = url
+                else:
+                    logging.warning(f"Recurso para {service} {year} não encontrado.")
+        return resolved
+
+    def _fetch(self, service, year, url):
+        """Baixa um recurso com requisição condicional; retorna "baixado", "inalterado" ou "falha"."""
+        filename = target_filename(service, year, url)
+        file_path = os.path.join(self.download_dir, filename)
+        previous = self.state.get(url, {})
+        headers = dict(self.http.headers)
+        if os.path.exists(file_path) and previous.get("arquivo") == filename:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+
+        try:
+            response = self.http.request("GET", url, headers=headers, preload_content=False)
+            try:
+                if response.status == 304:
+                    logging.info(f"{service} {year} inalterado no servidor (HTTP 304), mantendo {filename}.")
+                    return "inalterado", None
+                if response.status != 200:
+                    logging.warning(f"Falha ao baixar {service} {year}: HTTP {response.status} em {url}.")
+                    return "falha", None
+                # Grava num arquivo parcial e renomeia ao final: leitores nunca veem um arquivo pela metade
+                part_path = f"{file_path}.part"
+                size = 0
+                try:
+                    with open(part_path, "wb") as f:
+                        for chunk in response.stream(1024 * 1024):
+                            f.write(chunk)
+                            size += len(chunk)
+                    os.replace(part_path, file_path)
+                except BaseException:
+                    # Download interrompido: não deixa o parcial para trás
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    raise
+            finally:
+                response.release_conn()
+        except Exception as e:
+            logging.warning(f"Falha ao baixar {service} {year} de {url}: {e}")
+            return "falha", None
+
+        logging.info(f"{service} {year} baixado: {filename} ({size} bytes).")
+        return "baixado", {
+            "arquivo": filename,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    def download(self, page_url, targets):
+        """Baixa em paralelo os alvos ``{serviço: [anos]}``; retorna a contagem por resultado."""
+        resolved = self.resolve(page_url, targets)
+        counts = {"baixado": 0, "inalterado": 0, "falha": len(
+            [1 for service, years in targets.items() for year in years if (service, year) not in resolved]
+        )}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="etl-download") as executor:
+            futures = {executor.submit(self._fetch, service, year, url): url for (service, year), url in resolved.items()}
+            for future, url in futures.items():
+                result, validators = future.result()
+                counts[result] += 1
+                if validators is not None:
+                    self.state[url] = validators
+        self._save_state()
+        return counts
@@ -0,0 +1,35 @@
+"""Manifesto dos arquivos já carregados no Data Mart.
+
+Cada arquivo ingerido é registrado na tabela ``etl_arquivo_ingerido`` com o
+hash do conteúdo, tamanho, data de modificação, serviço, intervalo de
+períodos e o momento da carga. Antes de ler um diretório, o ETL compara os
+arquivos com o manifesto e processa apenas os novos ou alterados. O hash só é
+recalculado quando o tamanho ou a data de modificação mudam.
+"""
+import os
+
+from parse_cache import file_sha256
+
+
+def changed_files(directory, filenames, manifest, reader_version):
+    """Retorna ``{arquivo: entrada}`` dos arquivos novos ou alterados em relação ao manifesto.
+
+    Com um manifesto vazio, todos os arquivos são retornados (ex.: ``--force``).
+    Um arquivo também é considerado alterado se a versão do leitor mudou.
+    """
+    changed = {}
+    for filename in filenames:
+        file_path = os.path.join(directory, filename)
+        stat = os.stat(file_path)
+        entry = {"tamanho": stat.st_size, "modificado_ns": stat.st_mtime_ns, "versao_leitura": reader_version}
+        previous = manifest.get(filename)
+        if previous and previous["versao_leitura"] == reader_version and previous["tamanho"] == stat.st_size:
+            if previous["modificado_ns"] == stat.st_mtime_ns:
+                continue
+            entry["sha256"] = file_sha256(file_path)
+            if entry["sha256"] == previous["sha256"]:
+                continue # Apenas a data de modificação mudou (ex.: arquivo baixado de novo)
+        else:
+            entry["sha256"] = file_sha256(file_path)
+        changed[filename] = entry
+    return changed
@@ -0,0 +1,150 @@
+"""Leitores dos arquivos de entrada do ETL, escolhidos pela extensão do arquivo.
+
+Cada leitor devolve o mesmo DataFrame que o leitor de ODS: a linha de
+títulos (GRUPO ECONÔMICO, VARIÁVEL e uma coluna por mês) vira o nome das
+colunas e os valores numéricos ficam em float64. As colunas de serviço e
+arquivo de origem são acrescentadas depois pelo ``Extractor``, igual para
+todos os formatos. Assim um diretório pode misturar formatos numa mesma
+execução.
+
+- ``.ods``: leitor em streaming (ods_reader) ou ``pd.read_excel`` com odfpy;
+- ``.csv``: leitor CSV do pyarrow (multithread), ou ``pd.read_csv`` se o pyarrow não estiver instalado;
+- ``.xlsx``: openpyxl em modo somente leitura, linha a linha;
+- ``.parquet``: snapshot do DataFrame já lido (sem as linhas de cabeçalho), via pyarrow com memory map.
+
+Planilhas (ODS, CSV, XLSX) têm as ``header_skip`` linhas de cabeçalho da
+Anatel antes dos títulos. Novos formatos são registrados com ``register_reader``.
+"""
+import os
+
+import pandas as pd
+
+from ods_reader import frame_from_rows, read_ods
+
+READERS = {} # Extensão (minúscula, com ponto) -> função(file_path, settings) que devolve o DataFrame
+
+
+def register_reader(*extensions):
+    """Decorador que registra um leitor para as extensões indicadas."""
+    def decorator(func):
+        for extension in extensions:
+            READERS[extension.lower()] = func
+        return func
+    return decorator
+
+
+def reader_for(filename):
+    """Leitor registrado para a extensão do arquivo, ou None se o formato não é suportado."""
+    return READERS.get(os.path.splitext(filename)[1].lower())
+
+
+def read_input_file(file_path, settings):
+    """Lê um arquivo de entrada com o leitor da sua extensão.
+
+    ``settings`` são as configurações de leitura do ``Extractor`` (``engine``,
+    ``header_skip`` e as opções de CSV); precisam ser serializáveis, pois a
+    leitura pode ocorrer em outro processo.
+    """
+    reader = reader_for(file_path)
+    if reader is None:
+        raise ValueError(f"Formato de arquivo não suportado: {file_path}")
+    return reader(file_path, settings)
+
+
+def _numeric_as_float(df):
+    """Converte colunas inteiras e colunas totalmente vazias para float64, como no leitor de ODS."""
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_integer_dtype(series.dtype) or (series.dtype == object and series.isna().all()):
+            df[name] = series.astype("float64")
+    return df
+
+
+@register_reader(".ods")
+def read_ods_input(file_path, settings):
+    """Lê um ODS com o leitor configurado ("stream" ou "odf")."""
+    if settings["engine"] == "odf":
+        return pd.read_excel(file_path, engine="odf", header=settings["header_skip"])
+    return read_ods(file_path, header=settings["header_skip"])
+
+
+@register_reader(".csv")
+def read_csv_input(file_path, settings):
+    """Lê um CSV no layout das planilhas (cabeçalho da Anatel, títulos e dados)."""
+    delimiter = settings.get("csv_delimiter", ",")
+    decimal = settings.get("csv_decimal", ".")
+    encoding = settings.get("csv_encoding", "utf-8")
+    try:
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        df = pd.read_csv(file_path, skiprows=settings["header_skip"], sep=delimiter, decimal=decimal, encoding=encoding)
+        return _numeric_as_float(df)
+
+    table = pa_csv.read_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(skip_rows=settings["header_skip"], encoding=encoding),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        # Células vazias viram nulas também nas colunas de texto (como no ODS)
+        convert_options=pa_csv.ConvertOptions(decimal_point=decimal, strings_can_be_null=True),
+    )
+    return _numeric_as_float(table.to_pandas(split_blocks=True, self_destruct=True))
+
+
+def _xlsx_value(value):
+    """Normaliza um valor do openpyxl: números como float (o ODS não distingue inteiros) e texto vazio como nulo."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value == "":
+        return None
+    return value
+
+
+def _iter_xlsx_rows(rows):
+    """Linhas sem as células vazias ao final; linhas vazias só são emitidas se seguidas de uma com conteúdo."""
+    pending_empty_rows = 0
+    for row in rows:
+        values = [_xlsx_value(value) for value in row]
+        while values and values[-1] is None:
+            values.pop()
+        if not values:
+            pending_empty_rows += 1
+            continue
+        for _ in range(pending_empty_rows):
+            yield []
+        pending_empty_rows = 0
+        yield values
+
+
+@register_reader(".xlsx")
+def read_xlsx_input(file_path, settings):
+    """Lê a primeira planilha de um XLSX em modo somente leitura (as linhas são lidas sob demanda do XML)."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(min_row=settings["header_skip"] + 1, values_only=True)
+        return frame_from_rows(_iter_xlsx_rows(rows))
+    finally:
+        workbook.close()
+
+
+@register_reader(".parquet")
+def read_parquet_input(file_path, settings):
+    """Lê um snapshot Parquet do DataFrame (já sem as linhas de cabeçalho) com memory map."""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return _numeric_as_float(pd.read_parquet(file_path))
+    table = pq.read_table(file_path, memory_map=True)
+    # Colunas numéricas sem nulos são convertidas sem cópia; os buffers do Arrow são liberados na conversão
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    # Colunas de serviço/arquivo do snapshot são substituídas pelas do arquivo atual no Extractor
+    return _numeric_as_float(df.drop(columns=["servico_sigla", "arquivo_origem"], errors="ignore"))
+
+
+def supported_extensions():
+    """Extensões com leitor registrado."""
+    return tuple(sorted(READERS))
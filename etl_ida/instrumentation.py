@@ -0,0 +1,251 @@
+"""Instrumentação das etapas do ETL.
+
+``RunMetrics.stage(nome)`` é um gerenciador de contexto que registra, para a
+etapa, o tempo de parede, o tempo de CPU, as linhas de entrada/saída e a
+memória (RSS e, opcionalmente, o pico do tracemalloc). Etapas podem ser
+aninhadas e executadas em threads diferentes. Com a instrumentação
+desabilitada, ``stage`` devolve um objeto vazio compartilhado, sem custo
+perceptível.
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError: # Indisponível no Windows
+    resource = None
+
+
+def _peak_rss_mb():
+    """Pico de memória residente do processo até o momento, em MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _current_rss_mb():
+    """Memória residente atual do processo, em MB (apenas onde há /proc)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+def _cpu_time():
+    """Tempo de CPU da thread atual; na thread principal, do processo inteiro."""
+    if threading.current_thread() is threading.main_thread():
+        return time.process_time()
+    return time.thread_time()
+
+
+class _NullStage:
+    """Etapa vazia usada quando a instrumentação está desabilitada."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, rows_in=None, rows_out=None, **attrs):
+        """Descarta os valores (instrumentação desabilitada)."""
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Etapa instrumentada; linhas e atributos extras são informados dentro do bloco com ``set``."""
+    def __init__(self, metrics, name, rows_in, attrs):
+        self.metrics = metrics
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.attrs = dict(attrs)
+        self.path = name
+        self._traced_peak = 0
+
+    def set(self, rows_in=None, rows_out=None, **attrs):
+        """Informa as linhas de entrada/saída e atributos extras da etapa."""
+        if rows_in is not None:
+            self.rows_in = int(rows_in)
+        if rows_out is not None:
+            self.rows_out = int(rows_out)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.metrics._stack()
+        if stack:
+            self.path = f"{stack[-1].path}/{self.name}"
+        # Observadores chamados fora da medição (o trabalho deles não entra no tempo nem no pico da etapa)
+        for listener in self.metrics.listeners:
+            listener.stage_started(self)
+        if self.metrics.trace_memory:
+            # Guarda o pico parcial da etapa externa antes de zerar o pico para esta etapa
+            if stack:
+                stack[-1]._traced_peak = max(stack[-1]._traced_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self._rss_start = _current_rss_mb()
+        self._cpu_start = _cpu_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall_start
+        cpu = _cpu_time() - self._cpu_start
+        stack = self.metrics._stack()
+        stack.pop()
+        record = {
+            "etapa": self.path,
+            "inicio": self._wall_start - self.metrics.started,
+            "tempo_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "linhas_entrada": self.rows_in,
+            "linhas_saida": self.rows_out,
+            "rss_pico_mb": _peak_rss_mb(),
+            "thread": threading.current_thread().name,
+            "sucesso": exc_type is None,
+        }
+        rss_end = _current_rss_mb()
+        if rss_end is not None and self._rss_start is not None:
+            record["rss_delta_mb"] = round(rss_end - self._rss_start, 3)
+        if self.metrics.trace_memory:
+            peak = max(self._traced_peak, tracemalloc.get_traced_memory()[1])
+            record["tracemalloc_pico_mb"] = round(peak / 1024 / 1024, 3)
+            tracemalloc.reset_peak()
+            if stack:
+                stack[-1]._traced_peak = max(stack[-1]._traced_peak, peak)
+        if self.attrs:
+            record["atributos"] = self.attrs
+        self.metrics._add(record)
+        for listener in self.metrics.listeners:
+            listener.stage_finished(self, record)
+        return False
+
+
+class RunMetrics:
+    """Coletor de métricas de uma execução do ETL."""
+    def __init__(self, enabled=False, trace_memory=False):
+        """Inicializa o coletor.
+
+        ``trace_memory`` liga o tracemalloc (pico de alocações por etapa, mais
+        preciso porém mais caro; o pico é global ao processo, então só é
+        exato para etapas que não rodam em paralelo).
+        """
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc)
+        self.records = []
+        # Observadores das etapas (ex.: perfilamento de memória): objetos com stage_started(etapa) e
+        # stage_finished(etapa, registro), chamados na thread da etapa
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self):
+        """Pilha de etapas abertas na thread atual."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, record):
+        """Acrescenta o registro de uma etapa concluída."""
+        with self._lock:
+            self.records.append(record)
+
+    def stage(self, name, rows_in=None, **attrs):
+        """Gerenciador de contexto que instrumenta uma etapa."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, rows_in, attrs)
+
+    def report(self):
+        """Monta o relatório da execução (dicionário serializável em JSON)."""
+        with self._lock:
+            records = [dict(r, inicio=round(r["inicio"], 6)) for r in sorted(self.records, key=lambda r: r["inicio"])]
+        return {
+            "inicio_execucao": self.started_at.isoformat(),
+            "tempo_total_s": round(time.perf_counter() - self.started, 6),
+            "rss_pico_mb": _peak_rss_mb(),
+            "etapas": records,
+        }
+
+    def to_prometheus(self, report=None):
+        """Converte o relatório para o formato texto do Prometheus.
+
+        Etapas repetidas (ex.: uma carga por lote no streaming) são somadas por
+        nome, com a quantidade de execuções em ``ida_etl_stage_calls``.
+        """
+        report = report or self.report()
+        fields = (
+            ("ida_etl_stage_calls", None, "Quantidade de execuções da etapa."),
+            ("ida_etl_stage_seconds", "tempo_s", "Tempo de parede da etapa, em segundos."),
+            ("ida_etl_stage_cpu_seconds", "cpu_s", "Tempo de CPU da etapa, em segundos."),
+            ("ida_etl_stage_rows_in", "linhas_entrada", "Linhas recebidas pela etapa."),
+            ("ida_etl_stage_rows_out", "linhas_saida", "Linhas produzidas pela etapa."),
+        )
+        totals = {}
+        for record in report["etapas"]:
+            stage_totals = totals.setdefault(record["etapa"], {"calls": 0})
+            stage_totals["calls"] += 1
+            for _, field, _ in fields[1:]:
+                if record.get(field) is not None:
+                    stage_totals[field] = stage_totals.get(field, 0) + record[field]
+
+        lines = []
+        for metric, field, help_text in fields:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for stage, stage_totals in totals.items():
+                value = stage_totals["calls"] if field is None else stage_totals.get(field)
+                if value is None:
+                    continue
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric}{{stage="{label}"}} {value}')
+        lines.append("# HELP ida_etl_run_seconds Tempo total da execução, em segundos.")
+        lines.append("# TYPE ida_etl_run_seconds gauge")
+        lines.append(f"ida_etl_run_seconds {report['tempo_total_s']}")
+        if report["rss_pico_mb"] is not None:
+            lines.append("# HELP ida_etl_peak_rss_megabytes Pico de memória residente do processo, em MB.")
+            lines.append("# TYPE ida_etl_peak_rss_megabytes gauge")
+            lines.append(f"ida_etl_peak_rss_megabytes {report['rss_pico_mb']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory, prometheus=False):
+        """Grava o relatório JSON (e opcionalmente o arquivo .prom) no diretório indicado."""
+        if not self.enabled:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        report = self.report()
+        json_path = os.path.join(directory, "run_report.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        if prometheus:
+            with open(os.path.join(directory, "run_report.prom"), "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus(report))
+        logging.info(f"Relatório de métricas da execução gravado em {json_path}.")
+        return json_path
+
+
+def instrumented(name):
+    """Decorador de métodos: instrumenta a chamada usando ``self.metrics``."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.stage(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
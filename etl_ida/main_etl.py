@@ -1,18 +1,109 @@
 import os
+import io
+import sys
+import csv
+import json
+import argparse
+from datetime import datetime
 import time
+import queue
+import threading
+import numpy as np
 import pandas as pd
 import logging
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from ods_reader import pack_frame, unpack_frame
+from input_readers import read_input_file, supported_extensions
+from parse_cache import ParseCache, settings_version
+from instrumentation import RunMetrics, instrumented
+from download_watcher import DownloadWatcher, expected_filename
+from ingestion_manifest import changed_files
+# selenium, http_fetcher (urllib3), SQLAlchemy e profiling são importados apenas quando usados:
+# uma execução com arquivos enviados manualmente não paga pelo carregamento deles
 
 # Configuração básica de logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+def _parse_input_file_packed(file_path, reader_settings):
+    """Executado nos processos do pool: lê o arquivo e devolve buffers compactos e o tempo de leitura."""
+    start = time.perf_counter()
+    packed = pack_frame(read_input_file(file_path, reader_settings))
+    return packed, time.perf_counter() - start
+
+def _copy_insert(table, conn, keys, data_iter):
+    """Método de inserção para ``DataFrame.to_sql`` usando ``COPY FROM STDIN`` do PostgreSQL.
+
+    Cada lote recebido do pandas (ver ``chunksize``) é serializado em CSV num
+    buffer em memória e enviado num único comando COPY, sem arquivos temporários.
+    """
+    dbapi_conn = conn.connection
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(data_iter)
+    buffer.seek(0)
+    columns = ", ".join(f'"{k}"' for k in keys)
+    table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+    with dbapi_conn.cursor() as cur:
+        cur.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def _libpq_options(settings):
+    """Monta a opção ``options`` do libpq (``-c nome=valor``) com os parâmetros de sessão, escapando espaços e barras."""
+    return " ".join(
+        "-c {}={}".format(name.strip(), value.strip().replace("\\", "\\\\").replace(" ", "\\ "))
+        for name, value in settings.items()
+    )
+
+def _concat_categorical(frames):
+    """Concatena DataFrames preservando as colunas categóricas (unindo as categorias)."""
+    if len(frames) > 1:
+        for col in frames[0].columns:
+            if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+                categories = pd.Index(np.concatenate([f[col].cat.categories.to_numpy(dtype=object) for f in frames])).unique()
+                for f in frames:
+                    f[col] = f[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+def _log_memory(stage):
+    """Registra no log a memória residente (RSS) atual e o pico do processo ao fim de uma etapa."""
+    try:
+        import resource
+    except ImportError: # Indisponível no Windows
+        return
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin": # No macOS ru_maxrss é medido em bytes
+        peak_kb //= 1024
+    current = ""
+    try:
+        with open("/proc/self/statm") as f:
+            current_kb = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+        current = f"RSS atual {current_kb / 1024:.1f} MB, "
+    except (OSError, ValueError):
+        pass
+    logging.info(f"Memória após {stage}: {current}pico {peak_kb / 1024:.1f} MB.")
+
+# Marcadores trocados entre as threads do modo de streaming
+_PIPELINE_END = object()
+
+class _PipelineError:
+    """Erro ocorrido em um estágio do pipeline de streaming, repassado ao estágio seguinte."""
+    def __init__(self, error):
+        self.error = error
+
+# Arquivo (oculto) no diretório de download com o instante do último download concluído
+DOWNLOAD_MARKER = ".ultimo_download"
+
+# Chave natural da tabela fato (uma linha por mês, grupo, serviço e métrica)
+FATO_NATURAL_KEY = ["id_tempo", "id_grupo", "id_servico", "id_metrica"]
+
+# Views materializadas mantidas pelo ETL: métricas (dim_metrica.nome) das quais dependem e, para as
+# pivotadas por grupo econômico, a função SQL que as recria quando a lista de grupos muda
+MATERIALIZED_VIEWS = {
+    "mv_taxa_variacao_resolvidas_5d": {
+        "metricas": ["Taxa de reclamações respondidas em até 5 dias úteis"],
+        "gerador": "gerar_pivot_taxa_variacao_resolvidas_5d",
+    },
+}
+
 class Config:
     """Classe para gerenciar as configurações do ETL."""
     def __init__(self):
@@ -47,35 +138,132 @@ class Config:
         self.db_name = os.getenv("POSTGRES_DB", "ida_datamart")
         self.db_user = os.getenv("POSTGRES_USER", "user")
         self.db_password = os.getenv("POSTGRES_PASSWORD", "password")
-        self.anatel_data_url = "https://dados.gov.br/dados/conjuntos-dados/indice-desempenho-atendimento"
+        # Espera pelo banco no início: tentativas de conexão com intervalo crescente (exponencial) até o prazo
+        self.db_wait_timeout = float(os.getenv("ETL_DB_WAIT_TIMEOUT", "60"))
+        self.db_wait_max_interval = float(os.getenv("ETL_DB_WAIT_MAX_INTERVAL", "5"))
+        # Pool de conexões, reutilizado entre as fases do ETL (a carga usa uma conexão por vez)
+        self.db_pool_size = int(os.getenv("ETL_DB_POOL_SIZE", "2"))
+        self.db_pool_recycle = int(os.getenv("ETL_DB_POOL_RECYCLE", "1800")) # Segundos até reabrir uma conexão ociosa
+        # Parâmetros de sessão aplicados a cada conexão ("nome=valor" separados por ";")
+        self.db_session_settings = dict(
+            item.strip().split("=", 1)
+            for item in os.getenv("ETL_DB_SESSION_SETTINGS", "synchronous_commit=off").split(";")
+            if "=" in item
+        )
+        # Pode apontar para uma página local com a mesma estrutura (li.resource-item / h3.heading) em testes
+        self.anatel_data_url = os.getenv("ANATEL_DATA_URL", "https://dados.gov.br/dados/conjuntos-dados/indice-desempenho-atendimento")
         # Serviços e anos alvo para download (ajustar conforme necessário)
         self.target_downloads = {
             "SCM": ["2019"], # Exemplo: Baixar SCM de 2019
             "SMP": ["2019"], # Exemplo: Baixar SMP de 2019
             "STFC": ["2019"] # Exemplo: Baixar STFC de 2019
         }
+        # Forma de download: "selenium" (Edge headless clicando nos recursos), "http" (sem navegador) ou
+        # "none" (sem download: apenas os arquivos do diretório manual)
+        self.download_backend = os.getenv("ETL_DOWNLOAD_BACKEND", "selenium").lower()
+        # API CKAN do portal (ex.: https://dados.gov.br/api/3); se vazia, o backend "http" lê o HTML da página
+        self.ckan_api_url = os.getenv("ANATEL_CKAN_API_URL") or None
         self.service_mapping = {
             "SCM": "Banda Larga Fixa",
             "SMP": "Serviço Móvel Pessoal",
             "STFC": "Serviço Telefônico Fixo Comutado"
         }
         self.header_skip = 8
-        self.download_wait_time = 30 # Segundos para esperar o download completar
+        # Leitor de ODS: "stream" (iterparse sobre o content.xml) ou "odf" (pd.read_excel com odfpy)
+        self.ods_reader_engine = os.getenv("ODS_READER_ENGINE", "stream").lower()
+        # Arquivos CSV (mesmo layout das planilhas): separador, separador decimal e codificação
+        self.csv_delimiter = os.getenv("ETL_CSV_DELIMITER", ",")
+        self.csv_decimal = os.getenv("ETL_CSV_DECIMAL", ".")
+        self.csv_encoding = os.getenv("ETL_CSV_ENCODING", "utf-8")
+        # Número de processos para leitura paralela dos arquivos (0 ou 1 = leitura sequencial)
+        self.parse_workers = int(os.getenv("ETL_PARSE_WORKERS", "0"))
+        # Cache dos arquivos já lidos, indexado pelo hash do conteúdo (gravado em processed_path)
+        self.parse_cache_enabled = os.getenv("ETL_PARSE_CACHE", "true").lower() == "true"
+        self.parse_cache_path = os.path.join(self.processed_path, "parse_cache")
+        self.parse_cache_max_mb = int(os.getenv("ETL_PARSE_CACHE_MAX_MB", "512"))
+        # Modo de carga da fato: "incremental" (INSERT ... ON CONFLICT), "full" (TRUNCATE + INSERT) ou
+        # "partition" (substitui, na fato particionada, os dados de cada ano/serviço presentes na carga)
+        self.load_mode = os.getenv("ETL_LOAD_MODE", "incremental").lower()
+        # Layout da fato: "none" (tabela comum) ou "year" (converte para particionada por ano via particionar_fato_ida())
+        self.fact_partitioning = os.getenv("ETL_FACT_PARTITIONING", "none").lower()
+        # Modo de streaming: lotes (um arquivo ou até stream_batch_rows linhas) fluem por filas limitadas
+        self.streaming = os.getenv("ETL_STREAMING", "false").lower() == "true"
+        self.stream_batch_rows = int(os.getenv("ETL_STREAM_BATCH_ROWS", "0")) # 0 = um lote por arquivo
+        self.stream_queue_size = int(os.getenv("ETL_STREAM_QUEUE_SIZE", "2")) # Lotes aguardando entre as etapas
+        # Cache das chaves (Valor -> ID) das dimensões persistido entre execuções
+        self.dim_key_cache_persist = os.getenv("ETL_DIM_KEY_CACHE", "true").lower() == "true"
+        self.dim_key_cache_file = os.path.join(self.processed_path, "dim_key_cache.json")
+        # Modo de baixa memória: colunas categóricas desde a leitura e liberação antecipada dos dados brutos
+        self.low_memory = os.getenv("ETL_LOW_MEMORY", "false").lower() == "true"
+        # Manifesto de ingestão (tabela etl_arquivo_ingerido): processa apenas arquivos novos ou alterados
+        self.manifest_enabled = os.getenv("ETL_MANIFEST", "true").lower() == "true"
+        # Atualiza as views materializadas (REFRESH CONCURRENTLY) quando a carga altera suas métricas
+        self.refresh_materialized_views = os.getenv("ETL_REFRESH_MATVIEWS", "true").lower() == "true"
+        # Método de inserção em massa: "copy" (COPY FROM STDIN) ou "to_sql" (INSERTs do pandas)
+        self.bulk_load_method = os.getenv("ETL_BULK_LOAD_METHOD", "copy").lower()
+        self.bulk_load_chunk_rows = int(os.getenv("ETL_BULK_LOAD_CHUNK_ROWS", "100000")) # Linhas por lote enviado ao banco
+        # Métricas por etapa (tempo, CPU, linhas, memória) gravadas em run_report.json ao fim da execução
+        self.metrics_enabled = os.getenv("ETL_METRICS", "false").lower() == "true"
+        self.metrics_path = os.getenv("ETL_METRICS_DIR", os.path.join(self.processed_path, "metrics"))
+        self.metrics_prometheus = os.getenv("ETL_METRICS_PROMETHEUS", "false").lower() == "true" # Também grava run_report.prom
+        self.metrics_tracemalloc = os.getenv("ETL_METRICS_TRACEMALLOC", "false").lower() == "true" # Pico de alocações via tracemalloc
+        # Downloads: prazo por arquivo (a partir do clique) e quantidade de downloads simultâneos
+        self.download_timeout = int(os.getenv("ETL_DOWNLOAD_TIMEOUT", "120"))
+        self.download_concurrency = max(1, int(os.getenv("ETL_DOWNLOAD_CONCURRENCY", "3")))
+        # Com o manifesto, não baixa de novo (nem inicia o navegador) se o último download tem menos que estas
+        # horas e todos os arquivos baixados já foram carregados (0 = baixa a cada execução)
+        self.download_interval_hours = float(os.getenv("ETL_DOWNLOAD_INTERVAL_HOURS", "24"))
+        # Perfilamento da execução (ver profiling.py): "" (desligado), "cpu", "sample" ou "memory"
+        self.profile_mode = os.getenv("ETL_PROFILE", "").lower()
+        self.profile_path = os.path.join(self.processed_path, "profile")
+        self.profile_top = int(os.getenv("ETL_PROFILE_TOP", "20")) # Linhas nos relatórios de funções/alocações
+        self.profile_interval_ms = float(os.getenv("ETL_PROFILE_INTERVAL_MS", "5")) # Intervalo do modo "sample"
 
 class Extractor:
     """Classe responsável pela extração dos dados."""
-    def __init__(self, config):
+    def __init__(self, config, metrics=None):
         """Inicializa o Extractor com as configurações."""
         self.config = config
+        self.metrics = metrics or RunMetrics()
         self.driver = None
+        # Configurações que afetam o resultado da leitura (invalidam o cache e o manifesto de ingestão)
+        self.reader_settings = {
+            "engine": self.config.ods_reader_engine,
+            "header_skip": self.config.header_skip,
+            "service_mapping": self.config.service_mapping,
+            "csv_delimiter": self.config.csv_delimiter,
+            "csv_decimal": self.config.csv_decimal,
+            "csv_encoding": self.config.csv_encoding,
+        }
+        self.reader_version = settings_version(self.reader_settings)
+        self.file_stats = {} # Arquivo -> serviço, linhas e intervalo de períodos (para o manifesto)
+        self.parse_cache = None
+        if self.config.parse_cache_enabled:
+            self.parse_cache = ParseCache(
+                self.config.parse_cache_path,
+                self.config.parse_cache_max_mb * 1024 * 1024,
+                self.reader_settings,
+            )
 
     def _init_webdriver(self):
         """Inicializa o WebDriver do Edge."""
+        try:
+            from selenium import webdriver
+            from selenium.webdriver.edge.service import Service as EdgeService
+            from selenium.webdriver.edge.options import Options as EdgeOptions
+        except ImportError:
+            logging.error("Biblioteca selenium não encontrada. Instale-a (pip install selenium) ou use ETL_DOWNLOAD_BACKEND=http.")
+            return False
+
         logging.info("Inicializando o WebDriver do Edge...")
         options = EdgeOptions()
         options.use_chromium = True # Necessário para versões mais recentes
         # Configura o diretório de download
-        prefs = {"download.default_directory": os.path.abspath(self.config.ods_download_path)}
+        prefs = {
+            "download.default_directory": os.path.abspath(self.config.ods_download_path),
+            "download.prompt_for_download": False,
+            "profile.default_content_setting_values.automatic_downloads": 1, # Permite vários downloads simultâneos
+        }
         options.add_experimental_option("prefs", prefs)
         options.add_argument("--headless") # Rodar em modo headless (sem interface gráfica)
         options.add_argument("--disable-gpu")
@@ -97,7 +285,15 @@ class Extractor:
             return False
 
     def _find_and_click_download_button(self, service, year):
-        """Encontra e clica no botão de download para um serviço e ano específicos."""
+        """Encontra e clica no botão de download para um serviço e ano específicos.
+
+        Retorna o endereço do link clicado ("" se o link não tiver ``href``), ou None se o botão não foi clicado.
+        """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import NoSuchElementException
+
         try:
             # Construir parte do texto esperado no título do recurso
             # Ex: "Índice de Desempenho no Atendimento - SCM - 2019"
@@ -108,7 +304,7 @@ class Extractor:
             resource_items = self.driver.find_elements(By.CSS_SELECTOR, "li.resource-item")
             if not resource_items:
                 logging.warning("Nenhum item de recurso encontrado na página.")
-                return False
+                return None
 
             found_button = None
             for item in resource_items:
@@ -128,24 +324,67 @@ class Extractor:
                 logging.info(f"Clicando no botão de download para {service} {year}...")
                 # Scroll até o botão para garantir visibilidade (opcional, mas pode ajudar)
                 self.driver.execute_script("arguments[0].scrollIntoView(true);", found_button)
-                time.sleep(1) # Pequena pausa
+                WebDriverWait(self.driver, 10).until(EC.element_to_be_clickable(found_button))
+                url = found_button.get_attribute("href") or "" # Lido antes do clique, que pode trocar de página
                 found_button.click()
-                logging.info(f"Botão clicado. Aguardando download...")
-                # Espera um tempo fixo para o download (pode ser melhorado)
-                time.sleep(self.config.download_wait_time)
-                return True
+                logging.info(f"Botão clicado. Download de {service} {year} iniciado.")
+                return url
             else:
                 logging.warning(f"Botão de download para {service} {year} não encontrado.")
-                return False
+                return None
 
         except Exception as e:
             logging.error(f"Erro ao tentar encontrar/clicar no botão de download para {service} {year}: {e}")
-            return False
+            return None
 
+    @instrumented("download")
     def download_data(self):
+        """Baixa os arquivos ODS do portal da Anatel com o backend configurado."""
+        if self.config.download_backend == "none":
+            logging.info("Download automático desabilitado (ETL_DOWNLOAD_BACKEND=none); usando os arquivos enviados manualmente.")
+            return False
+        if self.config.download_backend == "http":
+            success = self._download_http()
+        else:
+            success = self._download_selenium()
+        if success:
+            # Marca o instante do download concluído (arquivo oculto, ignorado pela leitura e pelo watcher)
+            with open(os.path.join(self.config.ods_download_path, DOWNLOAD_MARKER), "w", encoding="utf-8") as f:
+                f.write(datetime.now().isoformat())
+        return success
+
+    def last_download_age(self):
+        """Segundos desde o último download concluído, ou None se não houver registro."""
+        try:
+            return time.time() - os.path.getmtime(os.path.join(self.config.ods_download_path, DOWNLOAD_MARKER))
+        except OSError:
+            return None
+
+    def _download_http(self):
+        """Baixa os arquivos ODS por HTTP, sem navegador, pulando os inalterados no servidor."""
+        total_targets = sum(len(years) for years in self.config.target_downloads.values())
+        try:
+            from http_fetcher import HttpFetcher
+
+            fetcher = HttpFetcher(self.config.ods_download_path, timeout=self.config.download_timeout,
+                                  workers=self.config.download_concurrency, ckan_api_url=self.config.ckan_api_url)
+            counts = fetcher.download(self.config.anatel_data_url, self.config.target_downloads)
+        except Exception as e:
+            logging.error(f"Ocorreu um erro durante o download por HTTP: {e}")
+            return False
+        logging.info(f"Download por HTTP concluído: {counts['baixado']} baixados, {counts['inalterado']} inalterados "
+                     f"e {counts['falha']} falhas de {total_targets} arquivos alvo.")
+        return counts["baixado"] + counts["inalterado"] > 0
+
+    def _download_selenium(self):
         """Baixa os arquivos ODS do portal da Anatel usando Selenium."""
         if not self._init_webdriver():
             return False # Falha ao iniciar o webdriver
+        # Disponíveis: _init_webdriver já importou o selenium
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
         success_count = 0
         total_targets = sum(len(years) for years in self.config.target_downloads.values())
@@ -165,20 +404,30 @@ class Extractor:
                 if "collapsed" in recursos_header.get_attribute("class"):
                     logging.info("Expandindo seção Recursos...")
                     recursos_header.click()
-                    time.sleep(2) # Espera a expansão
+                    WebDriverWait(self.driver, 10).until( # Espera a expansão
+                        EC.visibility_of_element_located((By.CSS_SELECTOR, "li.resource-item"))
+                    )
             except NoSuchElementException:
                 logging.warning("Não foi possível encontrar o botão para expandir Recursos, assumindo que já está expandido.")
             except Exception as e:
                  logging.warning(f"Erro ao tentar expandir Recursos: {e}")
 
-            # Itera sobre os alvos definidos na configuração
+            # Itera sobre os alvos definidos na configuração, com até download_concurrency downloads simultâneos.
+            # Cada download termina quando o arquivo aparece completo no diretório (sem espera fixa).
+            watcher = DownloadWatcher(self.config.ods_download_path, self.config.download_timeout)
             for service, years in self.config.target_downloads.items():
                 for year in years:
+                    watcher.wait(max_pending=self.config.download_concurrency - 1)
                     logging.info(f"Tentando baixar dados para {service} do ano {year}...")
-                    if self._find_and_click_download_button(service, year):
-                        success_count += 1
+                    url = self._find_and_click_download_button(service, year)
+                    if url is not None:
+                        watcher.expect(f"{service} {year}", expected_filename(url))
                     else:
                         logging.warning(f"Falha ao baixar {service} {year}.")
+            logging.info("Aguardando a conclusão dos downloads...")
+            success_count = sum(1 for label, _ in watcher.wait() if label is not None)
+            for label in watcher.timed_out:
+                logging.warning(f"Falha ao baixar {label}: download não concluído no prazo.")
 
         except TimeoutException:
             logging.error("Tempo esgotado esperando a página carregar ou elementos aparecerem.")
@@ -192,66 +441,289 @@ class Extractor:
         logging.info(f"Tentativa de download concluída. {success_count} de {total_targets} arquivos alvo foram baixados (verifique o diretório {self.config.ods_download_path}).")
         return success_count > 0 # Retorna True se pelo menos um download foi tentado com sucesso
 
-    def read_ods_files(self, directory):
-        """Lê os arquivos ODS de um diretório especificado."""
+    def _read_input_file(self, file_path):
+        """Lê um único arquivo de entrada com o leitor registrado para a sua extensão (ver input_readers)."""
+        return read_input_file(file_path, self.reader_settings)
+
+    def _list_ods_files(self, directory, filenames=None):
+        """Lista, em ordem determinística, os arquivos de entrada do diretório e o serviço de cada um.
+
+        São aceitos os formatos com leitor registrado (ODS, CSV, XLSX, Parquet),
+        misturados no mesmo diretório. ``filenames`` restringe a lista a esses
+        arquivos (ex.: apenas os novos ou alterados).
+        """
+        extensions = supported_extensions()
+        targets = []
+        for filename in sorted(os.listdir(directory)):
+            if filenames is not None and filename not in filenames:
+                continue
+            # Ignora arquivos temporários/de bloqueio (LibreOffice ".~lock...", Excel "~$...")
+            if filename.lower().endswith(extensions) and not filename.startswith((".~", "~$")):
+                service_type = "UNKNOWN"
+                # Tenta extrair o tipo de serviço do nome do arquivo
+                for key in self.config.service_mapping.keys():
+                    if key in filename.upper():
+                        service_type = key
+                        break
+
+                if service_type != "UNKNOWN":
+                    targets.append((filename, service_type))
+                else:
+                    logging.warning(f"Ignorando arquivo com nome não reconhecido: {filename}")
+        return targets
+
+    def _iter_parsed_files(self, directory, targets):
+        """Gera (arquivo, serviço, DataFrame, segundos, origem) na ordem de ``targets``.
+
+        Arquivos inalterados vêm do cache de leitura. Os demais são lidos no
+        processo atual ou, com ``parse_workers`` > 1, num pool de processos que
+        mantém no máximo dois arquivos por processo em andamento, para que
+        resultados ainda não consumidos não se acumulem em memória.
+        """
+        cache_keys = {}
+        pending = []
+        for filename, _ in targets:
+            key = None
+            if self.parse_cache is not None:
+                try:
+                    key = self.parse_cache.key_for(os.path.join(directory, filename))
+                except OSError as e:
+                    logging.error(f"Falha ao ler o arquivo {filename}: {e}")
+                    continue
+            cache_keys[filename] = key
+            if key is None or not self.parse_cache.has(key):
+                pending.append(filename)
+
+        executor = None
+        workers = 0
+        futures = {}
+        to_submit = iter(pending)
+        if self.config.parse_workers > 1 and len(pending) > 1:
+            workers = min(self.config.parse_workers, len(pending))
+            logging.info(f"Lendo {len(pending)} arquivos em paralelo com {workers} processos...")
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+        def submit_ahead():
+            """Mantém o pool ocupado sem ultrapassar o limite de arquivos em andamento."""
+            while executor is not None and len(futures) < workers * 2:
+                filename = next(to_submit, None)
+                if filename is None:
+                    return
+                futures[filename] = executor.submit(
+                    _parse_input_file_packed, os.path.join(directory, filename), self.reader_settings,
+                )
+
+        try:
+            submit_ahead()
+            # Consome os arquivos na ordem da listagem para manter a saída determinística
+            for filename, service_type in targets:
+                if filename not in cache_keys:
+                    continue
+                start = time.perf_counter()
+                with self.metrics.stage(f"leitura:{filename}") as stage:
+                    key = cache_keys[filename]
+                    df = None
+                    source = "cache"
+                    if filename not in pending:
+                        packed = self.parse_cache.load(key)
+                        if packed is not None:
+                            df = unpack_frame(packed)
+                    if df is None:
+                        source = "leitura"
+                        packed = None
+                        try:
+                            if filename in futures:
+                                future = futures.pop(filename)
+                                submit_ahead()
+                                packed, _ = future.result()
+                                df = unpack_frame(packed)
+                            else:
+                                logging.info(f"Lendo arquivo {filename} para o serviço {service_type}...")
+                                df = self._read_input_file(os.path.join(directory, filename))
+                        except Exception as e:
+                            logging.error(f"Falha ao ler o arquivo {filename}: {e}")
+                            stage.set(erro=str(e))
+                            continue
+                        if key is not None:
+                            self.parse_cache.store(key, packed if packed is not None else pack_frame(df))
+                    stage.set(rows_out=len(df), origem=source)
+                yield filename, service_type, df, time.perf_counter() - start, source
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def list_ods_files(self, directory):
+        """Nomes dos arquivos de entrada (ODS, CSV, XLSX, Parquet) reconhecidos no diretório."""
+        return [filename for filename, _ in self._list_ods_files(directory)]
+
+    def _record_file_stats(self, df, filename, service_type):
+        """Guarda serviço, linhas e intervalo de períodos de um arquivo lido (registrados no manifesto)."""
+        _, periods = Transformer._identify_date_columns(df.columns)
+        self.file_stats[filename] = {
+            "servico": service_type,
+            "linhas": len(df),
+            "periodo_inicio": min(periods).strftime("%Y-%m") if periods else None,
+            "periodo_fim": max(periods).strftime("%Y-%m") if periods else None,
+        }
+
+    def _tag_frame(self, df, filename, service_type):
+        """Adiciona ao DataFrame lido as colunas de serviço e arquivo de origem."""
+        if self.config.low_memory:
+            # Colunas constantes por arquivo guardadas como categóricas (códigos inteiros)
+            df["servico_sigla"] = pd.Categorical.from_codes(np.zeros(len(df), dtype="int8"), categories=[service_type])
+            df["arquivo_origem"] = pd.Categorical.from_codes(np.zeros(len(df), dtype="int8"), categories=[filename])
+        else:
+            df["servico_sigla"] = service_type
+            df["arquivo_origem"] = filename
+
+    def read_ods_files(self, directory, filenames=None):
+        """Lê os arquivos de entrada de um diretório especificado (opcionalmente, apenas ``filenames``).
+
+        Cada arquivo é lido pelo leitor do seu formato; os DataFrames de um
+        mesmo serviço são concatenados, independentemente do formato de origem.
+        """
         all_data = {}
-        logging.info(f"Lendo arquivos ODS do diretório: {directory}")
+        logging.info(f"Lendo arquivos de entrada do diretório: {directory}")
         try:
             if not os.path.exists(directory) or not os.listdir(directory):
                 logging.warning(f"Diretório {directory} está vazio ou não existe.")
                 return {}
 
-            for filename in os.listdir(directory):
-                if filename.endswith(".ods") and not filename.startswith(".~"): # Ignora arquivos temporários
-                    file_path = os.path.join(directory, filename)
-                    service_type = "UNKNOWN"
-                    # Tenta extrair o tipo de serviço do nome do arquivo
-                    for key in self.config.service_mapping.keys():
-                        if key in filename.upper():
-                            service_type = key
-                            break
-
-                    if service_type != "UNKNOWN":
-                        logging.info(f"Lendo arquivo {filename} para o serviço {service_type}...")
-                        try:
-                            df = pd.read_excel(file_path, engine="odf", header=self.config.header_skip)
-                            df["servico_sigla"] = service_type
-                            df["arquivo_origem"] = filename
-                            if service_type not in all_data:
-                                all_data[service_type] = []
-                            all_data[service_type].append(df)
-                            logging.info(f"Arquivo {filename} lido com sucesso.")
-                        except Exception as e:
-                            logging.error(f"Falha ao ler o arquivo {filename}: {e}")
-                    else:
-                        logging.warning(f"Ignorando arquivo com nome não reconhecido: {filename}")
+            targets = self._list_ods_files(directory, filenames)
+            for filename, service_type, df, elapsed, source in self._iter_parsed_files(directory, targets):
+                self._record_file_stats(df, filename, service_type)
+                self._tag_frame(df, filename, service_type)
+                if service_type not in all_data:
+                    all_data[service_type] = []
+                all_data[service_type].append(df)
+                logging.info(f"Arquivo {filename} lido com sucesso ({len(df)} linhas em {elapsed:.3f}s, origem: {source}).")
 
             final_data = {}
-            for service, dfs in all_data.items():
+            for service in list(all_data.keys()):
+                dfs = all_data.pop(service)
                 if dfs:
-                    final_data[service] = pd.concat(dfs, ignore_index=True)
+                    final_data[service] = _concat_categorical(dfs) if self.config.low_memory else pd.concat(dfs, ignore_index=True)
             return final_data
 
         except Exception as e:
-            logging.error(f"Ocorreu um erro inesperado ao ler os arquivos ODS: {e}")
+            logging.error(f"Ocorreu um erro inesperado ao ler os arquivos de entrada: {e}")
             return {}
 
+    def iter_ods_batches(self, directory, batch_rows=0, filenames=None):
+        """Gera lotes ``{serviço: DataFrame}`` a partir dos arquivos de entrada, um arquivo por vez.
+
+        Com ``batch_rows`` > 0, arquivos maiores são divididos em lotes de até
+        ``batch_rows`` linhas. Usado pelo modo de streaming do ETL.
+        """
+        logging.info(f"Lendo arquivos de entrada do diretório (streaming): {directory}")
+        if not os.path.exists(directory) or not os.listdir(directory):
+            logging.warning(f"Diretório {directory} está vazio ou não existe.")
+            return
+
+        targets = self._list_ods_files(directory, filenames)
+        for filename, service_type, df, elapsed, source in self._iter_parsed_files(directory, targets):
+            self._record_file_stats(df, filename, service_type)
+            self._tag_frame(df, filename, service_type)
+            logging.info(f"Arquivo {filename} lido com sucesso ({len(df)} linhas em {elapsed:.3f}s, origem: {source}).")
+            if batch_rows and len(df) > batch_rows:
+                for start in range(0, len(df), batch_rows):
+                    yield {service_type: df.iloc[start:start + batch_rows].reset_index(drop=True)}
+            else:
+                yield {service_type: df}
+
 class Transformer:
     """Classe responsável pela transformação dos dados."""
-    def __init__(self, config):
+    def __init__(self, config, metrics=None):
         """Inicializa o Transformer."""
         self.config = config
+        self.metrics = metrics or RunMetrics()
+
+    @staticmethod
+    def _identify_date_columns(columns):
+        """Identifica as colunas de data e converte cada cabeçalho em período (Timestamp) uma única vez.
+
+        Cabeçalhos que parecem datas mas não podem ser convertidos são descartados,
+        como acontecia com as linhas de data inválida após o melt.
+        """
+        date_cols = []
+        periods = []
+        for col in columns:
+            # CORREÇÃO: Verifica o tipo ANTES de tentar operações de string/indexação
+            if isinstance(col, datetime):
+                period = pd.Timestamp(col)
+            elif isinstance(col, str) and len(col) == 7 and col[4] in ["-", "/"] and col[:4].isdigit() and col[5:].isdigit():
+                # Tenta identificar padrões como YYYY-MM ou YYYY/MM
+                period = pd.to_datetime(col.replace("/", "-"), format="%Y-%m", errors="coerce")
+            else:
+                continue
+            if pd.isna(period):
+                continue
+            date_cols.append(col)
+            periods.append(period)
+        return date_cols, periods
+
+    @staticmethod
+    def _melt_date_columns(df_raw, date_cols, periods):
+        """Faz o unpivot das colunas de data com arrays NumPy, sem reprocessar datas por linha.
+
+        Equivale a ``df_raw.melt(...)`` seguido da extração de ano/mês, mas as
+        datas são tratadas só nos cabeçalhos e propagadas por códigos
+        categóricos. A saída usa dtypes categóricos e inteiros.
+        """
+        n_rows, n_cols = len(df_raw), len(date_cols)
+        # Ordem do melt: todas as linhas da 1ª coluna de data, depois da 2ª, etc.
+        col_idx = np.repeat(np.arange(n_cols), n_rows)
+        row_idx = np.tile(np.arange(n_rows), n_cols)
+
+        # Valores: conversão numérica coluna a coluna e achatamento em ordem de coluna
+        valores = df_raw[date_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64")
+
+        # Um código por cabeçalho; cabeçalhos distintos do mesmo mês compartilham a categoria
+        ano_mes_codes, ano_mes_categories = pd.factorize(pd.Index([p.strftime("%Y-%m") for p in periods]))
+        anos = np.array([p.year for p in periods], dtype="int16")
+        meses = np.array([p.month for p in periods], dtype="int8")
+
+        def expand(series):
+            """Converte uma coluna de identificação em categórico e a repete para cada coluna de data."""
+            cat = pd.Categorical(series.astype(str).str.strip())
+            return pd.Categorical.from_codes(cat.codes[row_idx], categories=cat.categories)
+
+        return pd.DataFrame({
+            "ano": anos[col_idx],
+            "mes": meses[col_idx],
+            "ano_mes": pd.Categorical.from_codes(ano_mes_codes[col_idx], categories=ano_mes_categories),
+            "grupo_economico": expand(df_raw["grupo_economico"]),
+            "servico_sigla": expand(df_raw["servico_sigla"]),
+            "metrica_nome": expand(df_raw["metrica_nome"]),
+            "valor": valores.ravel(order="F"),
+        })
+
+    @staticmethod
+    def _dimensions_from_categories(df_final):
+        """Monta as dimensões a partir das tabelas de categorias, sem percorrer a fato inteira."""
+        ano_mes = pd.Index(df_final["ano_mes"].cat.categories)
+        dim_tempo = pd.DataFrame({
+            "ano": ano_mes.str[:4].astype("int16"),
+            "mes": ano_mes.str[5:].astype("int8"),
+            "ano_mes": ano_mes,
+        })
+        dim_grupo = pd.DataFrame({"nome": df_final["grupo_economico"].cat.categories})
+        dim_metrica = pd.DataFrame({"nome": df_final["metrica_nome"].cat.categories})
+        return dim_tempo, dim_grupo, dim_metrica
 
     def transform_data(self, raw_data_dict):
-        """Transforma os dados brutos lidos dos ODS para o formato do Data Mart."""
+        """Transforma os dados brutos lidos dos arquivos de entrada para o formato do Data Mart."""
         logging.info("Iniciando transformação dos dados...")
         if not raw_data_dict:
             logging.error("Nenhum dado bruto para transformar.")
             return None
 
         all_transformed_dfs = []
+        transformed_files = [] # Arquivos de origem com linhas na saída (os demais não foram transformados)
 
-        for service_type, df_raw in raw_data_dict.items(): # Agora é um DF único por serviço
+        for service_type in list(raw_data_dict.keys()): # Agora é um DF único por serviço
+            # No modo de baixa memória o DataFrame bruto sai do dicionário e é liberado após o uso
+            df_raw = raw_data_dict.pop(service_type) if self.config.low_memory else raw_data_dict[service_type]
             logging.info(f"Transformando dados para o serviço {service_type}...")
 
             # Verifica se as colunas esperadas existem
@@ -269,51 +741,34 @@ class Transformer:
             # Remove linhas de cabeçalho repetidas (se houver)
             df_raw = df_raw[~df_raw["grupo_economico"].astype(str).str.contains("GRUPO ECONÔMICO", na=False)]
 
-            # Identifica colunas de data (formato YYYY-MM ou YYYY/MM ou Timestamps)
-            date_cols = []
-            for col in df_raw.columns:
-                # CORREÇÃO: Verifica o tipo ANTES de tentar operações de string/indexação
-                if isinstance(col, pd.Timestamp):
-                    date_cols.append(col)
-                elif isinstance(col, str):
-                    # Tenta identificar padrões como YYYY-MM ou YYYY/MM
-                    if len(col) == 7 and col[4] in ["-", "/"] and col[:4].isdigit() and col[5:].isdigit():
-                        date_cols.append(col)
-                    # Adicionar outras lógicas de identificação de string de data se necessário
+            # Identifica colunas de data (formato YYYY-MM ou YYYY/MM ou Timestamps), uma única vez por cabeçalho
+            date_cols, periods = self._identify_date_columns(df_raw.columns)
 
             if not date_cols:
                 logging.error(f"Não foi possível encontrar colunas de data para o serviço {service_type}. Colunas: {df_raw.columns}")
                 continue
             logging.info(f"Colunas de data identificadas para {service_type}: {date_cols}")
 
-            # Unpivot (melt)
-            id_vars = ["grupo_economico", "metrica_nome", "servico_sigla", "arquivo_origem"]
-            df_melted = df_raw.melt(
-                id_vars=id_vars,
-                value_vars=date_cols,
-                var_name="ano_mes_raw",
-                value_name="valor"
-            )
-
-            # Limpar e formatar coluna ano_mes
-            df_melted["ano_mes"] = pd.to_datetime(df_melted["ano_mes_raw"], errors="coerce").dt.strftime("%Y-%m")
-            df_melted = df_melted.dropna(subset=["ano_mes"]) # Remove linhas onde a data não pôde ser convertida
-
-            # Extrair ano e mês
-            df_melted["ano"] = pd.to_datetime(df_melted["ano_mes"]).dt.year
-            df_melted["mes"] = pd.to_datetime(df_melted["ano_mes"]).dt.month
-
-            # Limpar coluna valor
-            df_melted["valor"] = pd.to_numeric(df_melted["valor"], errors="coerce")
-
-            # Selecionar colunas finais
-            df_transformed = df_melted[[
-                "ano", "mes", "ano_mes", "grupo_economico", "servico_sigla", "metrica_nome", "valor"
-            ]].copy()
-
-            # Tratar nomes de métricas/grupos (remover espaços extras, etc.)
-            df_transformed["grupo_economico"] = df_transformed["grupo_economico"].astype(str).str.strip()
-            df_transformed["metrica_nome"] = df_transformed["metrica_nome"].astype(str).str.strip()
+            # Vários arquivos do serviço (ex.: um por ano) chegam concatenados: as colunas de data de um arquivo
+            # ficam vazias nas linhas dos demais e não são medições; cada arquivo usa apenas as próprias colunas
+            parts = [(df_raw, date_cols, periods)]
+            if "arquivo_origem" in df_raw.columns and df_raw["arquivo_origem"].nunique() > 1:
+                parts = []
+                for _, df_file in df_raw.groupby("arquivo_origem", sort=False, observed=True):
+                    own = [i for i, col in enumerate(date_cols) if df_file[col].notna().any()]
+                    parts.append((df_file, [date_cols[i] for i in own], [periods[i] for i in own]))
+
+            # Unpivot (melt) vetorizado, com ano/mês/ano_mes propagados a partir do cabeçalho
+            with self.metrics.stage(f"melt:{service_type}", rows_in=len(df_raw)) as stage:
+                parts = [part for part in parts if part[1]]
+                melted = [self._melt_date_columns(df_part, cols, part_periods) for df_part, cols, part_periods in parts]
+                if not melted:
+                    logging.warning(f"Nenhum valor nas colunas de data do serviço {service_type}. Pulando.")
+                    continue
+                if "arquivo_origem" in df_raw.columns:
+                    transformed_files.extend(str(f) for df_part, _, _ in parts for f in df_part["arquivo_origem"].unique())
+                df_transformed = _concat_categorical(melted) if len(melted) > 1 else melted[0]
+                stage.set(rows_out=len(df_transformed), colunas_data=len(date_cols))
 
             all_transformed_dfs.append(df_transformed)
 
@@ -321,38 +776,109 @@ class Transformer:
             logging.error("Nenhuma informação foi transformada com sucesso.")
             return None
 
-        df_final = pd.concat(all_transformed_dfs, ignore_index=True)
+        df_final = _concat_categorical(all_transformed_dfs)
+        all_transformed_dfs.clear()
 
         # Criar DataFrames para as dimensões
-        dim_tempo = df_final[["ano", "mes", "ano_mes"]].drop_duplicates().reset_index(drop=True)
-        dim_grupo = pd.DataFrame({"nome": df_final["grupo_economico"].unique()})
         dim_servico = pd.DataFrame(self.config.service_mapping.items(), columns=["sigla", "nome"])
-        dim_metrica = pd.DataFrame({"nome": df_final["metrica_nome"].unique()})
+        if self.config.low_memory:
+            dim_tempo, dim_grupo, dim_metrica = self._dimensions_from_categories(df_final)
+        else:
+            dim_tempo = df_final[["ano", "mes", "ano_mes"]].drop_duplicates().reset_index(drop=True)
+            dim_grupo = pd.DataFrame({"nome": df_final["grupo_economico"].unique()})
+            dim_metrica = pd.DataFrame({"nome": df_final["metrica_nome"].unique()})
 
         # Criar DataFrame para a tabela Fato (ainda sem IDs)
         fato_ida = df_final[["ano_mes", "grupo_economico", "servico_sigla", "metrica_nome", "valor"]]
+        fato_ida.attrs["arquivos_origem"] = transformed_files # Usado pelo manifesto de ingestão após a carga
 
         logging.info("Transformação dos dados concluída.")
         return dim_tempo, dim_grupo, dim_servico, dim_metrica, fato_ida
 
 class Loader:
     """Classe responsável pelo carregamento dos dados no Data Mart."""
-    def __init__(self, config):
+    def __init__(self, config, metrics=None):
         """Inicializa o Loader."""
         self.config = config
+        self.metrics = metrics or RunMetrics()
         self.conn = None
-        self.engine = None 
+        self.engine = None
+        # Cache de chaves das dimensões: em memória durante a execução e, opcionalmente, persistido em disco
+        self.dim_key_cache = {}
+        self.persisted_key_cache = self._load_persisted_key_cache()
+        self.pending_key_cache = {} # Versões das dimensões lidas na transação em curso (gravadas após o commit)
+        # Partições (id_metrica, id_tempo) alteradas na fato desde o último refresh das views materializadas
+        self.changed_partitions = set()
+        self.fact_truncated = False
+        # Views pivotadas por grupo econômico a conferir/regenerar na próxima carga: na primeira carga da execução
+        # e sempre que surgirem grupos novos (só é desligado após a função geradora ter sido executada com sucesso)
+        self.groups_changed = True
+        self.fact_partitioned = None # Se a fato_ida é particionada por ano (verificado a cada conexão)
+        self.outer_transaction = None # Transação aberta por transaction(): as cargas viram savepoints dela
+
+    def _get_engine(self):
+        """Cria (uma única vez) o engine, cujo pool de conexões é reutilizado entre as fases do ETL.
+
+        Os parâmetros de ``db_session_settings`` são enviados na abertura de
+        cada conexão (opção ``-c`` do libpq), sem comandos SET adicionais.
+        """
+        if self.engine is None:
+            from sqlalchemy import create_engine
+
+            db_url = f"postgresql+psycopg2://{self.config.db_user}:{self.config.db_password}@{self.config.db_host}:{self.config.db_port}/{self.config.db_name}"
+            options = _libpq_options(self.config.db_session_settings)
+            self.engine = create_engine(
+                db_url,
+                pool_size=self.config.db_pool_size,
+                max_overflow=0,
+                pool_pre_ping=True, # Descarta conexões derrubadas (ex.: reinício do banco) antes de usá-las
+                pool_recycle=self.config.db_pool_recycle,
+                connect_args={"options": options} if options else {},
+            )
+        return self.engine
+
+    def wait_for_db(self):
+        """Aguarda o banco aceitar conexões (``SELECT 1``), com intervalo exponencial entre as tentativas.
+
+        Substitui a espera fixa na inicialização: retorna assim que o banco
+        responde, ou False após ``db_wait_timeout`` segundos.
+        """
+        try:
+            import psycopg2
+            from sqlalchemy import text
+        except ImportError:
+            logging.error("Bibliotecas psycopg2 ou SQLAlchemy não encontradas. Instale-as: pip install psycopg2-binary sqlalchemy")
+            return False
+
+        deadline = time.monotonic() + self.config.db_wait_timeout
+        interval = 0.25
+        attempt = 1
+        while True:
+            try:
+                with self._get_engine().connect() as conn:
+                    conn.execute(text("SELECT 1;"))
+                logging.info(f"Banco de dados disponível (tentativa {attempt}).")
+                return True
+            except Exception as e:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.error(f"Banco de dados indisponível após {attempt} tentativas em {self.config.db_wait_timeout:.0f}s: {e}")
+                    return False
+                wait = min(interval, remaining)
+                logging.info(f"Banco de dados ainda indisponível (tentativa {attempt}); nova tentativa em {wait:.2f}s.")
+                time.sleep(wait)
+                interval = min(interval * 2, self.config.db_wait_max_interval)
+                attempt += 1
 
     def connect_db(self):
-        """Estabelece conexão com o banco de dados PostgreSQL."""
+        """Obtém uma conexão do pool com o banco de dados PostgreSQL."""
         try:
             # Importar dentro do método para evitar erro se não instalado globalmente
             import psycopg2
-            from sqlalchemy import create_engine, text
+            from sqlalchemy import text
 
-            db_url = f"postgresql+psycopg2://{self.config.db_user}:{self.config.db_password}@{self.config.db_host}:{self.config.db_port}/{self.config.db_name}"
-            self.engine = create_engine(db_url)
-            self.conn = self.engine.connect()
+            self.conn = self._get_engine().connect()
+            self.fact_partitioned = None
             logging.info("Conexão com PostgreSQL estabelecida via SQLAlchemy.")
             return True
         except ImportError:
@@ -361,46 +887,496 @@ class Loader:
         except Exception as e:
             logging.error(f"Falha ao conectar ao PostgreSQL: {e}")
             self.conn = None
-            self.engine = None
             return False
 
-    def _get_or_insert_dimension(self, df_dim, table_name, key_col, value_col):
-        """Insere dados na dimensão se não existirem e retorna mapeamento Valor -> ID."""
-        logging.info(f"Processando dimensão: {table_name}")
-        # Carrega dados existentes da dimensão
+    def _dimension_cache_id(self, table_name):
+        """Identificador da dimensão no cache persistido (inclui o banco de destino)."""
+        return f"{self.config.db_host}:{self.config.db_port}/{self.config.db_name}/{table_name}"
+
+    def _load_persisted_key_cache(self):
+        """Carrega do disco o cache de chaves das dimensões gravado em execuções anteriores."""
+        if not self.config.dim_key_cache_persist or not os.path.exists(self.config.dim_key_cache_file):
+            return {}
         try:
-            existing_df = pd.read_sql(f"SELECT {key_col}, {value_col} FROM {table_name}", self.conn)
-            existing_map = pd.Series(existing_df[key_col].values, index=existing_df[value_col]).to_dict()
-        except Exception as e:
-            logging.warning(f"Não foi possível carregar dados existentes de {table_name} (pode ser a primeira execução): {e}")
-            existing_map = {}
+            with open(self.config.dim_key_cache_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Cache de chaves das dimensões ilegível, ignorando: {e}")
+            return {}
 
-        # Identifica novos valores
-        new_values = df_dim[~df_dim[value_col].isin(existing_map.keys())]
+    def _save_persisted_key_cache(self):
+        """Grava no disco o cache de chaves das dimensões."""
+        if not self.config.dim_key_cache_persist:
+            return
+        try:
+            tmp_path = f"{self.config.dim_key_cache_file}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.persisted_key_cache, f, ensure_ascii=False)
+            os.replace(tmp_path, self.config.dim_key_cache_file)
+        except OSError as e:
+            logging.warning(f"Não foi possível gravar o cache de chaves das dimensões: {e}")
+
+    def _dimension_version(self, table_name, key_col):
+        """Retorna (quantidade de linhas, maior ID) da dimensão, usados para validar o cache persistido."""
+        from sqlalchemy import text
+
+        row_count, max_id = self.conn.execute(text(f"SELECT COUNT(*), MAX({key_col}) FROM {table_name}")).one()
+        return int(row_count), int(max_id) if max_id is not None else None
+
+    def _dimension_keys(self, table_name, key_col, value_col):
+        """Retorna o mapeamento Valor -> ID da dimensão, lendo a tabela inteira só quando necessário.
+
+        Ordem de consulta: cache em memória (válido durante a execução), cache
+        persistido em disco (validado pela contagem de linhas e maior ID) e,
+        por fim, um SELECT completo da dimensão.
+        """
+        from sqlalchemy import text
+
+        if table_name in self.dim_key_cache:
+            return self.dim_key_cache[table_name]
+
+        cache_id = self._dimension_cache_id(table_name)
+        persisted = self.persisted_key_cache.get(cache_id)
+        if persisted is not None:
+            if [persisted["row_count"], persisted["max_id"]] == list(self._dimension_version(table_name, key_col)):
+                logging.info(f"Chaves de {table_name} carregadas do cache persistido.")
+                self.dim_key_cache[table_name] = persisted["keys"]
+                return persisted["keys"]
+            logging.info(f"Cache persistido de {table_name} desatualizado; recarregando chaves do banco.")
+
+        rows = self.conn.execute(text(f"SELECT {key_col}, {value_col} FROM {table_name}")).all()
+        key_map = {value: key for key, value in rows}
+        self.dim_key_cache[table_name] = key_map
+        return key_map
+
+    def _insert_missing_members(self, new_values, table_name, key_col, value_col):
+        """Insere apenas os membros ausentes e retorna o mapeamento Valor -> ID deles.
+
+        Usa INSERT ... ON CONFLICT DO NOTHING RETURNING; membros inseridos em
+        paralelo por outro processo (conflito) são buscados pelo valor, sem
+        reler a dimensão inteira.
+        """
+        from psycopg2.extras import execute_values
+        from sqlalchemy import text
+
+        columns = [col for col in new_values.columns if col != key_col]
+        rows = [tuple(row) for row in new_values[columns].astype(object).itertuples(index=False, name=None)]
+        sql = (
+            f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES %s "
+            f"ON CONFLICT ({value_col}) DO NOTHING RETURNING {key_col}, {value_col}"
+        )
+        with self.conn.connection.cursor() as cur:
+            returned = execute_values(cur, sql, rows, fetch=True)
+        inserted = {value: key for key, value in returned}
+
+        conflicted = [value for value in new_values[value_col].astype(object) if value not in inserted]
+        if conflicted:
+            result = self.conn.execute(
+                text(f"SELECT {key_col}, {value_col} FROM {table_name} WHERE {value_col} = ANY(:values)"),
+                {"values": conflicted},
+            )
+            inserted.update({value: key for key, value in result})
+        return inserted
 
-        # Insere novos valores
-        if not new_values.empty:
-            try:
-                logging.info(f"Inserindo {len(new_values)} novos registros em {table_name}...")
-                # Remove a coluna chave se ela existir no DataFrame (geralmente não existe aqui)
-                if key_col in new_values.columns:
-                     new_values = new_values.drop(columns=[key_col])
-                new_values.to_sql(table_name, self.engine, if_exists="append", index=False)
-                # Recarrega o mapeamento completo após inserção
-                existing_df = pd.read_sql(f"SELECT {key_col}, {value_col} FROM {table_name}", self.conn)
-                existing_map = pd.Series(existing_df[key_col].values, index=existing_df[value_col]).to_dict()
-            except Exception as e:
-                logging.error(f"Erro ao inserir novos dados em {table_name}: {e}")
-                # Retorna o mapa existente antes da tentativa de inserção
-                return existing_map
+    def _get_or_insert_dimension(self, df_dim, table_name, key_col, value_col):
+        """Insere dados na dimensão se não existirem e retorna mapeamento Valor -> ID.
+
+        Executa na transação da carga (``load_data``): a versão da dimensão para
+        o cache persistido fica pendente e só é gravada após o commit.
+        """
+        with self.metrics.stage(f"dimensao:{table_name}", rows_in=len(df_dim)) as stage:
+            logging.info(f"Processando dimensão: {table_name}")
+            # Carrega dados existentes da dimensão
+            existing_map = self._dimension_keys(table_name, key_col, value_col)
 
-        return existing_map
+            # Identifica novos valores
+            new_values = df_dim[~df_dim[value_col].isin(existing_map.keys())]
 
-    def load_data(self, dims_and_fact):
-        """Carrega todas as dimensões e a tabela fato."""
+            # Insere novos valores
+            if not new_values.empty:
+                logging.info(f"Inserindo {len(new_values)} novos registros em {table_name}...")
+                existing_map.update(self._insert_missing_members(new_values, table_name, key_col, value_col))
+                stage.set(inseridas=len(new_values))
+                if table_name == "dim_grupo_economico":
+                    self.groups_changed = True
+
+            if self.config.dim_key_cache_persist:
+                row_count, max_id = self._dimension_version(table_name, key_col)
+                self.pending_key_cache[self._dimension_cache_id(table_name)] = {
+                    "row_count": row_count, "max_id": max_id, "keys": existing_map,
+                }
+
+            stage.set(rows_out=len(existing_map))
+            return existing_map
+
+    @staticmethod
+    def _map_to_ids(series, key_map):
+        """Converte uma coluna de valores em IDs da dimensão via códigos categóricos (NaN se ausente).
+
+        O dicionário é consultado uma vez por valor distinto; a expansão para
+        todas as linhas é uma indexação de array.
+        """
+        cat = series.array if isinstance(series.dtype, pd.CategoricalDtype) else pd.Categorical(series)
+        ids_per_category = pd.Series(cat.categories.to_numpy(dtype=object)).map(key_map).to_numpy(dtype="float64")
+        codes = np.asarray(cat.codes)
+        ids = ids_per_category[codes]
+        ids[codes < 0] = np.nan
+        return ids
+
+    def _insert_frame(self, df, table_name, con):
+        """Insere um DataFrame numa tabela existente com o método de carga configurado."""
+        method = _copy_insert if self.config.bulk_load_method == "copy" else None
+        df.to_sql(table_name, con, if_exists="append", index=False,
+                  method=method, chunksize=self.config.bulk_load_chunk_rows)
+
+    def _commit_pending(self):
+        """Encerra a transação implícita deixada aberta por leituras (autobegin do SQLAlchemy 2)."""
+        if self.outer_transaction is None and self.conn.in_transaction():
+            self.conn.commit()
+
+    def _begin(self):
+        """Inicia a transação de uma operação: um savepoint dentro de ``transaction()`` ou uma transação própria."""
+        if self.outer_transaction is not None:
+            return self.conn.begin_nested()
+        self._commit_pending()
+        return self.conn.begin()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Agrupa várias cargas (``load_data``) e o ``truncate_fact`` numa única transação.
+
+        Usada pelo streaming no modo full: cada carga roda num savepoint e nada
+        é gravado até o fim do bloco; uma exceção desfaz tudo, inclusive o TRUNCATE.
+        """
+        self._prepare_fact_table()
+        self._commit_pending()
+        self.outer_transaction = self.conn.begin()
+        try:
+            yield
+            self.outer_transaction.commit()
+        except Exception:
+            self.outer_transaction.rollback()
+            logging.error("Transação da carga desfeita; nenhuma alteração gravada na fato_ida.")
+            self.fact_truncated = False
+            self.groups_changed = True
+            self.changed_partitions.clear()
+            self._discard_key_caches()
+            raise
+        finally:
+            self.outer_transaction = None
+        self._persist_pending_key_cache()
+
+    def _persist_pending_key_cache(self):
+        """Grava no cache persistido as versões das dimensões lidas na transação confirmada."""
+        if self.pending_key_cache and self.outer_transaction is None:
+            self.persisted_key_cache.update(self.pending_key_cache)
+            self.pending_key_cache.clear()
+            self._save_persisted_key_cache()
+
+    def _discard_key_caches(self):
+        """Descarta as chaves obtidas numa transação desfeita (podem não existir mais no banco)."""
+        self.dim_key_cache.clear()
+        self.pending_key_cache.clear()
+        self.persisted_key_cache = self._load_persisted_key_cache()
+
+    def _ensure_natural_key_index(self):
+        """Cria o índice único da chave natural da fato_ida em bancos criados antes dele."""
+        from sqlalchemy import text
+
+        if self.fact_partitioned:
+            return # Criado por particionar_fato_ida() (inclui a chave de partição)
+        cols = ", ".join(FATO_NATURAL_KEY)
+        self.conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_fato_ida_chave_natural ON fato_ida ({cols});"))
+
+    def _prepare_fact_table(self):
+        """Verifica se a fato_ida é particionada; com ``fact_partitioning = "year"``, converte-a antes.
+
+        A conversão (``particionar_fato_ida()``, em sql_init/04_partition_fato_ida.sql)
+        preserva os dados e recria as views que dependem da fato.
+        """
+        from sqlalchemy import text
+
+        if self.fact_partitioned is not None:
+            return self.fact_partitioned
+        self._commit_pending()
+        with self.conn.begin():
+            if self.config.fact_partitioning == "year":
+                if not self.conn.execute(text("SELECT to_regprocedure('particionar_fato_ida()') IS NOT NULL;")).scalar():
+                    logging.error("Função particionar_fato_ida() não encontrada (sql_init/04_partition_fato_ida.sql); fato_ida mantida sem partições.")
+                elif self.conn.execute(text("SELECT particionar_fato_ida();")).scalar():
+                    logging.info("Tabela fato_ida convertida para particionada por ano.")
+            self.fact_partitioned = bool(self.conn.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'fato_ida'::regclass);"
+            )).scalar())
+        return self.fact_partitioned
+
+    def _fact_key(self):
+        """Chave natural da fato; na fato particionada inclui a chave de partição (ano)."""
+        return FATO_NATURAL_KEY + ["ano"] if self.fact_partitioned else FATO_NATURAL_KEY
+
+    def _ensure_year_partitions(self, years):
+        """Cria as partições (fato_ida_<ano>) que ainda não existem para os anos da carga."""
+        from sqlalchemy import text
+
+        existing = set(self.conn.execute(text(
+            "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'fato_ida'::regclass;"
+        )).scalars())
+        for year in sorted(int(y) for y in years):
+            if f"fato_ida_{year}" not in existing:
+                self.conn.execute(text(
+                    f"CREATE TABLE fato_ida_{year} PARTITION OF fato_ida FOR VALUES FROM ({year}) TO ({year + 1});"
+                ))
+                logging.info(f"Partição fato_ida_{year} criada.")
+
+    def _load_fact_full(self, fato_ida_final):
+        """Recarrega a tabela fato inteira (TRUNCATE + INSERT), na transação da carga."""
+        from sqlalchemy import text
+
+        logging.info(f"Carregando {len(fato_ida_final)} registros na tabela fato_ida (TRUNCATE + INSERT)...")
+        # Limpa a tabela fato antes de inserir
+        self.conn.execute(text("TRUNCATE TABLE fato_ida RESTART IDENTITY;"))
+        logging.info("Tabela fato_ida limpa (TRUNCATE).")
+        if self.fact_partitioned:
+            self._ensure_year_partitions(fato_ida_final["ano"].unique())
+        # Insere os novos dados na mesma conexão/transação do TRUNCATE
+        self._insert_frame(fato_ida_final, "fato_ida", self.conn)
+        self.fact_truncated = True
+
+    def _load_fact_incremental(self, fato_ida_final):
+        """Carrega a tabela fato de forma incremental (staging + INSERT ... ON CONFLICT).
+
+        Apenas linhas novas ou com valor alterado são escritas; a tabela
+        permanece consultável durante toda a carga (executada na transação de ``load_data``).
+        """
+        from sqlalchemy import text
+
+        key = self._fact_key()
+        cols = ", ".join(key)
+        logging.info(f"Carregando {len(fato_ida_final)} registros na tabela fato_ida (incremental)...")
+        self._ensure_natural_key_index()
+        if self.fact_partitioned:
+            self._ensure_year_partitions(fato_ida_final["ano"].unique())
+        self.conn.execute(text(
+            f"CREATE TEMP TABLE stg_fato_ida ({', '.join(f'{col} INTEGER' for col in key)}, valor NUMERIC) ON COMMIT DROP;"
+        ))
+        self._insert_frame(fato_ida_final, "stg_fato_ida", self.conn)
+        # xmax = 0 identifica as linhas inseridas; as demais retornadas foram atualizadas. Tabelas
+        # particionadas não expõem xmax no RETURNING: lá, as inseridas têm id_fato acima do maior anterior
+        is_inserted = "(xmax = 0)"
+        params = {}
+        if self.fact_partitioned:
+            is_inserted = "(id_fato > :id_limite)"
+            params["id_limite"] = self.conn.execute(text("SELECT COALESCE(MAX(id_fato), 0) FROM fato_ida;")).scalar()
+        result = self.conn.execute(text(f"""
+            WITH upsert AS (
+                INSERT INTO fato_ida ({cols}, valor)
+                SELECT {cols}, valor FROM stg_fato_ida
+                ON CONFLICT ({cols}) DO UPDATE SET valor = EXCLUDED.valor
+                WHERE fato_ida.valor IS DISTINCT FROM EXCLUDED.valor
+                RETURNING {is_inserted} AS inserido, id_metrica, id_tempo
+            )
+            SELECT COUNT(*) FILTER (WHERE inserido), COUNT(*) FILTER (WHERE NOT inserido),
+                   ARRAY_AGG(DISTINCT ARRAY[id_metrica, id_tempo])
+            FROM upsert;
+        """), params).one()
+        inserted, updated, partitions = result
+        self.conn.execute(text("DROP TABLE stg_fato_ida;")) # Numa transação com vários lotes, o ON COMMIT DROP só ocorreria no fim
+        self.changed_partitions.update(tuple(p) for p in partitions or [])
+        unchanged = len(fato_ida_final) - inserted - updated
+        logging.info(f"Carga incremental da fato_ida: {inserted} inseridas, {updated} atualizadas, {unchanged} inalteradas.")
+        return inserted, updated, unchanged
+
+    def _replace_year_partition(self, year, services):
+        """Monta a nova partição de ``year`` a partir de stg_fato_ida e a troca pela atual; retorna (inseridas, removidas).
+
+        A tabela nova recebe as linhas da carga e as linhas da partição atual
+        dos serviços ausentes da carga; a partição antiga é desanexada e
+        removida e a nova é anexada no lugar, na transação corrente. O id_fato
+        é preservado: as linhas mantidas o copiam e as da carga reaproveitam o
+        da linha atual com a mesma chave natural (só chaves novas usam a sequência).
+        """
+        from sqlalchemy import text
+
+        partition = f"fato_ida_{year}"
+        new_table = f"{partition}_nova"
+        cols = ", ".join(FATO_NATURAL_KEY + ["valor", "ano"])
+        params = {"ano": year, "servicos": services}
+        exists = self.conn.execute(text("SELECT to_regclass(:name) IS NOT NULL;"), {"name": partition}).scalar()
+        # CHECK igual aos limites da partição: o ATTACH dispensa a varredura de validação
+        self.conn.execute(text(
+            f"CREATE TABLE {new_table} (LIKE fato_ida INCLUDING DEFAULTS, "
+            f"CONSTRAINT ck_{partition}_ano CHECK (ano >= {year} AND ano < {year + 1}));"
+        ))
+        params["sequencia"] = self.conn.execute(text("SELECT pg_get_serial_sequence('fato_ida', 'id_fato');")).scalar()
+        staged_cols = ", ".join(f"s.{col}" for col in FATO_NATURAL_KEY + ["valor", "ano"])
+        if exists:
+            kept = f"SELECT id_fato, {cols} FROM {partition} WHERE id_servico <> ALL(:servicos) UNION ALL "
+            same_key = " AND ".join(f"atual.{col} = s.{col}" for col in FATO_NATURAL_KEY)
+            staged = (f"SELECT COALESCE(atual.id_fato, nextval(:sequencia)), {staged_cols} FROM stg_fato_ida s "
+                      f"LEFT JOIN {partition} atual ON {same_key} WHERE s.ano = :ano")
+        else:
+            kept = ""
+            staged = f"SELECT nextval(:sequencia), {staged_cols} FROM stg_fato_ida s WHERE s.ano = :ano"
+        # Linhas gravadas em ordem de tempo (favorece o índice BRIN)
+        self.conn.execute(text(
+            f"INSERT INTO {new_table} (id_fato, {cols}) SELECT * FROM ({kept}{staged}) linhas "
+            f"ORDER BY id_tempo, id_metrica;"
+        ), params)
+        replaced = f" UNION SELECT id_metrica, id_tempo FROM {partition} WHERE id_servico = ANY(:servicos)" if exists else ""
+        self.changed_partitions.update(tuple(row) for row in self.conn.execute(text(
+            f"SELECT id_metrica, id_tempo FROM stg_fato_ida WHERE ano = :ano{replaced};"
+        ), params))
+        inserted = self.conn.execute(text("SELECT COUNT(*) FROM stg_fato_ida WHERE ano = :ano;"), params).scalar()
+        removed = 0
+        if exists:
+            removed = self.conn.execute(text(
+                f"SELECT COUNT(*) FROM {partition} WHERE id_servico = ANY(:servicos);"
+            ), params).scalar()
+            self.conn.execute(text(f"ALTER TABLE fato_ida DETACH PARTITION {partition};"))
+            self.conn.execute(text(f"DROP TABLE {partition};"))
+        self.conn.execute(text(f"ALTER TABLE {new_table} RENAME TO {partition};"))
+        self.conn.execute(text(f"ALTER TABLE fato_ida ATTACH PARTITION {partition} FOR VALUES FROM ({year}) TO ({year + 1});"))
+        self.conn.execute(text(f"ANALYZE {partition};"))
+        return inserted, removed
+
+    def _load_fact_partitions(self, fato_ida_final):
+        """Substitui, na fato particionada, os dados de cada ano presente na carga (troca de partição).
+
+        Cada arquivo traz um serviço: em cada ano, as linhas dos serviços da
+        carga são substituídas e as dos demais serviços são mantidas. Linhas que
+        deixaram de existir na origem são removidas e os outros anos não são tocados.
+        """
+        from sqlalchemy import text
+
+        logging.info(f"Carregando {len(fato_ida_final)} registros na tabela fato_ida (troca de partições)...")
+        inserted = removed = 0
+        self.conn.execute(text(
+            "CREATE TEMP TABLE stg_fato_ida (id_tempo INTEGER, id_grupo INTEGER, id_servico INTEGER, "
+            "id_metrica INTEGER, valor NUMERIC, ano INTEGER) ON COMMIT DROP;"
+        ))
+        self._insert_frame(fato_ida_final, "stg_fato_ida", self.conn)
+        for year, services in fato_ida_final.groupby("ano")["id_servico"].unique().items():
+            year_inserted, year_removed = self._replace_year_partition(int(year), [int(s) for s in services])
+            inserted += year_inserted
+            removed += year_removed
+            logging.info(f"Partição fato_ida_{year} substituída: {year_inserted} linhas da carga, {year_removed} removidas.")
+        self.conn.execute(text("DROP TABLE stg_fato_ida;"))
+        return inserted, removed
+
+    def _ensure_manifest_table(self):
+        """Cria a tabela do manifesto de ingestão em bancos criados antes dela."""
+        from sqlalchemy import text
+
+        self.conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS etl_arquivo_ingerido (
+                arquivo VARCHAR(255) PRIMARY KEY,
+                sha256 CHAR(64) NOT NULL,
+                tamanho BIGINT NOT NULL,
+                modificado_ns BIGINT NOT NULL,
+                versao_leitura VARCHAR(16) NOT NULL,
+                servico VARCHAR(10),
+                periodo_inicio VARCHAR(7),
+                periodo_fim VARCHAR(7),
+                linhas INTEGER,
+                carregado_em TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+        """))
+
+    def load_manifest(self):
+        """Retorna o manifesto de ingestão como ``{arquivo: registro}``."""
+        from sqlalchemy import text
+
+        self._commit_pending()
+        with self.conn.begin():
+            self._ensure_manifest_table()
+            rows = self.conn.execute(text(
+                "SELECT arquivo, sha256, tamanho, modificado_ns, versao_leitura FROM etl_arquivo_ingerido;"
+            )).mappings().all()
+        return {row["arquivo"]: dict(row) for row in rows}
+
+    def record_manifest(self, entries):
+        """Registra (ou atualiza) no manifesto os arquivos carregados: ``{arquivo: entrada}``."""
+        from sqlalchemy import text
+
+        if not entries:
+            return
+        self._commit_pending()
+        with self.conn.begin():
+            self._ensure_manifest_table()
+            self.conn.execute(text("""
+                INSERT INTO etl_arquivo_ingerido (arquivo, sha256, tamanho, modificado_ns, versao_leitura,
+                                                  servico, periodo_inicio, periodo_fim, linhas, carregado_em)
+                VALUES (:arquivo, :sha256, :tamanho, :modificado_ns, :versao_leitura,
+                        :servico, :periodo_inicio, :periodo_fim, :linhas, now())
+                ON CONFLICT (arquivo) DO UPDATE SET
+                    sha256 = EXCLUDED.sha256, tamanho = EXCLUDED.tamanho, modificado_ns = EXCLUDED.modificado_ns,
+                    versao_leitura = EXCLUDED.versao_leitura, servico = EXCLUDED.servico,
+                    periodo_inicio = EXCLUDED.periodo_inicio, periodo_fim = EXCLUDED.periodo_fim,
+                    linhas = EXCLUDED.linhas, carregado_em = EXCLUDED.carregado_em;
+            """), [{"arquivo": filename, **entry} for filename, entry in entries.items()])
+        logging.info(f"Manifesto de ingestão atualizado com {len(entries)} arquivos.")
+
+    def truncate_fact(self):
+        """Esvazia a tabela fato (usado pelo modo de streaming antes de uma recarga completa, dentro de ``transaction()``)."""
+        from sqlalchemy import text
+
+        with self._begin():
+            self.conn.execute(text("TRUNCATE TABLE fato_ida RESTART IDENTITY;"))
+        self.fact_truncated = True
+        logging.info("Tabela fato_ida limpa (TRUNCATE).")
+
+    def refresh_materialized_views(self):
+        """Atualiza (REFRESH ... CONCURRENTLY) as views materializadas afetadas pela carga.
+
+        Uma view só é atualizada se a fato foi recarregada por inteiro ou se
+        alguma linha das métricas de que ela depende foi inserida ou alterada.
+        As colunas das views pivotadas são regeneradas na própria carga
+        (``_regenerate_pivot_views``), independentemente deste refresh.
+        """
+        from sqlalchemy import text
+
+        if not self.fact_truncated and not self.changed_partitions:
+            logging.info("Nenhuma alteração na fato_ida; views materializadas mantidas.")
+            return
+        self._commit_pending()
+        for view, spec in MATERIALIZED_VIEWS.items():
+            try:
+                with self.conn.begin():
+                    populated = self.conn.execute(text(
+                        "SELECT ispopulated FROM pg_matviews WHERE matviewname = :view;"
+                    ), {"view": view}).scalar()
+                    if populated is None:
+                        logging.info(f"View materializada {view} não existe neste banco; ignorando.")
+                        continue
+                    metric_ids = set(self.conn.execute(text(
+                        "SELECT id_metrica FROM dim_metrica WHERE nome = ANY(:names);"
+                    ), {"names": spec["metricas"]}).scalars())
+                    affected_months = {id_tempo for id_metrica, id_tempo in self.changed_partitions if id_metrica in metric_ids}
+                    if not self.fact_truncated and not affected_months:
+                        logging.info(f"View materializada {view} não afetada pela carga; refresh dispensado.")
+                        continue
+                    # CONCURRENTLY mantém a view consultável durante o refresh (exige que já esteja populada)
+                    concurrently = "CONCURRENTLY " if populated else ""
+                    start = time.perf_counter()
+                    self.conn.execute(text(f"REFRESH MATERIALIZED VIEW {concurrently}{view};"))
+                reason = "recarga completa da fato" if self.fact_truncated else f"{len(affected_months)} meses alterados"
+                logging.info(f"View materializada {view} atualizada em {time.perf_counter() - start:.3f}s ({reason}).")
+            except Exception as e:
+                logging.error(f"Erro ao atualizar a view materializada {view}: {e}")
+        self.changed_partitions.clear()
+        self.fact_truncated = False
+
+    def load_data(self, dims_and_fact, load_mode=None):
+        """Carrega todas as dimensões e a tabela fato; retorna True se a carga foi concluída.
+
+        ``load_mode`` sobrepõe ``config.load_mode`` ("full", "incremental" ou "partition").
+        Dimensões e fato são gravadas numa única transação da mesma conexão: uma
+        falha desfaz a carga inteira, sem dimensões órfãs nem fato parcial.
+        Dentro de ``transaction()``, a carga é um savepoint da transação externa.
+        """
         if not self.conn:
             logging.error("Sem conexão com o banco de dados.")
-            return
+            return False
 
         dim_tempo, dim_grupo, dim_servico, dim_metrica, fato_ida_no_ids = dims_and_fact
 
@@ -408,107 +1384,382 @@ class Loader:
             # Importar text aqui também para garantir disponibilidade
             from sqlalchemy import text
 
-            # Carregar/Obter IDs das dimensões
-            map_tempo = self._get_or_insert_dimension(dim_tempo, "dim_tempo", "id_tempo", "ano_mes")
-            map_grupo = self._get_or_insert_dimension(dim_grupo, "dim_grupo_economico", "id_grupo", "nome")
-            map_servico = self._get_or_insert_dimension(dim_servico, "dim_servico", "id_servico", "sigla")
-            map_metrica = self._get_or_insert_dimension(dim_metrica, "dim_metrica", "id_metrica", "nome")
-
-            # Mapear IDs na tabela Fato
-            logging.info("Mapeando IDs na tabela Fato...")
-            fato_ida_final = fato_ida_no_ids.copy()
-            fato_ida_final["id_tempo"] = fato_ida_final["ano_mes"].map(map_tempo)
-            fato_ida_final["id_grupo"] = fato_ida_final["grupo_economico"].map(map_grupo)
-            fato_ida_final["id_servico"] = fato_ida_final["servico_sigla"].map(map_servico)
-            fato_ida_final["id_metrica"] = fato_ida_final["metrica_nome"].map(map_metrica)
-
-            # Selecionar colunas finais para a fato_ida
-            fato_ida_final = fato_ida_final[["id_tempo", "id_grupo", "id_servico", "id_metrica", "valor"]]
-
-            # Remover linhas com IDs nulos 
-            original_rows = len(fato_ida_final)
-            fato_ida_final = fato_ida_final.dropna(subset=["id_tempo", "id_grupo", "id_servico", "id_metrica"])
-            if len(fato_ida_final) < original_rows:
-                logging.warning(f"{original_rows - len(fato_ida_final)} linhas da tabela fato foram removidas devido a IDs de dimensão não encontrados.")
-
-            # Carregar tabela Fato usando TRUNCATE + INSERT
-            if not fato_ida_final.empty:
-                logging.info(f"Carregando {len(fato_ida_final)} registros na tabela fato_ida (TRUNCATE + INSERT)...")
-                with self.conn.begin(): # Inicia transação
-                    # Limpa a tabela fato antes de inserir
-                    self.conn.execute(text("TRUNCATE TABLE fato_ida RESTART IDENTITY;"))
-                    logging.info("Tabela fato_ida limpa (TRUNCATE).")
-                    # Insere os novos dados
-                    fato_ida_final.to_sql("fato_ida", self.engine, if_exists="append", index=False)
-                logging.info("Carga da tabela fato concluída.")
-            else:
-                logging.warning("Nenhum dado válido para carregar na tabela fato.")
+            partitioned = self._prepare_fact_table()
+            load_mode = load_mode or self.config.load_mode
+            if load_mode == "partition" and not partitioned:
+                logging.warning("O modo de carga 'partition' requer a fato_ida particionada (ETL_FACT_PARTITIONING=year); usando carga incremental.")
+                load_mode = "incremental"
+
+            with self._begin():
+                self._load_transaction(dim_tempo, dim_grupo, dim_servico, dim_metrica, fato_ida_no_ids, partitioned, load_mode)
+                pivots_current = self._regenerate_pivot_views() if self.groups_changed else True
+            if pivots_current:
+                self.groups_changed = False # Dentro de transaction(), volta a True se a transação externa for desfeita
+            self._persist_pending_key_cache()
+            return True
 
         except Exception as e:
-            logging.error(f"Erro durante o carregamento dos dados: {e}")
-            # Considerar rollback se estiver em transação
+            logging.error(f"Erro durante o carregamento dos dados (transação desfeita): {e}")
+            # As chaves obtidas na transação desfeita podem não existir mais no banco
+            self._discard_key_caches()
+            return False
+
+    def _regenerate_pivot_views(self):
+        """Executa, na transação da carga, as funções geradoras das views pivotadas por grupo econômico.
+
+        Cada função só recria a view (e a sua versão materializada, já populada)
+        se a lista de grupos mudou. Roda num savepoint: uma falha não desfaz a
+        carga. Retorna True se todas foram executadas.
+        """
+        from sqlalchemy import text
+
+        success = True
+        for view, spec in MATERIALIZED_VIEWS.items():
+            generator = spec.get("gerador")
+            if not generator:
+                continue
+            try:
+                with self.conn.begin_nested():
+                    if not self.conn.execute(text("SELECT to_regprocedure(:function) IS NOT NULL;"),
+                                             {"function": f"{generator}()"}).scalar():
+                        continue
+                    if self.conn.execute(text(f"SELECT {generator}();")).scalar():
+                        logging.info(f"Views pivotadas regeneradas por {generator}() com os grupos econômicos atuais ({view} inclusa).")
+            except Exception as e:
+                logging.error(f"Erro ao regenerar as views pivotadas com {generator}(): {e}")
+                success = False
+        return success
+
+    def _load_transaction(self, dim_tempo, dim_grupo, dim_servico, dim_metrica, fato_ida_no_ids, partitioned, load_mode):
+        """Grava dimensões e fato na transação aberta por ``load_data``."""
+        # Carregar/Obter IDs das dimensões
+        map_tempo = self._get_or_insert_dimension(dim_tempo, "dim_tempo", "id_tempo", "ano_mes")
+        map_grupo = self._get_or_insert_dimension(dim_grupo, "dim_grupo_economico", "id_grupo", "nome")
+        map_servico = self._get_or_insert_dimension(dim_servico, "dim_servico", "id_servico", "sigla")
+        map_metrica = self._get_or_insert_dimension(dim_metrica, "dim_metrica", "id_metrica", "nome")
+
+        # Mapear IDs na tabela Fato
+        logging.info("Mapeando IDs na tabela Fato...")
+        fato_ida_final = pd.DataFrame({
+            "id_tempo": self._map_to_ids(fato_ida_no_ids["ano_mes"], map_tempo),
+            "id_grupo": self._map_to_ids(fato_ida_no_ids["grupo_economico"], map_grupo),
+            "id_servico": self._map_to_ids(fato_ida_no_ids["servico_sigla"], map_servico),
+            "id_metrica": self._map_to_ids(fato_ida_no_ids["metrica_nome"], map_metrica),
+            "valor": fato_ida_no_ids["valor"].to_numpy(),
+        })
+        if partitioned:
+            # Chave de partição: ano de cada período, pela dimensão tempo da carga
+            years = dict(zip(dim_tempo["ano_mes"].astype(str), dim_tempo["ano"]))
+            fato_ida_final["ano"] = self._map_to_ids(fato_ida_no_ids["ano_mes"], years)
+
+        # Remover linhas com IDs nulos 
+        original_rows = len(fato_ida_final)
+        fato_ida_final = fato_ida_final.dropna(subset=self._fact_key())
+        if len(fato_ida_final) < original_rows:
+            logging.warning(f"{original_rows - len(fato_ida_final)} linhas da tabela fato foram removidas devido a IDs de dimensão não encontrados.")
+
+        # Garante tipos inteiros nas chaves e uma única linha por chave natural
+        fato_ida_final = fato_ida_final.astype({col: "int64" for col in self._fact_key()})
+        duplicated = fato_ida_final.duplicated(subset=FATO_NATURAL_KEY, keep="last")
+        if duplicated.any():
+            logging.warning(f"{int(duplicated.sum())} linhas duplicadas (mesma chave natural) foram descartadas da tabela fato.")
+            fato_ida_final = fato_ida_final[~duplicated]
+
+        if not fato_ida_final.empty:
+            with self.metrics.stage("fato_ida", rows_in=len(fato_ida_final)) as stage:
+                if load_mode == "full":
+                    self._load_fact_full(fato_ida_final)
+                    stage.set(rows_out=len(fato_ida_final), modo="full")
+                elif load_mode == "partition":
+                    inserted, removed = self._load_fact_partitions(fato_ida_final)
+                    stage.set(rows_out=inserted, modo="partition", removidas=removed,
+                              anos=int(fato_ida_final["ano"].nunique()))
+                else:
+                    inserted, updated, unchanged = self._load_fact_incremental(fato_ida_final)
+                    stage.set(rows_out=inserted + updated, modo="incremental", inseridas=inserted,
+                              atualizadas=updated, inalteradas=unchanged)
+            logging.info("Carga da tabela fato concluída.")
+        else:
+            logging.warning("Nenhum dado válido para carregar na tabela fato.")
 
-    def close_db(self):
-        """Fecha a conexão com o banco de dados."""
+    def close_db(self, dispose=False):
+        """Devolve a conexão ao pool; com ``dispose``, fecha também as conexões do pool (fim da execução)."""
         if self.conn:
             self.conn.close()
+            self.conn = None
             logging.info("Conexão com PostgreSQL fechada.")
-        if self.engine:
+        if dispose and self.engine:
             self.engine.dispose()
+            self.engine = None
 
 class ETLOrchestrator:
     """Orquestra o fluxo completo do ETL."""
     def __init__(self):
         """Inicializa o orquestrador."""
         self.config = Config()
-        self.extractor = Extractor(self.config)
-        self.transformer = Transformer(self.config)
-        self.loader = Loader(self.config)
+        # O perfilamento de memória usa as etapas instrumentadas (com tracemalloc) para o relatório por etapa
+        profile_memory = self.config.profile_mode == "memory"
+        self.metrics = RunMetrics(enabled=self.config.metrics_enabled or profile_memory,
+                                  trace_memory=self.config.metrics_tracemalloc or profile_memory)
+        self.extractor = Extractor(self.config, self.metrics)
+        self.transformer = Transformer(self.config, self.metrics)
+        self.loader = Loader(self.config, self.metrics)
+
+    def _plan_files(self, read_directory, force=False):
+        """Decide, pelo manifesto de ingestão, quais arquivos processar.
+
+        Retorna ``(arquivos, entradas)``: ``arquivos`` é None para processar
+        todos ou a lista dos novos/alterados (vazia se nada mudou); ``entradas``
+        são os registros do manifesto a gravar após a carga.
+        """
+        if not self.config.manifest_enabled:
+            return None, {}
+        all_files = self.extractor.list_ods_files(read_directory)
+        manifest = {}
+        if not force:
+            if self.loader.connect_db():
+                try:
+                    manifest = self.loader.load_manifest()
+                except Exception as e:
+                    logging.warning(f"Não foi possível ler o manifesto de ingestão, processando todos os arquivos: {e}")
+                finally:
+                    self.loader.close_db()
+        entries = changed_files(read_directory, all_files, manifest, self.extractor.reader_version)
+        if not entries:
+            return [], {}
+        logging.info(f"{len(entries)} de {len(all_files)} arquivos novos ou alterados: {', '.join(entries)}")
+        if self.config.load_mode == "full" and len(entries) < len(all_files):
+            # TRUNCATE + INSERT recarrega a fato inteira: todos os arquivos precisam ser lidos
+            logging.info("Modo de carga 'full': todos os arquivos serão reprocessados.")
+            return None, changed_files(read_directory, all_files, {}, self.extractor.reader_version)
+        return list(entries), entries
+
+    @staticmethod
+    def _source_files(transformed):
+        """Arquivos de origem das linhas de uma saída do ``transform_data``."""
+        return set(transformed[-1].attrs.get("arquivos_origem", ()))
+
+    def _downloaded_files_current(self):
+        """Indica se o download pode ser dispensado: o último tem menos de ``download_interval_hours`` e todos
+        os arquivos do diretório de download já constam, inalterados, no manifesto de ingestão.
+
+        Evita iniciar o navegador (ou consultar o portal) numa execução sem nada a fazer.
+        """
+        if (self.config.download_backend == "none" or not self.config.manifest_enabled
+                or self.config.download_interval_hours <= 0):
+            return False
+        age = self.extractor.last_download_age()
+        if age is None or age > self.config.download_interval_hours * 3600:
+            return False
+        if not self.extractor.list_ods_files(self.config.ods_download_path):
+            return False
+        filenames, _ = self._plan_files(self.config.ods_download_path)
+        if filenames == []:
+            logging.info(f"Último download há {age / 3600:.1f}h (ETL_DOWNLOAD_INTERVAL_HOURS={self.config.download_interval_hours:g}) "
+                         "e nenhum arquivo novo ou alterado desde a última carga; nada a fazer (use --force para baixar e reprocessar).")
+            return True
+        return False
+
+    def _record_manifest(self, entries, loaded_files):
+        """Registra no manifesto de ingestão os arquivos cujas linhas foram carregadas nesta execução.
+
+        Arquivos lidos mas não transformados (ou de lotes que falharam) ficam de
+        fora e são processados de novo na próxima execução.
+        """
+        loaded = {filename: {**entry, **self.extractor.file_stats[filename]}
+                  for filename, entry in entries.items()
+                  if filename in loaded_files and filename in self.extractor.file_stats}
+        skipped = sorted(set(entries) - set(loaded))
+        if skipped:
+            logging.warning(f"Arquivos não carregados, fora do manifesto (serão reprocessados): {', '.join(skipped)}")
+        try:
+            self.loader.record_manifest(loaded)
+        except Exception as e:
+            logging.warning(f"Não foi possível atualizar o manifesto de ingestão: {e}")
+
+    def _run_batch(self, read_directory, filenames=None, manifest_entries=None):
+        """Executa extração, transformação e carga em sequência, com todos os dados em memória."""
+        with self.metrics.stage("extracao") as stage:
+            raw_data = self.extractor.read_ods_files(read_directory, filenames)
+            stage.set(rows_out=sum(len(df) for df in raw_data.values()))
+        if not raw_data:
+             logging.error("Falha na extração dos dados. Abortando ETL.")
+             return
+        logging.info("Extração concluída.")
+        _log_memory("extração")
 
-    def run_etl(self):
-        """Executa o processo ETL completo."""
+        # 2. Transformação
+        logging.info("--- Fase de Transformação ---")
+        with self.metrics.stage("transformacao", rows_in=sum(len(df) for df in raw_data.values())) as stage:
+            transformed_data = self.transformer.transform_data(raw_data)
+            if transformed_data is not None:
+                stage.set(rows_out=len(transformed_data[-1]))
+        del raw_data # Os dados brutos não são mais necessários
+        if transformed_data is None:
+            logging.error("Falha na transformação dos dados. Abortando ETL.")
+            return
+        logging.info("Transformação concluída.")
+        _log_memory("transformação")
+
+        # 3. Carga
+        logging.info("--- Fase de Carga ---")
+        if self.loader.connect_db():
+            with self.metrics.stage("carga", rows_in=len(transformed_data[-1])):
+                loaded = self.loader.load_data(transformed_data)
+            if loaded and self.config.refresh_materialized_views:
+                with self.metrics.stage("views_materializadas"):
+                    self.loader.refresh_materialized_views()
+            if loaded and manifest_entries:
+                self._record_manifest(manifest_entries, self._source_files(transformed_data))
+            self.loader.close_db()
+            _log_memory("carga")
+        else:
+            logging.error("Não foi possível conectar ao banco de dados para carregar os dados.")
+
+    @staticmethod
+    def _pipeline_stage(items, out_queue):
+        """Executada em uma thread: envia cada item para a fila, bloqueando enquanto ela estiver cheia."""
+        try:
+            for item in items:
+                out_queue.put(item)
+        except Exception as e:
+            out_queue.put(_PipelineError(e))
+        finally:
+            out_queue.put(_PIPELINE_END)
+
+    @staticmethod
+    def _drain(in_queue):
+        """Consome os itens de uma fila até o fim do estágio anterior, repassando seus erros."""
+        while True:
+            item = in_queue.get()
+            if item is _PIPELINE_END:
+                return
+            if isinstance(item, _PipelineError):
+                raise item.error
+            yield item
+
+    def _run_streaming(self, read_directory, filenames=None, manifest_entries=None):
+        """Executa o ETL em streaming: cada lote é transformado e carregado enquanto o próximo é lido.
+
+        Extração e transformação rodam em threads ligadas por filas limitadas
+        (``stream_queue_size``), de modo que no máximo alguns lotes ficam em
+        memória ao mesmo tempo, independente da quantidade de arquivos.
+        """
+        logging.info("--- ETL em streaming (extração -> transformação -> carga por lote) ---")
+        if not self.loader.connect_db():
+            logging.error("Não foi possível conectar ao banco de dados para carregar os dados.")
+            return
+
+        try:
+            load_mode = self.config.load_mode
+            full_reload = load_mode == "full"
+            if full_reload:
+                load_mode = "incremental" # Após o TRUNCATE, os lotes são mesclados pela chave natural
+            elif load_mode == "partition" and self.config.stream_batch_rows > 0:
+                # Um arquivo dividido em vários lotes: cada troca apagaria os lotes anteriores do mesmo ano/serviço
+                logging.warning("O modo de carga 'partition' requer um lote por arquivo no streaming (ETL_STREAM_BATCH_ROWS=0); usando carga incremental.")
+                load_mode = "incremental"
+
+            raw_queue = queue.Queue(maxsize=self.config.stream_queue_size)
+            transformed_queue = queue.Queue(maxsize=self.config.stream_queue_size)
+            batches = self.extractor.iter_ods_batches(read_directory, self.config.stream_batch_rows, filenames)
+            transformed = (t for t in map(self.transformer.transform_data, self._drain(raw_queue)) if t is not None)
+            threading.Thread(target=self._pipeline_stage, args=(batches, raw_queue), name="etl-extracao", daemon=True).start()
+            threading.Thread(target=self._pipeline_stage, args=(transformed, transformed_queue), name="etl-transformacao", daemon=True).start()
+
+            loaded_batches = 0
+            failed_batches = 0
+            loaded_files = set()
+            failed_files = set() # Um arquivo dividido em lotes só é registrado se todos foram carregados
+            # Recarga completa: TRUNCATE e todos os lotes numa só transação (uma falha mantém a fato anterior)
+            with self.loader.transaction() if full_reload else contextlib.nullcontext():
+                if full_reload:
+                    self.loader.truncate_fact()
+                for batch in self._drain(transformed_queue):
+                    with self.metrics.stage("carga", rows_in=len(batch[-1])):
+                        if self.loader.load_data(batch, load_mode=load_mode):
+                            loaded_batches += 1
+                            loaded_files |= self._source_files(batch)
+                        else:
+                            failed_batches += 1
+                            failed_files |= self._source_files(batch)
+                    if failed_batches and full_reload:
+                        raise RuntimeError("lote não carregado durante a recarga completa")
+            if loaded_batches:
+                logging.info(f"Streaming concluído: {loaded_batches} lotes carregados.")
+                if self.config.refresh_materialized_views:
+                    with self.metrics.stage("views_materializadas"):
+                        self.loader.refresh_materialized_views()
+                if manifest_entries:
+                    self._record_manifest(manifest_entries, loaded_files - failed_files)
+            else:
+                logging.error("Nenhum lote foi extraído e transformado com sucesso.")
+            _log_memory("streaming")
+        except Exception as e:
+            logging.error(f"Erro no pipeline de streaming: {e}")
+        finally:
+            self.loader.close_db()
+
+    def run_etl(self, force=False):
+        """Executa o processo ETL completo e grava o relatório de métricas (se habilitado).
+
+        ``force`` ignora o manifesto de ingestão e reprocessa todos os arquivos.
+        Com ``config.profile_mode``, a execução é perfilada (ver profiling.py).
+        """
+        try:
+            with self._profiler(), self.metrics.stage("etl"):
+                self._run_etl(force)
+        finally:
+            self.loader.close_db(dispose=True)
+            self.metrics.write(self.config.metrics_path, prometheus=self.config.metrics_prometheus)
+
+    def _profiler(self):
+        """Perfilador configurado para a execução, ou um contexto vazio com o perfilamento desligado."""
+        if not self.config.profile_mode:
+            return contextlib.nullcontext()
+        from profiling import MODES, Profiler
+
+        if self.config.profile_mode not in MODES:
+            logging.warning(f"Modo de perfilamento desconhecido: {self.config.profile_mode} (use {', '.join(MODES)}); execução sem perfilamento.")
+            return contextlib.nullcontext()
+        return Profiler(self.config.profile_mode, self.config.profile_path, self.metrics,
+                        top=self.config.profile_top, interval_ms=self.config.profile_interval_ms)
+
+    def _run_etl(self, force=False):
+        """Executa as fases do ETL (download, extração, transformação e carga)."""
         logging.info("===========================================")
         logging.info("Iniciando processo ETL IDA Anatel...")
         logging.info("===========================================")
 
         # 1. Extração
         logging.info("--- Fase de Extração ---")
+        if not force and self._downloaded_files_current():
+            return
         # Tenta download automático
         download_success = self.extractor.download_data()
 
         # Decide qual diretório ler
         read_directory = None
         if download_success and os.path.exists(self.config.ods_download_path) and os.listdir(self.config.ods_download_path):
-            logging.info("Usando arquivos ODS do diretório de download automático.")
+            logging.info("Usando arquivos do diretório de download automático.")
             read_directory = self.config.ods_download_path
         elif os.path.exists(self.config.ods_manual_path) and os.listdir(self.config.ods_manual_path):
-            logging.info("Download automático falhou ou diretório vazio. Usando arquivos ODS do diretório manual.")
+            logging.info("Download automático falhou ou diretório vazio. Usando arquivos do diretório manual.")
             read_directory = self.config.ods_manual_path
         else:
-            logging.error("Nenhum arquivo ODS encontrado nos diretórios de download ou manual.")
+            logging.error("Nenhum arquivo de entrada encontrado nos diretórios de download ou manual.")
             return
 
-        raw_data = self.extractor.read_ods_files(read_directory)
-        if not raw_data:
-             logging.error("Falha na extração dos dados. Abortando ETL.")
-             return
-        logging.info("Extração concluída.")
-
-        # 2. Transformação
-        logging.info("--- Fase de Transformação ---")
-        transformed_data = self.transformer.transform_data(raw_data)
-        if transformed_data is None:
-            logging.error("Falha na transformação dos dados. Abortando ETL.")
+        filenames, manifest_entries = self._plan_files(read_directory, force)
+        if filenames is not None and not filenames:
+            logging.info("Nenhum arquivo novo ou alterado desde a última carga; nada a fazer (use --force para reprocessar).")
             return
-        logging.info("Transformação concluída.")
 
-        # 3. Carga
-        logging.info("--- Fase de Carga ---")
-        if self.loader.connect_db():
-            self.loader.load_data(transformed_data)
-            self.loader.close_db()
+        if self.config.streaming:
+            with self.metrics.stage("streaming"):
+                self._run_streaming(read_directory, filenames, manifest_entries)
         else:
-            logging.error("Não foi possível conectar ao banco de dados para carregar os dados.")
+            self._run_batch(read_directory, filenames, manifest_entries)
 
         logging.info("===========================================")
         logging.info("Processo ETL concluído.")
@@ -516,12 +1767,24 @@ class ETLOrchestrator:
 
 # Bloco principal de execução
 if __name__ == "__main__":
-    # Adiciona um pequeno delay para dar tempo ao DB iniciar no docker-compose
-    startup_delay = int(os.getenv("ETL_STARTUP_DELAY", "5"))
-    logging.info(f"Aguardando {startup_delay} segundos para o banco de dados iniciar...")
-    time.sleep(startup_delay)
+    parser = argparse.ArgumentParser(description="ETL do Índice de Desempenho no Atendimento (IDA) da Anatel.")
+    parser.add_argument("--clear-cache", action="store_true", help="Invalida o cache de leitura dos ODS e encerra.")
+    parser.add_argument("--force", action="store_true", help="Ignora o manifesto de ingestão e reprocessa todos os arquivos.")
+    parser.add_argument("--profile", nargs="?", const="cpu", choices=["cpu", "sample", "memory"],
+                        help="Perfila a execução (padrão: cpu) e grava os resultados em processed_ods/profile/ (equivale a ETL_PROFILE).")
+    args = parser.parse_args()
+    if args.profile:
+        os.environ["ETL_PROFILE"] = args.profile
+
+    if args.clear_cache:
+        config = Config()
+        ParseCache(config.parse_cache_path, config.parse_cache_max_mb * 1024 * 1024, {}).clear()
+        raise SystemExit(0)
 
     # Cria e executa o orquestrador
     orchestrator = ETLOrchestrator()
-    orchestrator.run_etl()
+    # Aguarda o banco aceitar conexões (no docker-compose ele pode ainda estar iniciando)
+    if not orchestrator.loader.wait_for_db():
+        raise SystemExit(1)
+    orchestrator.run_etl(force=args.force)
 
@@ -0,0 +1,240 @@
+"""Leitor de planilhas ODS em streaming.
+
+Substitui ``pd.read_excel(..., engine="odf")``: em vez de montar o DOM
+completo do documento com o odfpy, percorre o ``content.xml`` de dentro do
+arquivo zip com ``iterparse``, liberando cada linha logo após processá-la.
+"""
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+# Namespaces usados pelo formato OpenDocument
+NS_TABLE = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+NS_OFFICE = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+NS_TEXT = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+
+TAG_TABLE = f"{{{NS_TABLE}}}table"
+TAG_ROW = f"{{{NS_TABLE}}}table-row"
+TAG_CELL = f"{{{NS_TABLE}}}table-cell"
+TAG_COVERED_CELL = f"{{{NS_TABLE}}}covered-table-cell"
+TAG_P = f"{{{NS_TEXT}}}p"
+TAG_S = f"{{{NS_TEXT}}}s"
+
+ATTR_ROWS_REPEATED = f"{{{NS_TABLE}}}number-rows-repeated"
+ATTR_COLS_REPEATED = f"{{{NS_TABLE}}}number-columns-repeated"
+ATTR_VALUE_TYPE = f"{{{NS_OFFICE}}}value-type"
+ATTR_VALUE = f"{{{NS_OFFICE}}}value"
+ATTR_DATE_VALUE = f"{{{NS_OFFICE}}}date-value"
+ATTR_BOOLEAN_VALUE = f"{{{NS_OFFICE}}}boolean-value"
+ATTR_S_COUNT = f"{{{NS_TEXT}}}c"
+
+NUMERIC_TYPES = ("float", "percentage", "currency")
+
+
+def _cell_text(cell):
+    """Extrai o texto de uma célula, respeitando parágrafos e espaços (text:s)."""
+    paragraphs = []
+    for p in cell.iter(TAG_P):
+        parts = []
+        if p.text:
+            parts.append(p.text)
+        for child in p.iter():
+            if child is p:
+                continue
+            if child.tag == TAG_S:
+                parts.append(" " * int(child.get(ATTR_S_COUNT, "1")))
+            elif child.text:
+                parts.append(child.text)
+            if child.tail:
+                parts.append(child.tail)
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+
+def _cell_value(cell):
+    """Converte uma célula ODS para o valor Python tipado correspondente."""
+    value_type = cell.get(ATTR_VALUE_TYPE)
+    if value_type is None:
+        return None
+    if value_type in NUMERIC_TYPES:
+        return float(cell.get(ATTR_VALUE))
+    if value_type == "date":
+        return pd.Timestamp(cell.get(ATTR_DATE_VALUE))
+    if value_type == "boolean":
+        return cell.get(ATTR_BOOLEAN_VALUE) == "true"
+    text = _cell_text(cell)
+    return text if text != "" else None
+
+
+def _parse_row(row):
+    """Converte uma linha em lista de valores, expandindo repetições de colunas sob demanda.
+
+    Células vazias repetidas só são materializadas quando seguidas de uma
+    célula com valor, de modo que o preenchimento até a coluna 16384 nunca
+    chega a ser alocado.
+    """
+    values = []
+    pending_empty = 0
+    for cell in row:
+        if cell.tag not in (TAG_CELL, TAG_COVERED_CELL):
+            continue
+        repeat = int(cell.get(ATTR_COLS_REPEATED, "1"))
+        value = _cell_value(cell) if cell.tag == TAG_CELL else None
+        if value is None:
+            pending_empty += repeat
+            continue
+        if pending_empty:
+            values.extend([None] * pending_empty)
+            pending_empty = 0
+        values.extend([value] * repeat)
+    return values
+
+
+def iter_ods_rows(file_path, sheet=0, skip_rows=0):
+    """Gera as linhas de uma planilha ODS como listas de valores tipados.
+
+    ``sheet`` pode ser o índice ou o nome da planilha. As ``skip_rows``
+    primeiras linhas são descartadas sem conversão dos valores das células.
+    Linhas vazias repetidas só são emitidas se seguidas de uma linha com
+    conteúdo (as linhas vazias ao final da planilha são descartadas).
+    """
+    with zipfile.ZipFile(file_path) as archive, archive.open("content.xml") as content:
+        table_index = -1
+        table = None
+        in_target = False
+        found = False
+        row_number = 0
+        pending_empty_rows = 0
+        depth = 0  # Linhas de subtabelas aninhadas são tratadas junto da linha externa
+        context = ET.iterparse(content, events=("start", "end"))
+        for event, elem in context:
+            if event == "start":
+                if elem.tag == TAG_TABLE:
+                    table_index += 1
+                    in_target = sheet == table_index or sheet == elem.get(f"{{{NS_TABLE}}}name")
+                    found = found or in_target
+                    table = elem
+                elif elem.tag == TAG_ROW and in_target:
+                    depth += 1
+                continue
+
+            if elem.tag == TAG_ROW and in_target:
+                depth -= 1
+                if depth:
+                    continue
+                repeat = int(elem.get(ATTR_ROWS_REPEATED, "1"))
+                if row_number + repeat <= skip_rows:
+                    # Linha de cabeçalho descartada: não converte as células
+                    row_number += repeat
+                    table.clear()
+                    continue
+                if row_number < skip_rows:
+                    repeat -= skip_rows - row_number
+                    row_number = skip_rows
+                values = _parse_row(elem)
+                # Descarta as linhas já processadas para manter a memória constante
+                table.clear()
+                row_number += repeat
+                if not values:
+                    pending_empty_rows += repeat
+                    continue
+                for _ in range(pending_empty_rows):
+                    yield []
+                pending_empty_rows = 0
+                for _ in range(repeat):
+                    yield list(values)
+            elif elem.tag == TAG_TABLE and in_target:
+                elem.clear()
+                break
+        if not found:
+            raise ValueError(f"Planilha {sheet!r} não encontrada em {file_path}")
+
+
+def _to_column(values):
+    """Converte uma lista de valores em array NumPy, usando float64 quando possível."""
+    if all(v is None or isinstance(v, float) for v in values):
+        return np.array([np.nan if v is None else v for v in values], dtype="float64")
+    return np.array([np.nan if v is None else v for v in values], dtype=object)
+
+
+def _column_names(header_row, width):
+    """Monta os nomes das colunas a partir da linha de cabeçalho, como o pandas faz."""
+    names = []
+    seen = {}
+    for i in range(width):
+        name = header_row[i] if i < len(header_row) else None
+        if name is None:
+            name = f"Unnamed: {i}"
+        elif isinstance(name, float) and name.is_integer():
+            name = int(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def read_ods(file_path, header=0, sheet=0):
+    """Lê uma planilha ODS para um DataFrame, equivalente a ``pd.read_excel(engine="odf", header=...)``.
+
+    As colunas são montadas diretamente como arrays (float64 para colunas
+    numéricas), sem passar por um DataFrame intermediário de objetos.
+    """
+    return frame_from_rows(iter_ods_rows(file_path, sheet=sheet, skip_rows=header))
+
+
+def frame_from_rows(rows):
+    """Monta o DataFrame a partir de linhas de valores (a primeira é o cabeçalho).
+
+    Usado também pelos leitores de outros formatos de planilha, para que todos
+    produzam as mesmas colunas e tipos que ``read_ods``.
+    """
+    rows = iter(rows)
+    header_row = next(rows, [])
+    columns = [[] for _ in range(len(header_row))]
+    n_rows = 0
+    for values in rows:
+        if len(values) > len(columns):
+            # Linha mais larga que o cabeçalho: completa as colunas novas com vazios
+            columns.extend([None] * n_rows for _ in range(len(values) - len(columns)))
+        for i, column in enumerate(columns):
+            column.append(values[i] if i < len(values) else None)
+        n_rows += 1
+
+    names = _column_names(header_row, len(columns))
+    return pd.DataFrame({name: _to_column(column) for name, column in zip(names, columns)})
+
+
+def pack_frame(df):
+    """Converte um DataFrame em buffers NumPy compactos para transferência entre processos.
+
+    Colunas numéricas seguem como arrays float64; as demais são fatoradas em
+    códigos inteiros e uma tabela pequena de valores distintos, evitando
+    serializar (pickle) uma coluna inteira de objetos Python.
+    """
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            columns.append((name, "num", series.to_numpy(dtype="float64"), None))
+        else:
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            columns.append((name, "cat", codes.astype("int32"), np.asarray(uniques, dtype=object)))
+    return columns
+
+
+def unpack_frame(columns):
+    """Reconstrói o DataFrame a partir dos buffers gerados por ``pack_frame``."""
+    data = {}
+    for name, kind, values, uniques in columns:
+        if kind == "num":
+            data[name] = values
+        else:
+            column = uniques.take(values) if len(uniques) else np.empty(len(values), dtype=object)
+            column[values < 0] = np.nan
+            data[name] = column
+    return pd.DataFrame(data)
@@ -0,0 +1,154 @@
+"""Cache em disco dos arquivos ODS já lidos.
+
+Cada entrada é indexada pelo hash SHA-256 do conteúdo do arquivo somado à
+versão do leitor e às configurações que afetam a leitura. As colunas são
+gravadas como arquivos ``.npy`` (carregados com ``mmap_mode="r"``), no mesmo
+formato compacto usado entre os processos de leitura (``pack_frame``). Os
+nomes das colunas são gravados com o tipo (texto, número ou data), pois
+cabeçalhos de data precisam voltar como ``Timestamp``.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Incrementar quando o formato gerado pelo leitor (ou o das entradas) mudar, invalidando o cache
+PARSER_VERSION = "2"
+META_FILE = "meta.json"
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Calcula o hash SHA-256 do conteúdo de um arquivo."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_version(settings):
+    """Identificador curto da versão do leitor somada às configurações que afetam a leitura."""
+    return hashlib.sha256(
+        json.dumps({"parser": PARSER_VERSION, **settings}, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def encode_column_name(name):
+    """Nome de coluna serializável em JSON; datas viram ``{"kind": "timestamp", "value": ISO}``."""
+    if isinstance(name, datetime):
+        return {"kind": "timestamp", "value": pd.Timestamp(name).isoformat()}
+    if name is None or isinstance(name, (str, bool, int, float)):
+        return name
+    raise TypeError(f"Nome de coluna de tipo não suportado pelo cache: {name!r} ({type(name).__name__})")
+
+
+def decode_column_name(value):
+    """Inverso de ``encode_column_name``."""
+    if isinstance(value, dict):
+        if value.get("kind") == "timestamp":
+            return pd.Timestamp(value["value"])
+        raise ValueError(f"Tipo de nome de coluna desconhecido: {value!r}")
+    return value
+
+
+class ParseCache:
+    """Cache de arquivos lidos, com limite de tamanho e descarte dos menos usados."""
+    def __init__(self, cache_dir, max_bytes, settings):
+        """Inicializa o cache; ``settings`` reúne as configurações que afetam a leitura."""
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = settings_version(settings)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, file_path):
+        """Retorna a chave do cache para o arquivo (hash do conteúdo + versão)."""
+        return f"{file_sha256(file_path)[:32]}-{self.version}"
+
+    def _entry_dir(self, key):
+        """Diretório onde a entrada ``key`` é gravada."""
+        return os.path.join(self.cache_dir, key)
+
+    def has(self, key):
+        """Indica se existe uma entrada completa para ``key``."""
+        return os.path.exists(os.path.join(self._entry_dir(key), META_FILE))
+
+    def load(self, key):
+        """Carrega uma entrada do cache; retorna None se não existir ou estiver corrompida."""
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            packed = []
+            for i, (encoded_name, kind) in enumerate(meta["columns"]):
+                name = decode_column_name(encoded_name)
+                values = np.load(os.path.join(entry_dir, f"{i}.npy"), mmap_mode="r")
+                uniques = None
+                if kind == "cat":
+                    uniques = np.load(os.path.join(entry_dir, f"{i}.uniques.npy"), allow_pickle=True)
+                packed.append((name, kind, values, uniques))
+            os.utime(meta_path) # Marca como usado recentemente (para o descarte LRU)
+            return packed
+        except Exception as e:
+            logging.warning(f"Entrada de cache {key} inválida, descartando: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+    def store(self, key, packed):
+        """Grava uma entrada no cache e aplica o limite de tamanho."""
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp{os.getpid()}"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            for i, (name, kind, values, uniques) in enumerate(packed):
+                np.save(os.path.join(tmp_dir, f"{i}.npy"), values)
+                if kind == "cat":
+                    np.save(os.path.join(tmp_dir, f"{i}.uniques.npy"), uniques, allow_pickle=True)
+            with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({"columns": [(encode_column_name(name), kind) for name, kind, _, _ in packed]}, f)
+            # Renomeação atômica: leitores nunca veem uma entrada pela metade
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(tmp_dir, entry_dir)
+        except Exception as e:
+            logging.warning(f"Não foi possível gravar a entrada de cache {key}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.evict()
+
+    def _entries(self):
+        """Lista as entradas como (último uso, tamanho em bytes, diretório)."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(entry_dir, META_FILE)
+            if not os.path.exists(meta_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+            entries.append((os.path.getmtime(meta_path), size, entry_dir))
+        return entries
+
+    def evict(self):
+        """Remove as entradas menos usadas até o cache caber em ``max_bytes``."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        while entries and total > self.max_bytes:
+            _, size, entry_dir = entries.pop(0)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            logging.info(f"Entrada de cache removida por limite de tamanho: {os.path.basename(entry_dir)}")
+
+    def clear(self):
+        """Invalida todo o cache."""
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            removed += 1
+        logging.info(f"Cache de leitura invalidado ({removed} entradas removidas de {self.cache_dir}).")
+        return removed
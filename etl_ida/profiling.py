@@ -0,0 +1,237 @@
+"""Modo de perfilamento do ETL (``python main_etl.py --profile MODO`` ou ``ETL_PROFILE=MODO``).
+
+Um modo por execução, pois os perfiladores distorcem as medidas uns dos outros:
+
+- ``cpu``: cProfile (determinístico). Grava ``etl.prof`` (pstats, snakeviz),
+  ``etl_top.txt`` (funções com maior tempo acumulado e próprio) e
+  ``etl.collapsed``, pilhas reconstruídas a partir do grafo de chamadas do
+  cProfile (o tempo de uma função é dividido entre os chamadores na proporção
+  das chamadas de cada um, logo é uma aproximação);
+- ``sample``: amostragem das pilhas de todas as threads a cada ``interval_ms``
+  (``sys._current_frames``), com custo baixo e pilhas exatas. Grava
+  ``etl.collapsed`` com a quantidade de amostras por pilha (tempo de parede,
+  incluindo esperas de E/S e de filas);
+- ``memory``: tracemalloc. Ao fim de cada fase instrumentada (``RunMetrics``:
+  extração, transformação, carga...) compara as alocações com as do início
+  da fase e grava em ``alocacoes.txt`` as linhas de código que mais alocaram
+  memória ainda retida, com o pico da fase (e de cada etapa interna).
+
+Os arquivos ``.collapsed`` estão no formato de pilhas colapsadas
+(``a;b;c valor``), aceito pelo flamegraph.pl, inferno e speedscope. A leitura
+em processos paralelos (``ETL_PARSE_WORKERS`` > 1) não é perfilada.
+"""
+import cProfile
+import collections
+import logging
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from datetime import datetime
+
+MODES = ("cpu", "sample", "memory")
+# Modo memory: apenas as fases (etl/extracao, etl/transformacao, ...) recebem relatório; cada snapshot
+# percorre todas as alocações vivas e custaria mais que as etapas curtas (arquivos, dimensões)
+_MAX_STAGE_DEPTH = 2
+# Alocações do próprio tracemalloc e do mecanismo de import não entram nos relatórios
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+# Caminhos de execução (modo cpu) com menos que esta fração do tempo total não são expandidos
+_MIN_PATH_FRACTION = 0.0005
+_MAX_DEPTH = 200
+
+
+def _frame_label(filename, lineno, funcname):
+    """Rótulo de uma função nas pilhas colapsadas ("função (arquivo:linha)"), sem o separador de quadros (";")."""
+    label = funcname if filename == "~" else f"{funcname} ({os.path.basename(filename)}:{lineno})" # "~": funções nativas
+    return label.replace(";", ",")
+
+
+def collapsed_from_stats(stats):
+    """Reconstrói pilhas colapsadas (microssegundos por pilha) a partir do grafo de chamadas de um ``pstats.Stats``.
+
+    O cProfile guarda apenas pares chamador -> chamado; o tempo de cada função
+    é distribuído pelos caminhos que levam a ela na proporção do tempo
+    acumulado de cada chamador. Recursões não são expandidas.
+    """
+    entries = stats.stats # função -> (chamadas primitivas, chamadas, tempo próprio, tempo acumulado, chamadores)
+    children = collections.defaultdict(list)
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+    roots = [func for func, entry in entries.items() if not entry[4]]
+    total = sum(entries[root][3] for root in roots)
+    min_time = total * _MIN_PATH_FRACTION
+    collapsed = collections.Counter()
+
+    def visit(func, path, labels, cumulative):
+        _, _, own, func_cumulative, _ = entries[func]
+        ratio = min(cumulative / func_cumulative, 1.0) if func_cumulative else 0.0
+        labels = labels + [_frame_label(*func)]
+        collapsed[";".join(labels)] += own * ratio * 1e6
+        if len(labels) >= _MAX_DEPTH:
+            return
+        for child, child_cumulative in children.get(func, ()):
+            child_time = child_cumulative * ratio
+            if child not in path and child_time >= min_time:
+                visit(child, path | {child}, labels, child_time)
+
+    for root in roots:
+        visit(root, {root}, [], entries[root][3])
+    return {stack: int(round(us)) for stack, us in collapsed.items() if us >= 1}
+
+
+def _write_collapsed(path, stacks):
+    """Grava as pilhas colapsadas (``pilha valor`` por linha, da maior para a menor)."""
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, value in sorted(stacks.items(), key=lambda item: -item[1]):
+            f.write(f"{stack} {value}\n")
+
+
+class _StackSampler(threading.Thread):
+    """Thread que amostra periodicamente as pilhas de todas as outras threads do processo."""
+    def __init__(self, interval_s):
+        super().__init__(name="etl-profile-sampler", daemon=True)
+        self.interval_s = interval_s
+        self.samples = collections.Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval_s):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    code = frame.f_code
+                    labels.append(_frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)).replace(";", ","))
+                self.samples[";".join(reversed(labels))] += 1
+
+    def stop(self):
+        """Interrompe a amostragem e aguarda a thread terminar."""
+        self._stopped.set()
+        self.join()
+
+
+def _top_allocations(snapshot, start, top):
+    """As ``top`` linhas de código com maior aumento de memória alocada entre os snapshots ``start`` e ``snapshot``."""
+    diff = (stat for stat in snapshot.compare_to(start, "lineno")
+            if stat.size_diff > 0 and stat.traceback[0].filename not in _IGNORED_FILES)
+    return [stat for _, stat in zip(range(top), diff)]
+
+
+class _StageAllocations:
+    """Observador das fases do ``RunMetrics``: alocações retidas em cada fase (diferença entre snapshots)."""
+    def __init__(self, top):
+        self.top = top
+        self.started = {}
+        self.sections = []
+        self._lock = threading.Lock()
+
+    def stage_started(self, stage):
+        if stage.path.count("/") < _MAX_STAGE_DEPTH:
+            snapshot = tracemalloc.take_snapshot()
+            with self._lock:
+                self.started[id(stage)] = snapshot
+
+    def stage_finished(self, stage, record):
+        with self._lock:
+            start = self.started.pop(id(stage), None)
+        if start is None:
+            return
+        diff = _top_allocations(tracemalloc.take_snapshot(), start, self.top)
+        with self._lock:
+            self.sections.append((stage.path, record, diff))
+
+
+class Profiler:
+    """Gerenciador de contexto que perfila o bloco no modo indicado e grava os resultados em ``directory``."""
+    def __init__(self, mode, directory, metrics=None, top=20, interval_ms=5.0):
+        """``metrics`` (``RunMetrics`` habilitado) é necessário no modo ``memory`` para o relatório por etapa."""
+        self.mode = mode
+        self.directory = os.path.join(directory, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.metrics = metrics
+        self.top = top
+        self.interval_ms = interval_ms
+        self._profile = None
+        self._sampler = None
+        self._allocations = None
+        self._started_tracing = False
+        self._start_snapshot = None
+
+    def __enter__(self):
+        logging.info(f"Perfilamento da execução habilitado (modo {self.mode}).")
+        if self.mode == "cpu":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.mode == "sample":
+            self._sampler = _StackSampler(self.interval_ms / 1000)
+            self._sampler.start()
+        elif self.mode == "memory":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._allocations = _StageAllocations(self.top)
+            if self.metrics is not None:
+                self.metrics.listeners.append(self._allocations)
+            self._start_snapshot = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._profile is not None:
+                self._profile.disable()
+                self._write_cpu()
+            elif self._sampler is not None:
+                self._sampler.stop()
+                _write_collapsed(os.path.join(self.directory, "etl.collapsed"), self._sampler.samples)
+            elif self._allocations is not None:
+                self._write_memory()
+            logging.info(f"Resultados do perfilamento gravados em {self.directory}.")
+        except Exception as e:
+            logging.error(f"Falha ao gravar os resultados do perfilamento: {e}")
+        finally:
+            if self._allocations is not None and self.metrics is not None:
+                self.metrics.listeners.remove(self._allocations)
+            if self._started_tracing:
+                tracemalloc.stop()
+        return False
+
+    def _write_cpu(self):
+        """Grava o .prof, o relatório das funções mais custosas e as pilhas colapsadas."""
+        self._profile.dump_stats(os.path.join(self.directory, "etl.prof"))
+        with open(os.path.join(self.directory, "etl_top.txt"), "w", encoding="utf-8") as f:
+            stats = pstats.Stats(self._profile, stream=f).strip_dirs()
+            f.write(f"=== {self.top} funções com maior tempo acumulado ===\n")
+            stats.sort_stats("cumulative").print_stats(self.top)
+            f.write(f"=== {self.top} funções com maior tempo próprio ===\n")
+            stats.sort_stats("tottime").print_stats(self.top)
+        _write_collapsed(os.path.join(self.directory, "etl.collapsed"), collapsed_from_stats(pstats.Stats(self._profile)))
+
+    def _write_memory(self):
+        """Grava o relatório das alocações por etapa e da execução inteira."""
+        # O pico é zerado a cada etapa (RunMetrics com tracemalloc): o da execução é o maior entre as etapas
+        peak_mb = max([tracemalloc.get_traced_memory()[1] / 1024 / 1024] + [
+            record["tracemalloc_pico_mb"] for _, record, _ in self._allocations.sections if "tracemalloc_pico_mb" in record
+        ])
+        total = _top_allocations(tracemalloc.take_snapshot(), self._start_snapshot, self.top)
+        with open(os.path.join(self.directory, "alocacoes.txt"), "w", encoding="utf-8") as f:
+            f.write("Alocações retidas ao fim de cada fase (diferença em relação ao início da fase), por linha de código.\n")
+            f.write("Fases executadas em paralelo (streaming) também contam as alocações das demais threads; o tempo\n")
+            f.write("da etapa etl inclui o custo dos snapshots das fases.\n\n")
+            for path, record, diff in self._allocations.sections:
+                stage_peak = record.get("tracemalloc_pico_mb")
+                peak_text = f", pico {stage_peak:.1f} MB" if stage_peak is not None else ""
+                f.write(f"== {path} (tempo {record['tempo_s']:.3f}s{peak_text})\n")
+                for stat in diff:
+                    f.write(f"  {stat}\n")
+                f.write("\n")
+            f.write(f"== execução inteira (pico {peak_mb:.1f} MB)\n")
+            for stat in total:
+                f.write(f"  {stat}\n")
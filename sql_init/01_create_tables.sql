@@ -69,4 +69,31 @@ COMMENT ON COLUMN fato_ida.id_servico IS 'Chave estrangeira referenciando a dime
 COMMENT ON COLUMN fato_ida.id_metrica IS 'Chave estrangeira referenciando a dimensão Métrica (dim_metrica).';
 COMMENT ON COLUMN fato_ida.valor IS 'Valor numérico da métrica para a combinação específica das dimensões. Pode ser nulo se o dado não estiver disponível.';
 
+-- Chave natural da tabela fato, usada pela carga incremental (INSERT ... ON CONFLICT)
+CREATE UNIQUE INDEX uq_fato_ida_chave_natural ON fato_ida (id_tempo, id_grupo, id_servico, id_metrica);
 
+-- Manifesto de ingestão: arquivos já carregados (o ETL processa apenas os novos ou alterados)
+CREATE TABLE etl_arquivo_ingerido (
+    arquivo VARCHAR(255) PRIMARY KEY,
+    sha256 CHAR(64) NOT NULL,
+    tamanho BIGINT NOT NULL,
+    modificado_ns BIGINT NOT NULL,
+    versao_leitura VARCHAR(16) NOT NULL,
+    servico VARCHAR(10),
+    periodo_inicio VARCHAR(7),
+    periodo_fim VARCHAR(7),
+    linhas INTEGER,
+    carregado_em TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+COMMENT ON TABLE etl_arquivo_ingerido IS 'Manifesto de ingestão do ETL: um registro por arquivo ODS carregado no Data Mart.';
+COMMENT ON COLUMN etl_arquivo_ingerido.arquivo IS 'Nome do arquivo ODS (chave primária).';
+COMMENT ON COLUMN etl_arquivo_ingerido.sha256 IS 'Hash SHA-256 do conteúdo do arquivo carregado.';
+COMMENT ON COLUMN etl_arquivo_ingerido.tamanho IS 'Tamanho do arquivo em bytes.';
+COMMENT ON COLUMN etl_arquivo_ingerido.modificado_ns IS 'Data de modificação do arquivo (nanossegundos desde a época), usada para evitar recalcular o hash.';
+COMMENT ON COLUMN etl_arquivo_ingerido.versao_leitura IS 'Versão do leitor e das configurações de leitura usadas na carga.';
+COMMENT ON COLUMN etl_arquivo_ingerido.servico IS 'Sigla do serviço do arquivo (ex: SCM, SMP, STFC).';
+COMMENT ON COLUMN etl_arquivo_ingerido.periodo_inicio IS 'Primeiro período (YYYY-MM) presente no arquivo.';
+COMMENT ON COLUMN etl_arquivo_ingerido.periodo_fim IS 'Último período (YYYY-MM) presente no arquivo.';
+COMMENT ON COLUMN etl_arquivo_ingerido.linhas IS 'Quantidade de linhas lidas do arquivo.';
+COMMENT ON COLUMN etl_arquivo_ingerido.carregado_em IS 'Momento da última carga do arquivo.';
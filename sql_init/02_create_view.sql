@@ -1,6 +1,7 @@
 -- Script SQL para criação da View analítica v_taxa_variacao_resolvidas_5d
 
-CREATE OR REPLACE VIEW v_taxa_variacao_resolvidas_5d AS
+-- View base (formato longo): uma linha por mês e grupo econômico, sem pivot
+CREATE OR REPLACE VIEW v_variacao_resolvidas_5d_grupo AS
 WITH TaxaResolvidas5d AS (
     -- Seleciona os dados brutos da métrica específica
     SELECT
@@ -56,41 +57,105 @@ VariacaoIndividual AS (
             0 -- Ou NULL
         ) AS taxa_variacao_individual
     FROM MensalGrupo
-),
-DiferencaVariacao AS (
-    -- Junta as variações e calcula a diferença
-    SELECT
-        vi.ano_mes,
-        vi.id_grupo,
-        vmg.taxa_variacao_media_geral,
-        vi.taxa_variacao_individual,
-        -- Calcula a diferença entre a taxa individual e a média geral
-        vi.taxa_variacao_individual - vmg.taxa_variacao_media_geral AS diferenca_variacao
-    FROM VariacaoIndividual vi
-    JOIN VariacaoMediaGeral vmg ON vi.ano_mes = vmg.ano_mes
 )
--- Pivota o resultado final para ter grupos como colunas
+-- Junta as variações e calcula a diferença
 SELECT
-    dv.ano_mes AS "Mes",
-    -- Arredondar para melhor visualização
-    ROUND(MAX(dv.taxa_variacao_media_geral), 2) AS "Taxa de Variação Média",
-    -- Pivot para cada grupo econômico encontrado nos dados de 2019
-    -- Usar MAX pois GROUP BY agrupa por mês, e queremos o valor daquele grupo para o mês
-    ROUND(MAX(CASE WHEN dg.nome = 'ALGAR' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "ALGAR",
-    ROUND(MAX(CASE WHEN dg.nome = 'CLARO' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "CLARO",
-    ROUND(MAX(CASE WHEN dg.nome = 'EMBRATEL' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "EMBRATEL",
-    ROUND(MAX(CASE WHEN dg.nome = 'NET' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "NET", -- Incluído pois aparece em SCM 2019
-    ROUND(MAX(CASE WHEN dg.nome = 'NEXTEL' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "NEXTEL", -- Incluído pois aparece em SMP 2019
-    ROUND(MAX(CASE WHEN dg.nome = 'OI' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "OI",
-    ROUND(MAX(CASE WHEN dg.nome = 'SERCOMTEL' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "SERCOMTEL",
-    ROUND(MAX(CASE WHEN dg.nome = 'SKY' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "SKY",
-    ROUND(MAX(CASE WHEN dg.nome = 'TIM' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "TIM",
-    ROUND(MAX(CASE WHEN dg.nome = 'VIVO' THEN dv.diferenca_variacao ELSE NULL END), 2) AS "VIVO"
-    -- Adicionar mais colunas CASE WHEN para outros grupos se necessário
-FROM DiferencaVariacao dv
-JOIN dim_grupo_economico dg ON dv.id_grupo = dg.id_grupo
-GROUP BY dv.ano_mes
-ORDER BY dv.ano_mes;
+    vi.ano_mes,
+    vi.id_grupo,
+    vmg.taxa_variacao_media_geral,
+    vi.taxa_variacao_individual,
+    -- Calcula a diferença entre a taxa individual e a média geral
+    vi.taxa_variacao_individual - vmg.taxa_variacao_media_geral AS diferenca_variacao
+FROM VariacaoIndividual vi
+JOIN VariacaoMediaGeral vmg ON vi.ano_mes = vmg.ano_mes;
+
+COMMENT ON VIEW v_variacao_resolvidas_5d_grupo IS 'Taxa de variação mensal da média da "Taxa de reclamações respondidas em até 5 dias úteis", taxa de variação individual de cada grupo econômico e a diferença entre elas, uma linha por mês e grupo (formato longo).';
+
+-- Rótulo de coluna com no máximo 63 bytes (limite dos identificadores do PostgreSQL, que truncaria o nome em
+-- silêncio), terminado por sufixo; o corte é feito por caractere para não partir caracteres multibyte.
+CREATE OR REPLACE FUNCTION rotulo_coluna_pivot(nome TEXT, sufixo TEXT DEFAULT '') RETURNS TEXT
+LANGUAGE plpgsql IMMUTABLE AS $$
+DECLARE
+    base TEXT := nome;
+BEGIN
+    WHILE octet_length(base || sufixo) > 63 LOOP
+        base := left(base, -1);
+    END LOOP;
+    RETURN base || sufixo;
+END;
+$$;
+
+COMMENT ON FUNCTION rotulo_coluna_pivot(TEXT, TEXT) IS 'Limita nome || sufixo a 63 bytes (tamanho máximo de um identificador), cortando o nome.';
+
+-- Gera a view pivotada (um grupo econômico por coluna) a partir da lista atual de grupos em dim_grupo_economico,
+-- junto com a sua versão materializada. Só recria os objetos se a lista de colunas mudou; retorna TRUE nesse caso.
+-- Chamada pelo ETL na transação da carga, na primeira carga de cada execução e sempre que surgem grupos novos
+-- (grupos novos passam a ter coluna própria automaticamente, mesmo com ETL_REFRESH_MATVIEWS=false).
+CREATE OR REPLACE FUNCTION gerar_pivot_taxa_variacao_resolvidas_5d() RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+DECLARE
+    colunas_fixas CONSTANT TEXT[] := ARRAY['Mes', 'Taxa de Variação Média'];
+    grupos INTEGER[];
+    rotulos TEXT[];
+    colunas_desejadas TEXT[];
+    colunas_atuais TEXT[];
+    colunas_pivot TEXT;
+BEGIN
+    -- Coluna de cada grupo: o nome limitado a 63 bytes (como fica gravado no catálogo); nomes que coincidem após o
+    -- corte, ou com as colunas fixas, recebem o id do grupo como sufixo
+    SELECT ARRAY_AGG(id_grupo ORDER BY nome, id_grupo), ARRAY_AGG(rotulo ORDER BY nome, id_grupo)
+    INTO grupos, rotulos
+    FROM (
+        SELECT id_grupo, nome,
+               CASE WHEN base = ANY(colunas_fixas) OR COUNT(*) OVER (PARTITION BY base) > 1
+                    THEN rotulo_coluna_pivot(nome, ' #' || id_grupo) ELSE base END AS rotulo
+        FROM (SELECT id_grupo, nome::TEXT AS nome, rotulo_coluna_pivot(nome) AS base FROM dim_grupo_economico) g
+    ) r;
+    colunas_desejadas := colunas_fixas || COALESCE(rotulos, ARRAY[]::TEXT[]);
+
+    -- Colunas repetidas fariam o CREATE VIEW falhar depois de removida a view atual: rejeita antes
+    IF (SELECT COUNT(DISTINCT c) FROM unnest(colunas_desejadas) c) <> cardinality(colunas_desejadas) THEN
+        RAISE EXCEPTION 'Nomes de grupos econômicos geram colunas repetidas na view pivotada: %', colunas_desejadas;
+    END IF;
+
+    SELECT ARRAY_AGG(a.attname::TEXT ORDER BY a.attnum)
+    INTO colunas_atuais
+    FROM pg_attribute a
+    WHERE a.attrelid = to_regclass('mv_taxa_variacao_resolvidas_5d') AND a.attnum > 0 AND NOT a.attisdropped;
+
+    IF colunas_atuais = colunas_desejadas THEN
+        RETURN FALSE;
+    END IF;
+
+    -- FILTER sobre o id (inteiro) do grupo, sem junção com dim_grupo_economico nem comparação de nomes por linha
+    SELECT STRING_AGG(FORMAT('ROUND(MAX(diferenca_variacao) FILTER (WHERE id_grupo = %s), 2) AS %I', g.id_grupo, g.rotulo), E',\n    ' ORDER BY g.ordem)
+    INTO colunas_pivot
+    FROM unnest(grupos, rotulos) WITH ORDINALITY AS g(id_grupo, rotulo, ordem);
+
+    -- Sem CASCADE: outros objetos criados sobre as views fazem a recriação falhar em vez de serem removidos em silêncio
+    EXECUTE 'DROP MATERIALIZED VIEW IF EXISTS mv_taxa_variacao_resolvidas_5d';
+    EXECUTE 'DROP VIEW IF EXISTS v_taxa_variacao_resolvidas_5d';
+    EXECUTE FORMAT(
+        'CREATE VIEW v_taxa_variacao_resolvidas_5d AS
+SELECT
+    ano_mes AS "Mes",
+    ROUND(MAX(taxa_variacao_media_geral), 2) AS "Taxa de Variação Média"%s
+FROM v_variacao_resolvidas_5d_grupo
+GROUP BY ano_mes
+ORDER BY ano_mes',
+        COALESCE(E',\n    ' || colunas_pivot, '')
+    );
+    EXECUTE 'COMMENT ON VIEW v_taxa_variacao_resolvidas_5d IS ''View que calcula a taxa de variação mensal da média da "Taxa de reclamações respondidas em até 5 dias úteis" e a diferença entre essa taxa média e a taxa de variação individual de cada grupo econômico, pivotando os grupos em colunas (gerada por gerar_pivot_taxa_variacao_resolvidas_5d a partir de dim_grupo_economico).''';
+
+    EXECUTE 'CREATE MATERIALIZED VIEW mv_taxa_variacao_resolvidas_5d AS SELECT * FROM v_taxa_variacao_resolvidas_5d WITH DATA';
+    -- Índice único exigido pelo REFRESH MATERIALIZED VIEW CONCURRENTLY (uma linha por mês)
+    EXECUTE 'CREATE UNIQUE INDEX uq_mv_taxa_variacao_resolvidas_5d_mes ON mv_taxa_variacao_resolvidas_5d ("Mes")';
+    EXECUTE 'COMMENT ON MATERIALIZED VIEW mv_taxa_variacao_resolvidas_5d IS ''Versão materializada de v_taxa_variacao_resolvidas_5d, atualizada pelo ETL quando a "Taxa de reclamações respondidas em até 5 dias úteis" é alterada.''';
+    RETURN TRUE;
+END;
+$$;
 
-COMMENT ON VIEW v_taxa_variacao_resolvidas_5d IS 'View que calcula a taxa de variação mensal da média da "Taxa de reclamações respondidas em até 5 dias úteis" e a diferença entre essa taxa média e a taxa de variação individual de cada grupo econômico, pivotando os grupos em colunas.';
+COMMENT ON FUNCTION gerar_pivot_taxa_variacao_resolvidas_5d() IS 'Recria v_taxa_variacao_resolvidas_5d e mv_taxa_variacao_resolvidas_5d com uma coluna por grupo econômico de dim_grupo_economico (rótulos de até 63 bytes, desambiguados pelo id do grupo), se a lista de colunas mudou.';
 
+-- Cria a view pivotada e a view materializada (sem colunas de grupo até a primeira carga)
+SELECT gerar_pivot_taxa_variacao_resolvidas_5d();
@@ -0,0 +1,7 @@
+-- Script SQL com os índices de apoio às views analíticas
+-- A view materializada mv_taxa_variacao_resolvidas_5d (consultada pelas ferramentas de BI no lugar da view)
+-- é criada por gerar_pivot_taxa_variacao_resolvidas_5d() (02_create_view.sql) e atualizada pelo ETL
+-- (REFRESH ... CONCURRENTLY) apenas quando a carga altera a métrica de que ela depende.
+
+-- Índice de cobertura para o filtro por métrica seguido de tempo/grupo (usado pela view e pelo REFRESH)
+CREATE INDEX idx_fato_ida_metrica_tempo_grupo ON fato_ida (id_metrica, id_tempo, id_grupo) INCLUDE (valor);
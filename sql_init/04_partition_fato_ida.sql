@@ -0,0 +1,97 @@
+-- Script SQL com o layout particionado (opcional) da tabela fato_ida
+-- A fato_ida é criada como tabela comum (01_create_tables.sql). particionar_fato_ida() a converte numa tabela
+-- particionada por ano (RANGE sobre a coluna ano, copiada de dim_tempo), com uma partição fato_ida_<ano> por ano.
+-- Chamada pelo ETL quando ETL_FACT_PARTITIONING=year, ou manualmente: SELECT particionar_fato_ida();
+-- Com a fato particionada, o ETL cria as partições de anos novos e pode substituir a partição de um ano
+-- reprocessado (ETL_LOAD_MODE=partition) sem tocar nos demais.
+
+CREATE OR REPLACE FUNCTION particionar_fato_ida() RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+DECLARE
+    sequencia TEXT;
+    definicao_view TEXT;
+    comentario_view TEXT;
+    comentarios JSONB;
+    coluna TEXT;
+    comentario TEXT;
+    ano_particao INTEGER;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'fato_ida'::regclass) THEN
+        RETURN FALSE;
+    END IF;
+
+    -- Guarda o que é perdido ao remover a tabela atual: a view base (as pivotadas são regeneradas) e os comentários
+    definicao_view := pg_get_viewdef(to_regclass('v_variacao_resolvidas_5d_grupo'));
+    comentario_view := obj_description(to_regclass('v_variacao_resolvidas_5d_grupo'), 'pg_class');
+    SELECT jsonb_object_agg(attname, col_description(attrelid, attnum))
+    INTO comentarios
+    FROM pg_attribute
+    WHERE attrelid = 'fato_ida'::regclass AND attnum > 0 AND NOT attisdropped AND col_description(attrelid, attnum) IS NOT NULL;
+
+    -- A sequência de id_fato é mantida (os IDs existentes são preservados)
+    sequencia := pg_get_serial_sequence('fato_ida', 'id_fato');
+    EXECUTE FORMAT('ALTER SEQUENCE %s OWNED BY NONE', sequencia);
+
+    -- A chave de partição precisa fazer parte da chave primária e dos índices únicos
+    CREATE TABLE fato_ida_particionada (
+        id_fato INTEGER NOT NULL,
+        id_tempo INTEGER NOT NULL,
+        id_grupo INTEGER NOT NULL,
+        id_servico INTEGER NOT NULL,
+        id_metrica INTEGER NOT NULL,
+        valor NUMERIC,
+        ano INTEGER NOT NULL
+    ) PARTITION BY RANGE (ano);
+    EXECUTE FORMAT('ALTER TABLE fato_ida_particionada ALTER COLUMN id_fato SET DEFAULT nextval(%L)', sequencia);
+
+    FOR ano_particao IN SELECT DISTINCT ano FROM dim_tempo ORDER BY ano LOOP
+        EXECUTE FORMAT('CREATE TABLE %I PARTITION OF fato_ida_particionada FOR VALUES FROM (%s) TO (%s)',
+                       'fato_ida_' || ano_particao, ano_particao, ano_particao + 1);
+    END LOOP;
+
+    -- Linhas ordenadas por tempo dentro de cada partição (favorece o índice BRIN)
+    INSERT INTO fato_ida_particionada (id_fato, id_tempo, id_grupo, id_servico, id_metrica, valor, ano)
+    SELECT f.id_fato, f.id_tempo, f.id_grupo, f.id_servico, f.id_metrica, f.valor, t.ano
+    FROM fato_ida f
+    JOIN dim_tempo t ON f.id_tempo = t.id_tempo
+    ORDER BY t.ano, f.id_tempo, f.id_metrica;
+
+    -- CASCADE remove as views que dependem da fato_ida, recriadas abaixo
+    DROP TABLE fato_ida CASCADE;
+    ALTER TABLE fato_ida_particionada RENAME TO fato_ida;
+    EXECUTE FORMAT('ALTER SEQUENCE %s OWNED BY fato_ida.id_fato', sequencia);
+
+    ALTER TABLE fato_ida ADD CONSTRAINT fato_ida_pkey PRIMARY KEY (id_fato, ano);
+    ALTER TABLE fato_ida ADD CONSTRAINT fato_ida_id_tempo_fkey FOREIGN KEY (id_tempo) REFERENCES dim_tempo(id_tempo);
+    ALTER TABLE fato_ida ADD CONSTRAINT fato_ida_id_grupo_fkey FOREIGN KEY (id_grupo) REFERENCES dim_grupo_economico(id_grupo);
+    ALTER TABLE fato_ida ADD CONSTRAINT fato_ida_id_servico_fkey FOREIGN KEY (id_servico) REFERENCES dim_servico(id_servico);
+    ALTER TABLE fato_ida ADD CONSTRAINT fato_ida_id_metrica_fkey FOREIGN KEY (id_metrica) REFERENCES dim_metrica(id_metrica);
+
+    -- Chave natural usada pela carga incremental (ano é determinado por id_tempo, então a unicidade é a mesma)
+    CREATE UNIQUE INDEX uq_fato_ida_chave_natural ON fato_ida (id_tempo, id_grupo, id_servico, id_metrica, ano);
+    -- Índice de cobertura para o filtro por métrica seguido de tempo/grupo (view analítica e REFRESH)
+    CREATE INDEX idx_fato_ida_metrica_tempo_grupo ON fato_ida (id_metrica, id_tempo, id_grupo) INCLUDE (valor);
+    -- Intervalos de meses dentro de cada partição (linhas gravadas em ordem de tempo)
+    CREATE INDEX idx_fato_ida_tempo_brin ON fato_ida USING brin (id_tempo) WITH (pages_per_range = 16);
+
+    COMMENT ON TABLE fato_ida IS 'Tabela fato que armazena os valores numéricos das métricas do IDA, conectando as dimensões (particionada por ano).';
+    FOR coluna, comentario IN SELECT * FROM jsonb_each_text(COALESCE(comentarios, '{}'::JSONB)) LOOP
+        IF coluna <> 'id_fato' THEN
+            EXECUTE FORMAT('COMMENT ON COLUMN fato_ida.%I IS %L', coluna, comentario);
+        END IF;
+    END LOOP;
+    COMMENT ON COLUMN fato_ida.id_fato IS 'Identificador da linha na tabela fato (chave primária junto com ano).';
+    COMMENT ON COLUMN fato_ida.ano IS 'Ano da medição (copiado de dim_tempo); chave de partição da tabela.';
+
+    IF definicao_view IS NOT NULL THEN
+        EXECUTE 'CREATE VIEW v_variacao_resolvidas_5d_grupo AS ' || definicao_view;
+        EXECUTE FORMAT('COMMENT ON VIEW v_variacao_resolvidas_5d_grupo IS %L', comentario_view);
+    END IF;
+    IF to_regprocedure('gerar_pivot_taxa_variacao_resolvidas_5d()') IS NOT NULL THEN
+        PERFORM gerar_pivot_taxa_variacao_resolvidas_5d();
+    END IF;
+    RETURN TRUE;
+END;
+$$;
+
+COMMENT ON FUNCTION particionar_fato_ida() IS 'Converte fato_ida numa tabela particionada por ano (uma partição por ano de dim_tempo), preservando os dados, os IDs e as views analíticas; retorna FALSE se ela já é particionada.';
@@ -0,0 +1,42 @@
+"""Configuração comum dos testes: os módulos do ETL importam uns aos outros pelo nome (``from ods_reader import ...``)."""
+import functools
+import http.server
+import os
+import sys
+import threading
+from html import escape
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "etl_ida"))
+
+
+def stand_in_page(resources):
+    """Página com a estrutura da página do conjunto de dados (``li.resource-item`` / ``h3.heading``); ``resources`` é [(título, href)]."""
+    items = "".join(
+        f'<li class="resource-item"><h3 class="heading">{escape(title)}</h3>'
+        f'<a class="btn btn-secondary" href="#">Explorar</a>'
+        f'<a class="btn btn-primary" href="{escape(href)}">Acessar o recurso</a></li>'
+        for title, href in resources
+    )
+    return f'<html><body><button class="">Recursos</button><ul class="resource-list">{items}</ul></body></html>'
+
+
+@pytest.fixture
+def http_site(tmp_path):
+    """Servidor HTTP local (``http.server``) sobre um diretório temporário; retorna (diretório, URL base)."""
+    site = tmp_path / "site"
+    site.mkdir()
+    handler = functools.partial(_QuietHandler, directory=str(site))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield site, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    """Servidor de arquivos estáticos sem log por requisição; responde 304 a ``If-Modified-Since``."""
+    def log_message(self, format, *args):
+        pass
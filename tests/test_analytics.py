@@ -0,0 +1,108 @@
+"""Testes do cubo de variações (analytics) contra uma implementação de referência da view SQL."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import IdaCube
+
+METRIC = "Taxa de reclamações respondidas em até 5 dias úteis"
+
+
+def reference_variation(fact, metric=METRIC):
+    """``v_variacao_resolvidas_5d_grupo`` passo a passo (CTEs da view em sql_init/02_create_view.sql), em pandas."""
+    rows = fact[fact["metrica_nome"] == metric]
+    # MensalGrupo: AVG ignora nulos; um grupo com linhas só nulas existe no mês, com média nula
+    monthly = rows.groupby(["ano_mes", "grupo_economico"], as_index=False)["valor"].mean()
+    monthly = monthly.rename(columns={"valor": "valor_medio_grupo"}).sort_values(["grupo_economico", "ano_mes"])
+    general = monthly.groupby("ano_mes", as_index=False)["valor_medio_grupo"].mean().sort_values("ano_mes")
+
+    def rate(current, previous):
+        # COALESCE((atual - LAG) / NULLIF(LAG, 0) * 100, 0)
+        return ((current - previous) / previous.where(previous != 0) * 100).fillna(0.0)
+
+    general["taxa_variacao_media_geral"] = rate(general["valor_medio_grupo"], general["valor_medio_grupo"].shift(1))
+    previous = monthly.groupby("grupo_economico")["valor_medio_grupo"].shift(1)
+    monthly["taxa_variacao_individual"] = rate(monthly["valor_medio_grupo"], previous)
+    result = monthly.merge(general[["ano_mes", "taxa_variacao_media_geral"]], on="ano_mes")
+    result["diferenca_variacao"] = result["taxa_variacao_individual"] - result["taxa_variacao_media_geral"]
+    return result.sort_values(["ano_mes", "grupo_economico"], ignore_index=True)
+
+
+def reference_pivot(fact, groups):
+    """``v_taxa_variacao_resolvidas_5d``: um mês por linha, ROUND(MAX(...) FILTER (grupo), 2) por coluna."""
+    long = reference_variation(fact)
+    pivot = long.pivot(index="ano_mes", columns="grupo_economico", values="diferenca_variacao").round(2)
+    pivot = pivot.reindex(columns=groups)
+    media = long.groupby("ano_mes")["taxa_variacao_media_geral"].max().round(2)
+    pivot.insert(0, "Taxa de Variação Média", media)
+    pivot.insert(0, "Mes", pivot.index)
+    pivot.columns.name = None
+    return pivot.reset_index(drop=True)
+
+
+def _crafted_fact():
+    """Meses ausentes, grupos sem um mês, valores nulos e valor anterior zero."""
+    rows = []
+
+    def add(ano_mes, grupo, servico, valor, metrica=METRIC):
+        rows.append({"ano_mes": ano_mes, "grupo_economico": grupo, "servico_sigla": servico,
+                     "metrica_nome": metrica, "valor": valor})
+
+    for servico, ajuste in (("SCM", 0.0), ("SMP", 4.0)):
+        add("2020-01", "CLARO", servico, 0.0) # Valor anterior zero (NULLIF) no mês seguinte
+        add("2020-02", "CLARO", servico, 80.0 + ajuste)
+        add("2020-05", "CLARO", servico, 90.0 + ajuste) # Meses 03 e 04 ausentes: LAG usa 2020-02
+        add("2020-01", "OI", servico, 70.0 + ajuste)
+        add("2020-05", "OI", servico, 75.0) # Sem 2020-02: LAG do grupo usa 2020-01
+        add("2020-01", "VIVO", servico, 60.0)
+        add("2020-02", "VIVO", servico, np.nan) # Grupo existe no mês, média nula
+        add("2020-05", "VIVO", servico, 66.0)
+        add("2020-02", "OI", servico, 1.0, metrica="Índice de Reclamações") # Outra métrica: ignorada
+    add("2020-05", "CLARO", "STFC", np.nan) # Nulo misturado a valores: ignorado pelo AVG
+    return pd.DataFrame(rows)
+
+
+def _random_fact(seed=7):
+    """Fato sintética com lacunas e nulos aleatórios."""
+    rng = np.random.default_rng(seed)
+    months = [f"{year}-{month:02d}" for year in (2020, 2021) for month in range(1, 13)]
+    index = pd.MultiIndex.from_product(
+        [months, [f"GRUPO {i}" for i in range(6)], ["SCM", "SMP", "STFC"], [METRIC, "Índice de Reclamações"]],
+        names=["ano_mes", "grupo_economico", "servico_sigla", "metrica_nome"],
+    )
+    fact = index.to_frame(index=False)
+    fact["valor"] = rng.integers(0, 5, len(fact)).astype(float) # Zeros frequentes
+    fact.loc[rng.random(len(fact)) < 0.1, "valor"] = np.nan
+    return fact[rng.random(len(fact)) > 0.3].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("fact", [_crafted_fact(), _random_fact()], ids=["casos", "aleatoria"])
+def test_variation_matches_view(fact):
+    expected = reference_variation(fact)
+
+    result = IdaCube.from_frame(fact).variation(METRIC)
+
+    assert list(result["metrica_nome"].unique()) == [METRIC]
+    result = result.drop(columns="metrica_nome").sort_values(["ano_mes", "grupo_economico"], ignore_index=True)
+    pd.testing.assert_frame_equal(result, expected[result.columns], check_dtype=False)
+
+
+@pytest.mark.parametrize("fact", [_crafted_fact(), _random_fact()], ids=["casos", "aleatoria"])
+def test_pivot_matches_view(fact):
+    cube = IdaCube.from_frame(fact)
+
+    result = cube.pivot(METRIC)
+
+    pd.testing.assert_frame_equal(result, reference_pivot(fact, cube.groups), check_dtype=False)
+
+
+def test_crafted_edge_cases():
+    result = IdaCube.from_frame(_crafted_fact()).variation(METRIC).set_index(["ano_mes", "grupo_economico"])
+
+    assert result.loc[("2020-02", "CLARO"), "taxa_variacao_individual"] == 0.0 # Anterior zero
+    assert result.loc[("2020-05", "CLARO"), "taxa_variacao_individual"] == pytest.approx((92 - 82) / 82 * 100)
+    assert result.loc[("2020-05", "OI"), "taxa_variacao_individual"] == pytest.approx((75 - 72) / 72 * 100)
+    assert np.isnan(result.loc[("2020-02", "VIVO"), "valor_medio_grupo"])
+    assert result.loc[("2020-02", "VIVO"), "taxa_variacao_individual"] == 0.0 # Média nula
+    assert ("2020-02", "OI") not in result.index
+    assert result.loc[("2020-05", "VIVO"), "taxa_variacao_individual"] == 0.0 # Anterior nulo
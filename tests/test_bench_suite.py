@@ -0,0 +1,27 @@
+"""Execução de fumaça da suíte de benchmark (sem PostgreSQL) nos modos normal e de baixa memória."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+SUITE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "bench_suite.py")
+
+
+@pytest.mark.parametrize("low_memory", ["false", "true"])
+def test_bench_suite_runs_repeatedly(tmp_path, low_memory):
+    output = tmp_path / "resultado.json"
+    env = dict(os.environ, ETL_LOW_MEMORY=low_memory)
+    completed = subprocess.run(
+        [sys.executable, SUITE, "--sizes", "1x2x2", "--runs", "2", "--skip-load",
+         "--baseline", str(tmp_path / "sem_base.json"), "--output", str(output)],
+        env=env, capture_output=True, text=True, timeout=300,
+    )
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+
+    result = json.loads(output.read_text(encoding="utf-8"))
+    assert result["configuracao"]["low_memory"] is (low_memory == "true")
+    stages = result["tamanhos"]["1x2x2"]["etapas"]
+    assert set(stages) == {"leitura", "transformacao"}
+    assert stages["transformacao"]["linhas"] == result["tamanhos"]["1x2x2"]["linhas_fato"] > 0
@@ -0,0 +1,112 @@
+"""Testes do acompanhamento de downloads (download_watcher) e do download com Selenium numa página local."""
+import os
+import shutil
+import time
+
+import pytest
+
+from conftest import stand_in_page
+from download_watcher import DownloadWatcher, expected_filename
+
+
+def _watcher(directory, timeout=5.0):
+    return DownloadWatcher(str(directory), timeout, stable_seconds=0.05, poll_interval=0.01)
+
+
+def _finish(directory, name, content=b"conteudo"):
+    """Simula o navegador: grava o parcial .crdownload e o renomeia ao terminar."""
+    partial = os.path.join(directory, f"{name}.crdownload")
+    with open(partial, "wb") as f:
+        f.write(content)
+    os.replace(partial, os.path.join(directory, name))
+
+
+def test_expected_filename():
+    assert expected_filename("http://host/dados/SCM2019.ods?download=1") == "SCM2019.ods"
+    assert expected_filename("http://host/dados/IDA%20SMP%202019.ods") == "IDA SMP 2019.ods"
+    assert expected_filename("http://host/recurso/123") is None
+    assert expected_filename("") is None
+
+
+def test_concurrent_downloads_are_matched_by_filename(tmp_path):
+    watcher = _watcher(tmp_path)
+    watcher.expect("SCM 2019", "SCM2019.ods")
+    watcher.expect("SMP 2019", "SMP2019.ods")
+    watcher.expect("STFC 2019", "STFC2019.ods")
+
+    # Terminam fora da ordem de início; um deles com o sufixo usado pelo navegador para nomes repetidos
+    _finish(tmp_path, "STFC2019.ods")
+    _finish(tmp_path, "SMP2019 (1).ods")
+    _finish(tmp_path, "SCM2019.ods")
+    completed = dict(watcher.wait())
+
+    assert completed == {
+        "STFC 2019": str(tmp_path / "STFC2019.ods"),
+        "SMP 2019": str(tmp_path / "SMP2019 (1).ods"),
+        "SCM 2019": str(tmp_path / "SCM2019.ods"),
+    }
+    assert watcher.timed_out == []
+
+
+def test_timeout_names_the_download_that_did_not_finish(tmp_path):
+    watcher = _watcher(tmp_path, timeout=0.3)
+    watcher.expect("SCM 2019", "SCM2019.ods")
+    watcher.expect("SMP 2019", "SMP2019.ods")
+    _finish(tmp_path, "SMP2019.ods")
+
+    completed = watcher.wait()
+
+    assert [label for label, _ in completed] == ["SMP 2019"]
+    assert watcher.timed_out == ["SCM 2019"]
+
+
+def test_partial_and_preexisting_files_are_not_completions(tmp_path):
+    (tmp_path / "SCM2018.ods").write_bytes(b"antigo")
+    watcher = _watcher(tmp_path, timeout=0.3)
+    watcher.expect("SCM 2019", "SCM2019.ods")
+    (tmp_path / "SCM2019.ods.crdownload").write_bytes(b"em andamento")
+    (tmp_path / "SCM2019.ods").write_bytes(b"")
+
+    assert watcher.wait() == []
+    assert watcher.timed_out == ["SCM 2019"]
+
+
+def test_unnamed_download_takes_unexpected_file(tmp_path):
+    watcher = _watcher(tmp_path)
+    watcher.expect("SCM 2019", "SCM2019.ods")
+    watcher.expect("SMP 2019") # Link sem nome de arquivo: recebe o arquivo que nenhum outro download esperava
+    _finish(tmp_path, "recurso-123.ods")
+    _finish(tmp_path, "SCM2019.ods")
+
+    assert sorted(watcher.wait()) == [("SCM 2019", str(tmp_path / "SCM2019.ods")),
+                                      ("SMP 2019", str(tmp_path / "recurso-123.ods"))]
+
+
+def _edge_driver():
+    return os.getenv("EDGE_DRIVER_PATH") or shutil.which("msedgedriver")
+
+
+@pytest.mark.skipif(not _edge_driver(), reason="Microsoft Edge WebDriver não disponível")
+def test_selenium_download_from_stand_in_page(http_site, tmp_path, monkeypatch):
+    pytest.importorskip("selenium")
+    from main_etl import Config, Extractor
+
+    site, base_url = http_site
+    files = {"SCM": "SCM2019.ods", "SMP": "SMP2019.ods"}
+    for name in files.values():
+        (site / name).write_bytes(os.urandom(64 * 1024))
+    resources = [(f"Índice de Desempenho no Atendimento - {service} - 2019", f"/{name}") for service, name in files.items()]
+    (site / "index.html").write_text(stand_in_page(resources), encoding="utf-8")
+    monkeypatch.setenv("ANATEL_DATA_URL", f"{base_url}/index.html")
+    monkeypatch.setenv("ETL_DOWNLOAD_TIMEOUT", "30")
+    config = Config()
+    config.ods_download_path = str(tmp_path / "downloads")
+    os.makedirs(config.ods_download_path)
+    config.webdriver_path = _edge_driver()
+    config.target_downloads = {"SCM": ["2019"], "SMP": ["2019"]}
+
+    start = time.monotonic()
+    assert Extractor(config).download_data()
+
+    assert sorted(os.listdir(config.ods_download_path)) == sorted(files.values())
+    assert time.monotonic() - start < 30 # Sem as esperas fixas de 30 s por arquivo
@@ -0,0 +1,85 @@
+"""Testes do download sem navegador (http_fetcher) contra um servidor HTTP local."""
+import os
+
+import pytest
+import urllib3
+
+from conftest import stand_in_page
+from http_fetcher import HttpFetcher, target_filename
+
+TARGETS = {"SCM": ["2019"], "SMP": ["2019"], "STFC": ["2019"]}
+
+
+@pytest.fixture
+def site(http_site):
+    """Página local com três recursos: SCM (ODS), SMP (XLSX) e STFC (link quebrado, 404)."""
+    directory, base_url = http_site
+    (directory / "dados").mkdir()
+    (directory / "dados" / "scm_2019.ods").write_bytes(b"ods" * 1000)
+    (directory / "dados" / "smp_2019.xlsx").write_bytes(b"xlsx" * 1000)
+    resources = [
+        ("Índice de Desempenho no Atendimento - SCM - 2019", "dados/scm_2019.ods"),
+        ("Índice de Desempenho no Atendimento - SMP - 2019", f"{base_url}/dados/smp_2019.xlsx"),
+        ("Índice de Desempenho no Atendimento - STFC - 2019", "dados/stfc_2019.ods"),
+        ("Outro conjunto de dados", "dados/outro.csv"),
+    ]
+    (directory / "index.html").write_text(stand_in_page(resources), encoding="utf-8")
+    return f"{base_url}/index.html", base_url
+
+
+@pytest.fixture
+def downloads(tmp_path):
+    directory = tmp_path / "downloads"
+    directory.mkdir()
+    return directory
+
+
+def test_target_filename():
+    assert target_filename("SCM", "2019", "http://host/dados/scm_2019.ODS") == "SCM2019.ods"
+    assert target_filename("SMP", "2019", "http://host/dados/smp%202019.xlsx?v=2") == "SMP2019.xlsx"
+    assert target_filename("STFC", "2019", "http://host/recurso/123") == "STFC2019.ods"
+
+
+def test_resolve_links_from_html(site, downloads):
+    page_url, base_url = site
+    fetcher = HttpFetcher(str(downloads), timeout=10)
+
+    resolved = fetcher.resolve(page_url, {**TARGETS, "SCM": ["2019", "2020"]})
+
+    assert resolved == {
+        ("SCM", "2019"): f"{base_url}/dados/scm_2019.ods",
+        ("SMP", "2019"): f"{base_url}/dados/smp_2019.xlsx",
+        ("STFC", "2019"): f"{base_url}/dados/stfc_2019.ods",
+    }
+
+
+def test_download_then_conditional_get(site, downloads):
+    page_url, _ = site
+
+    counts = HttpFetcher(str(downloads), timeout=10).download(page_url, TARGETS)
+
+    # 200 para SCM e SMP; 404 do STFC contado como falha
+    assert counts == {"baixado": 2, "inalterado": 0, "falha": 1}
+    assert (downloads / "SCM2019.ods").read_bytes() == b"ods" * 1000
+    assert (downloads / "SMP2019.xlsx").read_bytes() == b"xlsx" * 1000
+    assert not (downloads / "STFC2019.ods").exists()
+    assert not [name for name in os.listdir(downloads) if name.endswith(".part")]
+
+    # Nova execução (estado relido do disco): If-Modified-Since -> 304, arquivos mantidos
+    counts = HttpFetcher(str(downloads), timeout=10).download(page_url, TARGETS)
+    assert counts == {"baixado": 0, "inalterado": 2, "falha": 1}
+    assert (downloads / "SCM2019.ods").read_bytes() == b"ods" * 1000
+
+
+def test_interrupted_download_leaves_no_partial_file(site, downloads, monkeypatch):
+    page_url, _ = site
+
+    def interrupted_stream(self, amt=None, decode_content=None):
+        yield b"inicio"
+        raise urllib3.exceptions.ProtocolError("conexão interrompida")
+
+    monkeypatch.setattr(urllib3.response.HTTPResponse, "stream", interrupted_stream)
+    counts = HttpFetcher(str(downloads), timeout=10).download(page_url, {"SCM": ["2019"]})
+
+    assert counts == {"baixado": 0, "inalterado": 0, "falha": 1}
+    assert [name for name in os.listdir(downloads) if name != ".download_state.json"] == []
@@ -0,0 +1,39 @@
+"""Testes do cache de leitura (parse_cache)."""
+import numpy as np
+import pandas as pd
+
+from main_etl import Transformer
+from ods_reader import pack_frame, unpack_frame
+from parse_cache import ParseCache, decode_column_name, encode_column_name
+
+
+def _frame_with_date_headers():
+    return pd.DataFrame({
+        "GRUPO ECONÔMICO": ["CLARO", "OI"],
+        "VARIÁVEL": ["Taxa de Respondidas em 5 dias Úteis", "Taxa de Respondidas em 5 dias Úteis"],
+        pd.Timestamp("2019-01-01"): [90.5, np.nan],
+        pd.Timestamp("2019-02-01"): [91.0, 88.25],
+        "2019-03": [92.0, 87.0],
+        7: [1.0, 2.0],
+    })
+
+
+def test_round_trip_keeps_date_headers(tmp_path):
+    df = _frame_with_date_headers()
+    cache = ParseCache(str(tmp_path), 10 * 1024 * 1024, {"engine": "stream", "header_skip": 8})
+    cache.store("arquivo", pack_frame(df))
+
+    loaded = unpack_frame(cache.load("arquivo"))
+
+    assert list(loaded.columns) == list(df.columns)
+    assert isinstance(loaded.columns[2], pd.Timestamp)
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+    date_cols, periods = Transformer._identify_date_columns(loaded.columns)
+    assert date_cols == [pd.Timestamp("2019-01-01"), pd.Timestamp("2019-02-01"), "2019-03"]
+    assert [p.strftime("%Y-%m") for p in periods] == ["2019-01", "2019-02", "2019-03"]
+
+
+def test_column_name_encoding():
+    for name in ["VARIÁVEL", 7, 2.5, None, pd.Timestamp("2020-12-01")]:
+        assert decode_column_name(encode_column_name(name)) == name
+    assert encode_column_name(pd.Timestamp("2020-12-01")) == {"kind": "timestamp", "value": "2020-12-01T00:00:00"}